@@ -39,8 +39,34 @@ class Dashboard:
         self.config = config["questionReview"]
         # Load course chapter data from DB
         self.loadCourseChapterData()
+        # Fill the data caches before serving ("blocking") or while serving
+        # ("background") so that the first loads after a deploy are not cold
+        # The reference data and hierarchy are already loaded above
+        warmUpMode = self.config.get("warmUp")
+        warmUpComponents = [
+            "MappingGraph",
+            "KSCDetails",
+            "QuestionIndex",
+            "QuestionLookup",
+            "QuestionKSCIncidence",
+        ]
+        if warmUpMode == "blocking":
+            self.data.warmUpCaches(components=warmUpComponents)
+        elif warmUpMode == "background":
+            self.data.warmUpCaches(components=warmUpComponents, background=True)
+        # Regenerate the chapter bundles of changed chapters in the background
+        if self.config.get("bundleRebuildSeconds"):
+            self.data.startChapterBundleRebuild(
+                refreshSeconds=self.config["bundleRebuildSeconds"]
+            )
 
     def loadCourseChapterData(self):
+        # Build the content hierarchy index used for all content filtering
+        self.data.loadContentHierarchy()
+        if self.config.get("contentRefreshSeconds"):
+            self.data.startContentHierarchyRefresh(
+                refreshSeconds=self.config["contentRefreshSeconds"]
+            )
         # Get active course ids
         activeCourseIds, _ = self.data.getActiveCourseIds()
         # Create a content object with active course ids
@@ -63,6 +89,7 @@ class Dashboard:
                         dcc.Store(id="QuestionFeedbackId"),
                         dcc.Store(id="allKscTextId"),
                         dcc.Store(id="currentKscdataId"),
+                        dcc.Store(id="questionJumpId"),
                         dbc.Container(
                             fluid=True,
                             children=self.getContentInputLayout(),
@@ -156,6 +183,7 @@ class Dashboard:
             ]
         )
         self.addUserActionCallbacks()
+        self.addQuestionJumpCallback()
         return
 
     # Get all layout elements to create the page
@@ -430,19 +458,29 @@ class Dashboard:
             ],
             [Input(f"{label}DropdownId", "value")],
             self.getDropdownStates(),
+            State("questionJumpId", "data"),
         )
         def updateDropdownOptions(dropdownValue, *args):
             selectedContent = self.getDropdownValues(args)
+            jumpContent = args[len(self.config["contentLabels"])]
             selectedCourseChapters = self.filterCourseChapters(
                 selectedContent=selectedContent,
                 sourceLabel=label,
             )
             childItems = []
+            childValue = None
             if dropdownValue is not None:
                 # Update the items in the child dropdown
                 colName = f"{childLabel}Name"
                 childItems = selectedCourseChapters[colName].unique()
-            return None, childItems
+                # While jumping to a question, select its chapter down the chain
+                if (
+                    (jumpContent is not None)
+                    and (jumpContent.get(label) == dropdownValue)
+                    and (jumpContent.get(childLabel) in childItems)
+                ):
+                    childValue = jumpContent[childLabel]
+            return childValue, childItems
 
     def getSaveCancelButtons(self):
         saveAlertDiv = [
@@ -685,25 +723,61 @@ class Dashboard:
     def filterCourseChapters(
         self, selectedContent: dict, sourceLabel: str = None
     ) -> pd.DataFrame:
-        # Recompute the selected course chapters
-        selectedCourseChapters = self.allCourseChapters.copy()
-        selectConditions = []
-        for idx, label in enumerate(self.config["contentLabels"]):
-            colName = f"{label}Name"
-            if selectedContent[label] is not None:
-                selectConditions.append(
-                    selectedCourseChapters[colName] == selectedContent[label]
-                )
-                # Only filter courses till the currently changed dropdown
-                # because child dropdowns will be set to None later
-                if sourceLabel and (label == sourceLabel):
-                    break
+        # Only filter courses till the currently changed dropdown
+        # because child dropdowns will be set to None later
+        hierarchy = self.data.getContentHierarchy()
+        selectedCourseChapters = hierarchy.filterByNames(
+            selectedNames=selectedContent, sourceLabel=sourceLabel, activeOnly=True
+        )
 
-        selectedCourseChapters = selectedCourseChapters.iloc[
-            np.where(np.all(selectConditions, axis=0))
+        return selectedCourseChapters
+
+    # Function that resolves the QuestionId or QuestionCode inputs to the course
+    # chapters (with names) the question is mapped to, without loading chapters
+    def findQuestionChapters(self, questionIdValue: str, questionCodeValue: str):
+        questionRows = None
+        if (questionIdValue is not None) and str(questionIdValue).strip().isdigit():
+            questionRows = self.data.lookupQuestion(questionId=int(questionIdValue))
+        elif (questionCodeValue is not None) and (str(questionCodeValue).strip() != ""):
+            questionRows = self.data.lookupQuestion(
+                questionCode=str(questionCodeValue).strip()
+            )
+        if self.utils.isNullDataFrame(questionRows):
+            return None
+        return self.allCourseChapters.loc[
+            self.allCourseChapters["CourseChapterId"].isin(
+                questionRows["CourseChapterId"]
+            )
         ]
 
-        return selectedCourseChapters
+    # Function that selects the chapter of the QuestionId or QuestionCode input
+    # in the content dropdowns when the load by id button is clicked - the course
+    # is set here and the dropdown callbacks select the rest of the chain from
+    # the stored jump content
+    def addQuestionJumpCallback(self):
+        @self.app.callback(
+            Output("questionJumpId", "data"),
+            Output(f"{self.config['contentLabels'][0]}DropdownId", "value"),
+            Input("loadQuestionsButtonById", "n_clicks"),
+            State("QuestionId", "value"),
+            State("QuestionCodeId", "value"),
+            prevent_initial_call=True,
+        )
+        def jumpToQuestion(loadClick, questionIdValue, questionCodeValue):
+            questionChapters = self.findQuestionChapters(
+                questionIdValue=questionIdValue, questionCodeValue=questionCodeValue
+            )
+            if self.utils.isNullDataFrame(questionChapters):
+                self.logger.warn(
+                    f"No chapters found for question {questionIdValue or questionCodeValue}."
+                )
+                raise PreventUpdate()
+            questionChapter = questionChapters.iloc[0]
+            jumpContent = {
+                label: questionChapter[f"{label}Name"]
+                for label in self.config["contentLabels"]
+            }
+            return jumpContent, jumpContent[self.config["contentLabels"][0]]
 
     def loadNewQuestionsAndKsc(self, selectedContent: dict):
         if selectedContent["Chapter"] is None:
@@ -711,41 +785,27 @@ class Dashboard:
         selectedCourseChapters = self.filterCourseChapters(
             selectedContent=selectedContent
         )
-        allKsc=self.data.getKSCsForCourseChapters(
-            courseChapters=selectedCourseChapters,
-            includeKSCDetails=True
-        )
-        allQuestions = self.data.getQuestionsForCourseChapters(
-            courseChapters=selectedCourseChapters,
-            columnList=[
-                "QuestionId",
-                "QuestionCode",
-                "AnswerOption",
-                "QuestionDiagramURL",
-                "FullSolutionURL",
-                "QuestionLatex",
-            ],
-            includeMetrics=True,
-            metricsColumns=[
-                "Attempted",
-                "Correct",
-                "TimeTaken",
-            ],
+        # With incrementalRefresh, re-opened chapters are patched with the rows
+        # changed since they were cached instead of being served as cached
+        if self.config.get("incrementalRefresh", False):
+            allQuestions, allKsc = self.data.refreshChapterFrames(
+                courseChapters=selectedCourseChapters
+            )
+        else:
+            allQuestions, allKsc = self.data.getCachedChapterFrames(
+                courseChapters=selectedCourseChapters
+            )
+        # Cached frames hold string codes - decode them for the UI
+        allQuestions, allKsc = self.data.decodeChapterFrames(
+            allQuestions=allQuestions, allKsc=allKsc
         )
+        # Warm the next chapters of the subject while the reviewer works on this one
+        self.data.prefetchNeighbourChapters(courseChapters=selectedCourseChapters)
+        self.logger.debug(f"Chapter cache: {self.data.getChapterCacheStats()}")
         if self.utils.isNullDataFrame(allQuestions):
             return None, None
 
-        allQuestions["Accuracy"] = allQuestions["Correct"] / allQuestions["Attempted"]
-        allQuestions["AvgTimeTaken"] = (
-            allQuestions["TimeTaken"] / allQuestions["Attempted"]
-        )
-
-        allQuestions.rename(
-            columns={"FullSolutionURL": "FullSolutionDiagramURL"}, inplace=True
-        )
-        allQuestions.reset_index(inplace=True, drop=True)
-        
-        return allQuestions,allKsc
+        return allQuestions, allKsc
 
     # Create callbacks
     def addUserActionCallbacks(self):
@@ -851,12 +911,21 @@ class Dashboard:
             reviewValues = [np.nan for reviewType in self.config["reviewTypes"]]
             
             # Updating current Question in questionProps
+            # Detail lookups of this callback are batched by the request loaders
             if isQuestionNavigation:
+                requestLoaders = self.data.newRequestLoaders()
                 questionProps.updateCurrentQuestion(
                     moveTo=moveTo,
                     allQuestions=allQuestions,
                     imageTypes=self.config["imageTypes"],
                     imageBaseURL=self.config["imageBaseURL"],
+                    detailsLoader=lambda questionId: requestLoaders.getRow(
+                        name="Question", key=questionId
+                    ),
+                )
+                # Load the heavy columns of the next questions in the background
+                self.data.prefetchQuestionDetails(
+                    allQuestions=allQuestions, questionId=questionProps.qId
                 )
             
             if isQuestionsLoaded or isQuestionNavigation:
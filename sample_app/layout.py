@@ -721,7 +721,7 @@ class Dashboard:
         selectedCourseChapters = self.filterCourseChapters(
             selectedContent=selectedContent
         )
-        allKsc=self.data.getKSCsForCourseChapters(
+        allKsc,_=self.data.getKSCsForCourseChapters(
             courseChapters=selectedCourseChapters,
             includeKSCDetails=True
         )
@@ -0,0 +1,149 @@
+import os
+import threading
+import pandas as pd
+import logging
+
+
+# Disk store of precomputed chapter bundles - the final frames the dashboard
+# needs for one CourseChapter - saved as compressed parquet files keyed by
+# CourseChapterId and the data version of their source rows:
+# <bundleDir>/<CourseChapterId>/<version>/<frameName>.parquet
+class ChapterBundleStore:
+
+    logger = None
+    bundleDir: str = None
+    frameNames: list = None
+    compression: str = None
+    versions: dict = None
+    lock: object = None
+
+    def __init__(
+        self, bundleDir: str, frameNames: list, compression: str = "zstd"
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.bundleDir = bundleDir
+        self.frameNames = frameNames
+        self.compression = compression
+        self.lock = threading.Lock()
+        if not os.path.exists(self.bundleDir):
+            os.makedirs(self.bundleDir)
+        self.scanBundles()
+
+    # Function that indexes the bundles already on disk (latest version wins)
+    # Entries that are not <CourseChapterId>/<version> directories are skipped
+    def scanBundles(self) -> dict:
+        self.versions = dict()
+        for chapterDir in os.listdir(self.bundleDir):
+            chapterPath = os.path.join(self.bundleDir, chapterDir)
+            if not os.path.isdir(chapterPath):
+                continue
+            try:
+                courseChapterId = int(chapterDir)
+            except ValueError:
+                self.logger.warn(f"Skipping unknown bundle directory {chapterPath}.")
+                continue
+            versionDirs = [
+                versionDir
+                for versionDir in os.listdir(chapterPath)
+                if os.path.isdir(os.path.join(chapterPath, versionDir))
+            ]
+            if len(versionDirs) == 0:
+                continue
+            self.versions[courseChapterId] = max(
+                versionDirs,
+                key=lambda versionDir: os.path.getmtime(
+                    os.path.join(chapterPath, versionDir)
+                ),
+            )
+        return self.versions
+
+    def getVersionDir(self, courseChapterId: int, version: str) -> str:
+        return os.path.join(self.bundleDir, str(courseChapterId), str(version))
+
+    def getBundlePath(self, courseChapterId: int, version: str, frameName: str) -> str:
+        return os.path.join(
+            self.getVersionDir(courseChapterId=courseChapterId, version=version),
+            f"{frameName}.parquet",
+        )
+
+    # Function that returns the stored version of a chapter's bundle (or None)
+    def getVersion(self, courseChapterId: int) -> str:
+        return self.versions.get(courseChapterId)
+
+    # Function that reads a bundle - returns None if the requested version (or,
+    # without a version, any version) is not on disk
+    def read(self, courseChapterId: int, version: str = None) -> dict:
+        storedVersion = self.getVersion(courseChapterId=courseChapterId)
+        if (storedVersion is None) or (
+            (version is not None) and (version != storedVersion)
+        ):
+            return None
+        bundle = dict()
+        for frameName in self.frameNames:
+            bundlePath = self.getBundlePath(
+                courseChapterId=courseChapterId,
+                version=storedVersion,
+                frameName=frameName,
+            )
+            if not os.path.exists(bundlePath):
+                return None
+            bundle[frameName] = pd.read_parquet(bundlePath)
+        return bundle
+
+    # Function that writes a bundle and removes the older versions of it
+    def write(self, courseChapterId: int, version: str, bundle: dict) -> bool:
+        with self.lock:
+            os.makedirs(
+                self.getVersionDir(courseChapterId=courseChapterId, version=version),
+                exist_ok=True,
+            )
+            for frameName in self.frameNames:
+                frame = bundle.get(frameName)
+                if frame is None:
+                    frame = pd.DataFrame()
+                bundlePath = self.getBundlePath(
+                    courseChapterId=courseChapterId,
+                    version=version,
+                    frameName=frameName,
+                )
+                # Write to a temp file first so that readers never see partial files
+                frame.to_parquet(
+                    bundlePath + ".tmp", compression=self.compression, index=False
+                )
+                os.replace(bundlePath + ".tmp", bundlePath)
+
+            oldVersion = self.versions.get(courseChapterId)
+            self.versions[courseChapterId] = version
+            if (oldVersion is not None) and (oldVersion != version):
+                self.remove(courseChapterId=courseChapterId, version=oldVersion)
+        return True
+
+    # Function that drops the stored bundles of the given chapters (or all) so
+    # that they are rebuilt on the next read
+    def invalidate(self, courseChapterIds: list = None):
+        with self.lock:
+            if courseChapterIds is None:
+                courseChapterIds = list(self.versions)
+            for courseChapterId in courseChapterIds:
+                version = self.versions.pop(courseChapterId, None)
+                if version is not None:
+                    self.remove(courseChapterId=courseChapterId, version=version)
+        return
+
+    # Function that deletes the files (and the empty directories) of one bundle
+    # version
+    def remove(self, courseChapterId: int, version: str):
+        for frameName in self.frameNames:
+            bundlePath = self.getBundlePath(
+                courseChapterId=courseChapterId, version=version, frameName=frameName
+            )
+            if os.path.exists(bundlePath):
+                os.remove(bundlePath)
+        versionDir = self.getVersionDir(courseChapterId=courseChapterId, version=version)
+        for emptyDir in [versionDir, os.path.dirname(versionDir)]:
+            try:
+                os.rmdir(emptyDir)
+            except OSError:
+                # Not empty (or already gone) - left in place
+                break
+        return
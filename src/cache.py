@@ -0,0 +1,142 @@
+import threading
+import pandas as pd
+import logging
+from dataclasses import dataclass
+
+
+# A change written to one table. changedKeys maps id columns to the ids written
+# (or deleted) - None when the change cannot be narrowed down (e.g. a truncate
+# or a delete by subquery), in which case the whole table is treated as changed
+# rows holds the inserted (or, with isDelete, deleted) rows when they are known,
+# so that caches can apply the change instead of reloading
+@dataclass
+class TableChange:
+
+    tableName: str
+    changedKeys: dict = None
+    rows: pd.DataFrame = None
+    isDelete: bool = False
+
+    # Function that builds the change of a frame written to (or deleted from) a
+    # table - the changed ids are the values of its id columns. The table's own
+    # primary key (<tableName>Id) is not a key other tables are scoped by
+    @classmethod
+    def fromData(
+        cls, tableName: str, data: pd.DataFrame = None, isDelete: bool = False
+    ):
+        if data is None:
+            return cls(tableName=tableName)
+        primaryKey = f"{tableName.split('.')[-1].strip('[]')}Id".lower()
+        return cls(
+            tableName=tableName,
+            changedKeys={
+                col: list(pd.unique(data[col].dropna()))
+                for col in data.columns
+                if col.endswith("Id") and (col.lower() != primaryKey)
+            },
+            rows=data,
+            isDelete=isDelete,
+        )
+
+    # Function that returns the changed ids of a column (None if unknown)
+    def getKeys(self, columnName: str) -> set:
+        if (self.changedKeys is None) or (columnName not in self.changedKeys):
+            return None
+        return set(self.changedKeys[columnName])
+
+
+# A cached result along with the tables it was read from. invalidateFunction is
+# called with the TableChange of any of those tables
+@dataclass
+class CacheEntry:
+
+    name: str
+    tables: list
+    invalidateFunction: object
+
+
+# Registry of the in-process caches and the tables each of them depends on
+# DBConnection publishes a TableChange for every write, and the registry calls
+# the invalidate function of the caches that read that table. Views can be
+# declared with the tables they select from, so writes to a base table also
+# reach the caches that read the view
+class CacheDependencies:
+
+    logger = None
+    entries: dict = None
+    tableEntries: dict = None
+    viewTables: dict = None
+    lock: object = None
+    stats: dict = None
+
+    def __init__(self, viewTables: dict = None):
+        self.logger = logging.getLogger(__name__)
+        self.entries = dict()
+        self.tableEntries = dict()
+        self.viewTables = dict()
+        self.lock = threading.Lock()
+        self.stats = dict()
+        for viewName, tableNames in (viewTables or dict()).items():
+            self.addView(viewName=viewName, tableNames=tableNames)
+
+    # Function that normalizes table names - schema prefixes, brackets and case
+    # are ignored so "[dbo].[KSCCluster]" and "kscCluster" are the same table
+    def getTableKey(self, tableName: str) -> str:
+        return tableName.split(".")[-1].strip("[]").lower()
+
+    # Function that declares the base tables a view selects from
+    def addView(self, viewName: str, tableNames: list):
+        with self.lock:
+            for tableName in tableNames:
+                self.viewTables.setdefault(self.getTableKey(tableName), set()).add(
+                    self.getTableKey(viewName)
+                )
+        return
+
+    # Function that registers a cache with the tables (or views) it reads
+    def register(
+        self, name: str, tables: list, invalidateFunction: object
+    ) -> CacheEntry:
+        entry = CacheEntry(
+            name=name, tables=list(tables), invalidateFunction=invalidateFunction
+        )
+        with self.lock:
+            self.entries[name] = entry
+            for tableName in entry.tables:
+                self.tableEntries.setdefault(self.getTableKey(tableName), dict())[
+                    name
+                ] = entry
+        return entry
+
+    # Function that returns the caches depending on a table - directly or
+    # through the views over it
+    def getDependents(self, tableName: str) -> list:
+        tableKey = self.getTableKey(tableName)
+        with self.lock:
+            dependents = dict(self.tableEntries.get(tableKey, dict()))
+            for viewKey in self.viewTables.get(tableKey, set()):
+                dependents.update(self.tableEntries.get(viewKey, dict()))
+        return list(dependents.values())
+
+    # Function that invalidates the caches depending on the changed table
+    # Invalidation errors are logged so that they never fail the write itself
+    def publish(self, change: TableChange) -> list:
+        invalidated = list()
+        for entry in self.getDependents(tableName=change.tableName):
+            try:
+                entry.invalidateFunction(change)
+                invalidated.append(entry.name)
+                self.stats[entry.name] = self.stats.get(entry.name, 0) + 1
+            except Exception as err:
+                self.logger.error(f"Invalidation of cache {entry.name} failed.")
+                self.logger.error(err)
+        if len(invalidated) > 0:
+            self.logger.debug(
+                f"{change.tableName} changed - invalidated {', '.join(invalidated)}."
+            )
+        return invalidated
+
+    # Function that returns the number of invalidations of each cache
+    def getStats(self) -> dict:
+        return dict(self.stats)
+
@@ -65,6 +65,7 @@ class QuestionProps:
         allQuestions: pd.DataFrame,
         imageTypes: list,
         imageBaseURL: str,
+        detailsLoader: object = None,
     ):
         if self.qIndex is None:
             self.qIndex=0
@@ -91,12 +92,21 @@ class QuestionProps:
             self.qIndex+=moveTo      
             self.qIndex = max(0, min(maxQuestionIdx, self.qIndex))  
         self.updateProperties(
-            allQuestions=allQuestions, imageTypes=imageTypes, imageBaseURL=imageBaseURL,moveTo=moveTo
+            allQuestions=allQuestions, imageTypes=imageTypes, imageBaseURL=imageBaseURL,moveTo=moveTo,
+            detailsLoader=detailsLoader,
         )
         return
 
+    # Function that returns a column of the current question - from allQuestions,
+    # or for the lazily loaded heavy columns from the question details
+    def getQuestionValue(self, allQuestions: pd.DataFrame, column: str, questionDetails: dict):
+        if column in allQuestions:
+            return allQuestions[[column]].iloc[self.qIndex][0]
+        return None if questionDetails is None else questionDetails.get(column)
+
     def updateProperties(
-        self, allQuestions: pd.DataFrame, imageTypes: list, imageBaseURL: str,moveTo:int
+        self, allQuestions: pd.DataFrame, imageTypes: list, imageBaseURL: str,moveTo:int,
+        detailsLoader: object = None,
     ):
         oldQuestionCount = self.totalQuestions
         self.currentNumber = 0 if (self.currentNumber is None) else (self.currentNumber + moveTo)
@@ -104,7 +114,13 @@ class QuestionProps:
         self.qId = allQuestions[["QuestionId"]].iloc[self.qIndex][0]
         self.qCode = allQuestions[["QuestionCode"]].iloc[self.qIndex][0]
         self.answerOption = allQuestions[["AnswerOption"]].iloc[self.qIndex][0]
-        self.qLatex = allQuestions[["QuestionLatex"]].iloc[self.qIndex][0]
+        # detailsLoader(QuestionId) returns the heavy columns missing in allQuestions
+        questionDetails = None
+        if ("QuestionLatex" not in allQuestions) and (detailsLoader is not None):
+            questionDetails = detailsLoader(self.qId)
+        self.qLatex = self.getQuestionValue(
+            allQuestions=allQuestions, column="QuestionLatex", questionDetails=questionDetails
+        )
         
         # Update question metrics
         self.updateQuestionMetrics(allQuestions=allQuestions)
@@ -125,7 +141,9 @@ class QuestionProps:
             if allQuestions[["IsPrimaryKSC"]].iloc[self.qIndex][0]==1:
                 flag=1
                 partialURL = allQuestions[["KSCDiagramURL"]].iloc[self.qIndex][0]
-                self.imageURLs.append(imageBaseURL + partialURL.replace("~", ""))
+                self.imageURLs.append(
+                    self.getImageURL(imageBaseURL=imageBaseURL, partialURL=partialURL)
+                )
             self.qIndex=self.qIndex+1
             newQuestionId=allQuestions[["QuestionId"]].iloc[self.qIndex][0]    
 
@@ -136,14 +154,27 @@ class QuestionProps:
         for imageType in imageTypes:
             if imageType != "KSC":
                 urlColumn = f"{imageType}DiagramURL"
-                partialURL = allQuestions[[urlColumn]].iloc[self.qIndex][0]
-                self.imageURLs.append(imageBaseURL + partialURL.replace("~", ""))
+                partialURL = self.getQuestionValue(
+                    allQuestions=allQuestions, column=urlColumn, questionDetails=questionDetails
+                )
+                self.imageURLs.append(
+                    self.getImageURL(imageBaseURL=imageBaseURL, partialURL=partialURL)
+                )
             elif flag==0:
                 urlColumn = "KSCDiagramURL"
                 partialURL = allQuestions[[urlColumn]].iloc[self.qIndex][0]
-                self.imageURLs.append(imageBaseURL + partialURL.replace("~", ""))
+                self.imageURLs.append(
+                    self.getImageURL(imageBaseURL=imageBaseURL, partialURL=partialURL)
+                )
         return
 
+    # Function that returns the full URL of an image - None (no image shown) when
+    # the partial URL is missing, e.g. lazily loaded details that could not be read
+    def getImageURL(self, imageBaseURL: str, partialURL: str) -> str:
+        if (partialURL is None) or pd.isnull(partialURL):
+            return None
+        return imageBaseURL + partialURL.replace("~", "")
+
     def updateQuestionMetrics(self, allQuestions: pd.DataFrame):
         missingString = "Insufficient data"
         accuracy = allQuestions[["Accuracy"]].iloc[self.qIndex][0]
@@ -1,8 +1,25 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
+import threading
+import hashlib
+import time
 import logging
 
+from hierarchy import ContentHierarchy
+from reference import ReferenceData
+from graph import MappingGraph
+from incidence import QuestionKSCIncidence
+from loader import BatchLoader, RequestLoaders, ChapterKeys
+from bundles import ChapterBundleStore
+from prefetch import LRUCache
+from export import MappingExportWriter
+from exclusions import QuestionExclusions
+from cache import CacheDependencies, TableChange
+from strings import StringDictionary
+from lookup import QuestionLookupIndex
+from concurrent.futures import ThreadPoolExecutor
+
 
 class Data:
 
@@ -10,46 +27,404 @@ class Data:
     utils = None
     logger = None
 
-    def __init__(self, db, utils):
+    config: dict = None
+    referenceData: ReferenceData = None
+    contentHierarchy: ContentHierarchy = None
+    hierarchyRefreshThread: object = None
+    mappingGraph: MappingGraph = None
+    questionKSCIncidence: QuestionKSCIncidence = None
+    bundleStore: ChapterBundleStore = None
+    bundleVerifyTimes: dict = None
+    bundleRebuildThread: object = None
+    chapterPrefetcher: LRUCache = None
+    questionExclusions: QuestionExclusions = None
+    cacheDependencies: CacheDependencies = None
+    questionDetailsCache: LRUCache = None
+    chapterContentCache: LRUCache = None
+    chapterKeysCache: LRUCache = None
+    chapterRowChecksums: dict = None
+    questionLookup: QuestionLookupIndex = None
+    questionLookupChecksums: pd.Series = None
+    questionLookupStale: bool = False
+    questionLookupLock: object = None
+    kscDetails: pd.DataFrame = None
+    kscDetailsChecksums: pd.Series = None
+    questionIndex: pd.DataFrame = None
+    questionIndexChecksums: pd.Series = None
+    snapshotCheckTimes: dict = None
+    snapshotLock: object = None
+    warmUpThread: object = None
+    lastWarmUpTimings: dict = None
+    stringDictionary: StringDictionary = None
+    lastShardTimings: list = None
+
+    contentTypes = ["Course", "Class", "Subject", "Chapter"]
+
+    # Minimal projections of the mapping tables
+    courseChapterColumns = [
+        "CourseChapterId",
+        "CourseId",
+        "ClassId",
+        "SubjectId",
+        "ChapterId",
+    ]
+    kscClusterColumns = ["CourseChapterId", "KSCClusterId", "KSCClusterName"]
+    kscClusterKSCColumns = ["KSCClusterId", "KSCId", "DisplayRank", "IsVisible"]
+    courseKSCColumns = ["CourseChapterId", "KSCId"]
+    questionKSCColumns = ["QuestionId", "KSCId", "IsPrimaryKSC"]
+
+    # Columns of the question frame served for a chapter
+    chapterQuestionColumns = [
+        "QuestionId",
+        "QuestionCode",
+        "AnswerOption",
+        "QuestionDiagramURL",
+        "FullSolutionURL",
+        "QuestionLatex",
+    ]
+    # Large per-question columns that are only shown for the current question
+    # With lazyQuestionColumns they are left out of the chapter frames and
+    # fetched on demand with getQuestionDetails
+    heavyQuestionColumns = ["QuestionLatex", "QuestionDiagramURL", "FullSolutionURL"]
+    # Repeated string columns of the cached chapter frames kept as codes into the
+    # string dictionary (with internStrings) and decoded at the UI edge
+    internedColumns = [
+        "KSCText",
+        "KSCDiagramURL",
+        "QuestionDiagramURL",
+        "FullSolutionDiagramURL",
+    ]
+    chapterMetricsColumns = ["Attempted", "Correct", "TimeTaken"]
+
+    # Tables read to build the chapter question and KSC frames
+    chapterFrameTables = [
+        "KSCCluster",
+        "KSCClusterKSC",
+        "KSCView",
+        "QuestionKSCView",
+        "QuestionView",
+        "CourseChapterQuestionExclusion",
+        "QuestionMetrics",
+    ]
+    # Parquet types of the mapping export columns that can be all null in a group
+    exportColumnTypes = {
+        "KSCClusterName": "string",
+        "KSCText": "string",
+        "KSCDiagramURL": "string",
+        "QuestionCode": "string",
+        "AnswerOption": "string",
+        "QuestionDiagramURL": "string",
+        "FullSolutionURL": "string",
+        "QuestionLatex": "string",
+        "Attempted": "double",
+        "Correct": "double",
+        "TimeTaken": "double",
+    }
+    # Base tables of the views read by the caches - writes to them reach the
+    # caches registered on the views
+    defaultViewTables = {
+        "QuestionKSCView": ["QuestionKSC"],
+        "KSCView": ["KSC"],
+        "QuestionView": ["Question"],
+    }
+    # Mapping tables whose writes are applied to the mapping graph edges in place
+    mappingEdgeTables = {
+        "KSCCluster": "ChapterCluster",
+        "KSCClusterKSC": "ClusterKSC",
+        "QuestionKSC": "KSCQuestion",
+    }
+
+    def __init__(self, db, utils, config: dict = None):
         self.logger = logging.getLogger(__name__)
         self.db = db
         self.utils = utils
-    
-    # -------------------------------------------------- Content Data ------------------------------------------------ #
+        self.config = config if config is not None else dict()
+        self.initReferenceData()
+        if self.config.get("bundleDir") is not None:
+            self.bundleStore = ChapterBundleStore(
+                bundleDir=self.config["bundleDir"],
+                frameNames=["Questions", "KSCs"],
+                compression=self.config.get("bundleCompression", "zstd"),
+            )
+        self.chapterPrefetcher = LRUCache(
+            capacity=self.config.get("chapterCacheSize", 16),
+            maxWorkers=self.config.get("prefetchWorkers", 2),
+            name="Chapter",
+        )
+        self.questionExclusions = QuestionExclusions()
+        self.questionDetailsCache = LRUCache(
+            capacity=self.config.get("questionDetailsCacheSize", 64),
+            maxWorkers=1,
+            name="QuestionDetails",
+        )
+        self.stringDictionary = StringDictionary(
+            maxSize=self.config.get("internMaxStrings", 1000000)
+        )
+        self.chapterRowChecksums = dict()
+        self.bundleVerifyTimes = dict()
+        self.questionLookupLock = threading.Lock()
+        self.snapshotCheckTimes = dict()
+        self.snapshotLock = threading.Lock()
+        self.chapterContentCache = LRUCache(
+            capacity=self.config.get("chapterContentCacheSize", 32),
+            maxWorkers=1,
+            name="ChapterContent",
+        )
+        self.chapterKeysCache = LRUCache(
+            capacity=self.config.get("chapterKeysCacheSize", 64),
+            maxWorkers=1,
+            name="ChapterKeys",
+        )
+        self.initCacheDependencies()
 
-    # Function to get the list of CourseIds that are active for signup
-    def getActiveCourseIds(self, onlyQuery: bool = False) -> tuple:
+    # ------------------------------------------------ Reference Data ------------------------------------------------ #
+
+    # Function that registers the small dimension tables served from memory:
+    # the active CourseIds and the Course/Class/Subject/Chapter names
+    def initReferenceData(self):
+        self.referenceData = ReferenceData(
+            refreshSeconds=self.config.get("referenceRefreshSeconds", 300)
+        )
+        self.referenceData.register(
+            name="ActiveCourses",
+            loadFunction=self.loadActiveCourses,
+            checksumFunction=lambda: self.db.selectChecksum(
+                tableName="CourseView",
+                filterConditions=[("IsActiveForSignup", 1)],
+            ),
+        )
+        for content in self.contentTypes:
+            self.referenceData.register(
+                name=f"{content}Names",
+                loadFunction=lambda content=content: self.loadContentNames(
+                    content=content
+                ),
+                checksumFunction=lambda content=content: self.db.selectChecksum(
+                    tableName=f"{content}View",
+                    schemaName="new",
+                    filterConditions=[("IsActive", 1)],
+                ),
+            )
+        if self.config.get("referenceBackgroundRefresh", False):
+            self.referenceData.startRefresh()
+        return
 
-        activeCourses, query = self.db.selectWithWhere(
+    # Function that loads the active courses from CourseView
+    def loadActiveCourses(self) -> pd.DataFrame:
+        activeCourses, _ = self.db.selectWithWhere(
             tableName="CourseView",
             columnList=["CourseId"],
             filterColumn="IsActiveForSignup",
             filterValue=1,
-            onlyQuery=onlyQuery,
         )
+        return activeCourses
+
+    # Function that loads the active ids and names of one content type
+    def loadContentNames(self, content: str) -> pd.DataFrame:
+        data, _ = self.db.selectWithWhere(
+            tableName=f"{content}View",
+            schemaName="new",
+            columnList=[f"{content}Id", f"{content}Name"],
+            filterColumn="IsActive",
+            filterValue=1,
+        )
+        data.dropna(inplace=True)
+        return data
+    
+    # ---------------------------------------------- Cache Dependencies ---------------------------------------------- #
+
+    # Function that registers every in-memory cache with the tables it reads
+    # Writes through DBConnection publish table changes to the registry, which
+    # drops only the caches (and, where the changed ids are known, only the
+    # chapters) that read the changed table. Base tables of views default to
+    # defaultViewTables and can be overridden in the data.viewTables config
+    # ({view: [tables]})
+    def initCacheDependencies(self):
+        viewTables = dict(self.defaultViewTables)
+        viewTables.update(self.config.get("viewTables") or dict())
+        self.cacheDependencies = CacheDependencies(viewTables=viewTables)
+        self.db.addInvalidationListener(self.cacheDependencies.publish)
+
+        self.cacheDependencies.register(
+            name="ActiveCourses",
+            tables=["CourseView"],
+            invalidateFunction=lambda change: self.referenceData.invalidate(
+                name="ActiveCourses"
+            ),
+        )
+        for content in self.contentTypes:
+            self.cacheDependencies.register(
+                name=f"{content}Names",
+                tables=[f"{content}View"],
+                invalidateFunction=lambda change, content=content: self.referenceData.invalidate(
+                    name=f"{content}Names"
+                ),
+            )
+        self.cacheDependencies.register(
+            name="ContentHierarchy",
+            tables=["CourseChapter", "CourseView"]
+            + [f"{content}View" for content in self.contentTypes],
+            invalidateFunction=self.invalidateContentHierarchy,
+        )
+        self.cacheDependencies.register(
+            name="MappingGraph",
+            tables=["KSCCluster", "KSCClusterKSC", "QuestionKSCView"],
+            invalidateFunction=self.invalidateMappingGraph,
+        )
+        self.cacheDependencies.register(
+            name="ChapterKeys",
+            tables=["KSCCluster", "KSCClusterKSC"],
+            invalidateFunction=lambda change: self.chapterKeysCache.invalidate(),
+        )
+        self.cacheDependencies.register(
+            name="QuestionKSCIncidence",
+            tables=["QuestionKSCView"],
+            invalidateFunction=self.invalidateQuestionKSCIncidence,
+        )
+        self.cacheDependencies.register(
+            name="QuestionExclusions",
+            tables=["CourseChapterQuestionExclusion"],
+            invalidateFunction=lambda change: self.questionExclusions.invalidate(
+                courseChapterIds=self.getChangedChapterIds(change=change)
+            ),
+        )
+        self.cacheDependencies.register(
+            name="QuestionDetails",
+            tables=["QuestionView"],
+            invalidateFunction=self.invalidateQuestionDetails,
+        )
+        # Shared chapter content is keyed by the mapping fingerprint, so mapping and
+        # exclusion changes lead to new keys - only content changes invalidate it
+        self.cacheDependencies.register(
+            name="ChapterContent",
+            tables=["KSCView", "QuestionKSCView", "QuestionView"],
+            invalidateFunction=lambda change: self.chapterContentCache.invalidate(),
+        )
+        self.cacheDependencies.register(
+            name="KSCDetails",
+            tables=["KSCView"],
+            invalidateFunction=lambda change: setattr(self, "kscDetails", None),
+        )
+        self.cacheDependencies.register(
+            name="QuestionIndex",
+            tables=["QuestionView"],
+            invalidateFunction=lambda change: setattr(self, "questionIndex", None),
+        )
+        # The lookup index is patched incrementally on its next use
+        self.cacheDependencies.register(
+            name="QuestionLookup",
+            tables=["KSCCluster", "KSCClusterKSC", "QuestionKSCView", "QuestionView"],
+            invalidateFunction=lambda change: setattr(self, "questionLookupStale", True),
+        )
+        self.cacheDependencies.register(
+            name="ChapterFrames",
+            tables=self.chapterFrameTables,
+            invalidateFunction=self.invalidateChapterFrames,
+        )
+        # Bundles are dropped on writes made through this process and verified
+        # against the source checksums every bundleVerifySeconds (see getChapterFrames)
+        if self.bundleStore is not None:
+            self.cacheDependencies.register(
+                name="ChapterBundles",
+                tables=self.chapterFrameTables,
+                invalidateFunction=lambda change: self.bundleStore.invalidate(
+                    courseChapterIds=self.getChangedChapterIds(change=change)
+                ),
+            )
+        return
+
+    # Function that returns the CourseChapterIds touched by a table change - None
+    # when the change is not scoped by CourseChapterId
+    def getChangedChapterIds(self, change: TableChange) -> list:
+        courseChapterIds = change.getKeys(columnName="CourseChapterId")
+        return list(courseChapterIds) if courseChapterIds is not None else None
+
+    # The hierarchy is rebuilt on its next use
+    def invalidateContentHierarchy(self, change: TableChange):
+        self.contentHierarchy = None
+        return
+
+    # Writes that carry the (src, dst) pairs of a mapping table are applied to
+    # the graph edges in place. Any other change drops the graph - lookups fall
+    # back to the DB until it is loaded again
+    def invalidateMappingGraph(self, change: TableChange):
+        if self.mappingGraph is None:
+            return
+        edgeTypes = {
+            self.cacheDependencies.getTableKey(tableName): edgeType
+            for tableName, edgeType in self.mappingEdgeTables.items()
+        }
+        edgeType = edgeTypes.get(self.cacheDependencies.getTableKey(change.tableName))
+        if (edgeType is None) or (change.rows is None) or (
+            not set(MappingGraph.edgeTypes[edgeType]).issubset(change.rows.columns)
+        ):
+            self.mappingGraph = None
+            return
+
+        if change.isDelete:
+            self.updateMappingEdges(edgeType=edgeType, removedEdges=change.rows)
+        else:
+            self.updateMappingEdges(edgeType=edgeType, addedEdges=change.rows)
+        return
+
+    def invalidateQuestionKSCIncidence(self, change: TableChange):
+        self.questionKSCIncidence = None
+        return
+
+    # Function that drops the cached question details - only those of the changed
+    # questions when the change is scoped by QuestionId
+    def invalidateQuestionDetails(self, change: TableChange):
+        questionIds = change.getKeys(columnName="QuestionId")
+        self.questionDetailsCache.invalidate(
+            keyFilter=None if questionIds is None else (lambda key: key in questionIds)
+        )
+        return
+
+    # Function that drops the cached chapter frames - only the entries of the
+    # changed chapters when the change is scoped by CourseChapterId
+    def invalidateChapterFrames(self, change: TableChange):
+        courseChapterIds = self.getChangedChapterIds(change=change)
+        if courseChapterIds is None:
+            self.chapterPrefetcher.invalidate()
+        else:
+            courseChapterIds = set(courseChapterIds)
+            self.chapterPrefetcher.invalidate(
+                keyFilter=lambda key: len(courseChapterIds.intersection(key)) > 0
+            )
+        return
+
+    # -------------------------------------------------- Content Data ------------------------------------------------ #
+
+    # Function to get the list of CourseIds that are active for signup
+    def getActiveCourseIds(self, onlyQuery: bool = False) -> tuple:
 
         if onlyQuery:
+            _, query = self.db.selectWithWhere(
+                tableName="CourseView",
+                columnList=["CourseId"],
+                filterColumn="IsActiveForSignup",
+                filterValue=1,
+                onlyQuery=onlyQuery,
+            )
             return None, query
 
+        # Active courses are served from the in-memory reference data
+        activeCourses = self.referenceData.get("ActiveCourses")
+        query = self.db.getSelectWithWheresQuery(
+            tableName="CourseView", filterConditions=[("IsActiveForSignup", 1)]
+        )
+
         activeCourseIds = list(activeCourses["CourseId"])
         if len(activeCourseIds) == 0:
             self.logger.error("No active courses found.")
         return activeCourseIds, query
 
     # Function that returns a dictionary of all content ids and names
+    # The names are served from the in-memory reference data
     def getContentNames(self) -> dict:
         contentDict = dict()
-        contentTypes = ["Course", "Class", "Subject", "Chapter"]
-        for content in contentTypes:
-            data, _ = self.db.selectWithWhere(
-                tableName=f"{content}View",
-                schemaName="new",
-                columnList=[f"{content}Id", f"{content}Name"],
-                filterColumn="IsActive",
-                filterValue=1,
-            )
-            data.dropna(inplace=True)
-            contentDict[content] = data
+        for content in self.contentTypes:
+            contentDict[content] = self.referenceData.get(f"{content}Names").copy()
         return contentDict
 
     # Function to return the CourseChapterIds for a given list of
@@ -68,6 +443,33 @@ class Data:
             )
             content.courseIds = None
 
+        # Serve the request from the content hierarchy index when it is loaded
+        hierarchy = self.contentHierarchy
+        if (not onlyQuery) and (hierarchy is not None):
+            courseChapters = hierarchy.filterByIds(
+                courseIds=content.courseIds,
+                classIds=content.classIds,
+                subjectIds=content.subjectIds,
+                chapterIds=content.chapterIds,
+                columnList=columnList,
+                includeNames=includeNames,
+            )
+            baseQuery = self.db.getSelectWithWheresQuery(
+                tableName="CourseChapter",
+                filterConditions=[
+                    ("CourseId", content.courseIds),
+                    ("ClassId", content.classIds),
+                    ("SubjectId", content.subjectIds),
+                    ("ChapterId", content.chapterIds),
+                ]
+            )
+            if self.utils.isNullDataFrame(courseChapters):
+                self.logger.warn(
+                    f"No chapters found for CourseId={content.courseIds} and ChapterIds={content.chapterIds}"
+                )
+                return None, baseQuery
+            return courseChapters, baseQuery
+
         # Select the matching CourseChapterIds from CourseChapterView
         courseChapters, baseQuery = self.db.selectWithMultipleWheres(
             tableName="CourseChapter",
@@ -99,6 +501,65 @@ class Data:
 
         return courseChapters, baseQuery  
 
+    # Function that builds the in-memory content hierarchy index from all the
+    # CourseChapter rows and the active content names
+    def loadContentHierarchy(self) -> ContentHierarchy:
+        courseChapters, _ = self.db.selectTable(
+            tableName="CourseChapter", columnList=self.courseChapterColumns
+        )
+        if self.utils.isNullDataFrame(courseChapters):
+            self.logger.warn("No CourseChapters found - content hierarchy not built.")
+            return None
+
+        baseColumns = list(courseChapters.columns)
+        contentNames = self.getContentNames()
+        for content in contentNames:
+            if f"{content}Id" in courseChapters:
+                courseChapters = courseChapters.join(
+                    contentNames[content].set_index(f"{content}Id"),
+                    on=f"{content}Id",
+                    how="left",
+                )
+
+        activeCourseIds, _ = self.getActiveCourseIds()
+        hierarchy = ContentHierarchy(
+            courseChapters=courseChapters,
+            baseColumns=baseColumns,
+            activeCourseIds=activeCourseIds,
+        )
+        # Swapping the reference is atomic - readers see either the old or new index
+        self.contentHierarchy = hierarchy
+        return hierarchy
+
+    # Function that returns the content hierarchy index, building it on first use
+    def getContentHierarchy(self) -> ContentHierarchy:
+        if self.contentHierarchy is None:
+            self.loadContentHierarchy()
+        return self.contentHierarchy
+
+    # Function that rebuilds the content hierarchy index in a background thread
+    # every refreshSeconds. The current index keeps serving until the new one is ready
+    def startContentHierarchyRefresh(self, refreshSeconds: int) -> threading.Thread:
+        if self.hierarchyRefreshThread is not None:
+            return self.hierarchyRefreshThread
+
+        stopEvent = threading.Event()
+
+        def refreshHierarchy():
+            while not stopEvent.wait(refreshSeconds):
+                try:
+                    self.loadContentHierarchy()
+                except Exception as err:
+                    self.logger.error("Content hierarchy refresh failed.")
+                    self.logger.error(err)
+
+        self.hierarchyRefreshThread = threading.Thread(
+            target=refreshHierarchy, name="ContentHierarchyRefresh", daemon=True
+        )
+        self.hierarchyRefreshThread.stopEvent = stopEvent
+        self.hierarchyRefreshThread.start()
+        return self.hierarchyRefreshThread
+
     # Function to return the CourseKSCs for a given list of CourseChapterIds
     def getKSCsForCourseChapters(
         self,
@@ -106,45 +567,185 @@ class Data:
         columnList: list = None,
         includeKSCDetails: bool = False,
         onlyQuery: bool = False,
-    ) -> pd.DataFrame:
+    ) -> (pd.DataFrame, str):
         # Use the CourseChapterIds to get the list of applicable KSCs
         courseChapterIds = list(courseChapters["CourseChapterId"])
 
-        KSCCluster,_=self.db.selectWithWhere(
-            tableName="KSCCluster",
-            columnList=columnList,
-            filterColumn="CourseChapterId",
-            filterValue=courseChapterIds,
-            onlyQuery=False,
-        )
-        
-        courseKSCs,query=self.db.selectWithWhere(
-            tableName="KSCClusterKSC",
-            columnList=columnList,
-            filterColumn="KSCClusterId",
-            filterValue=list(KSCCluster["KSCClusterId"]),
-            onlyQuery=False
-        )
+        # The mapping graph (when loaded) answers the cluster and KSC lookups
+        # without a DB round trip
+        graph = self.mappingGraph
+        if graph is not None:
+            KSCCluster = graph.getEdges(edgeType="ChapterCluster", ids=courseChapterIds)
+        else:
+            KSCCluster,_=self.db.selectWithWhere(
+                tableName="KSCCluster",
+                columnList=["KSCClusterId"],
+                filterColumn="CourseChapterId",
+                filterValue=courseChapterIds,
+                onlyQuery=False,
+            )
+        kscClusterIds = list(KSCCluster["KSCClusterId"])
+        if len(kscClusterIds) == 0:
+            self.logger.warn(f"No KSCClusters found for CourseChapterIds={courseChapterIds}")
+            return None, None
+
         if onlyQuery:
+            query = self.db.getSelectWithWheresQuery(
+                tableName="KSCClusterKSC",
+                filterConditions=[("KSCClusterId", kscClusterIds)],
+            )
             return None, query
 
+        if columnList is None:
+            columnList = self.kscClusterKSCColumns
+        if graph is not None:
+            courseKSCs = graph.getEdges(edgeType="ClusterKSC", ids=kscClusterIds)
+            courseKSCs = courseKSCs[columnList]
+            query = None
+        else:
+            courseKSCs,query=self.db.selectWithWhere(
+                tableName="KSCClusterKSC",
+                columnList=columnList,
+                filterColumn="KSCClusterId",
+                filterValue=kscClusterIds,
+                onlyQuery=False
+            )
+
         if self.utils.isNullDataFrame(courseKSCs):
             self.logger.warn(f"No KSCs found for CourseChapterIds={courseChapterIds}")
             return None, None
 
         if includeKSCDetails:
-            kscDetails, _ = self.db.selectWithWhere(
-                tableName="KSCView",
-                columnList=["KSCId", "KSCText", "KSCDiagramURL"],
-                filterColumn="KSCId",
-                filterValue=list(courseKSCs["KSCId"]),
-                onlyQuery=False,
-            )
+            kscDetails = self.getKSCDetails(kscIds=list(courseKSCs["KSCId"]))
+            if self.utils.isNullDataFrame(kscDetails):
+                self.logger.warn(f"No KSC details found for CourseChapterIds={courseChapterIds}")
+                return None, query
             courseKSCs = courseKSCs.join(
                 kscDetails.set_index("KSCId"), on="KSCId", how="inner"
             )
 
-        return courseKSCs
+        return courseKSCs, query
+
+    # --------------------------------------------- Mapping Graph ------------------------------------------------- #
+
+    # Function that loads the whole CourseChapter -> KSCCluster -> KSC -> Question
+    # mapping into the in-process graph store with one query per edge type
+    def loadMappingGraph(self) -> MappingGraph:
+        chapterClusters, _ = self.db.selectTable(
+            tableName="KSCCluster", columnList=self.kscClusterColumns
+        )
+        clusterKSCs, _ = self.db.selectTable(
+            tableName="KSCClusterKSC", columnList=self.kscClusterKSCColumns
+        )
+        kscQuestions, _ = self.db.selectTable(
+            tableName="QuestionKSCView",
+            columnList=["KSCId", "QuestionId", "IsPrimaryKSC"],
+        )
+        edgeData = {
+            "ChapterCluster": chapterClusters,
+            "ClusterKSC": clusterKSCs,
+            "KSCQuestion": kscQuestions,
+        }
+        for edgeType, data in edgeData.items():
+            if self.utils.isNullDataFrame(data):
+                self.logger.warn(f"No {edgeType} mappings found - mapping graph not built.")
+                return None
+
+        self.mappingGraph = MappingGraph(edgeData=edgeData)
+        return self.mappingGraph
+
+    # Function that returns the mapping graph, loading it on first use
+    def getMappingGraph(self) -> MappingGraph:
+        if self.mappingGraph is None:
+            self.loadMappingGraph()
+        return self.mappingGraph
+
+    # Function that applies saved mapping changes to the graph store so that it
+    # stays in sync without a full reload. edgeType is one of ChapterCluster,
+    # ClusterKSC or KSCQuestion (see MappingGraph.edgeTypes)
+    def updateMappingEdges(
+        self,
+        edgeType: str,
+        addedEdges: pd.DataFrame = None,
+        removedEdges: pd.DataFrame = None,
+    ):
+        if self.mappingGraph is None:
+            return
+        self.mappingGraph.updateEdges(
+            edgeType=edgeType, addedEdges=addedEdges, removedEdges=removedEdges
+        )
+        return
+
+    # Function to return the CourseChapters that contain any of the given KSCs
+    def getCourseChaptersForKSCIds(self, kscIds: list) -> pd.DataFrame:
+        return self.getMappingGraph().getCourseChaptersForKSCs(kscIds=kscIds)
+
+    # Function to return the (CourseChapterId, QuestionId) pairs for the given
+    # CourseChapterIds from the mapping graph
+    def getQuestionIdsForCourseChapterIds(self, courseChapterIds: list) -> pd.DataFrame:
+        return self.getMappingGraph().getQuestionsForCourseChapters(
+            courseChapterIds=courseChapterIds
+        )
+
+    # ------------------------------------------- Mapping Analytics ------------------------------------------------ #
+
+    # Function that returns the cached sparse question x KSC incidence matrices,
+    # built from the mapping graph when loaded or from QuestionKSCView otherwise
+    def getQuestionKSCIncidence(self, refresh: bool = False) -> QuestionKSCIncidence:
+        if (self.questionKSCIncidence is not None) and (not refresh):
+            return self.questionKSCIncidence
+
+        if self.mappingGraph is not None:
+            questionKSCs = self.mappingGraph.edges["KSCQuestion"].edges
+        else:
+            questionKSCs, _ = self.db.selectTable(
+                tableName="QuestionKSCView",
+                columnList=["QuestionId", "KSCId", "IsPrimaryKSC"],
+            )
+        if self.utils.isNullDataFrame(questionKSCs):
+            self.logger.warn("No QuestionKSC mappings found.")
+            return None
+
+        self.questionKSCIncidence = QuestionKSCIncidence(questionKSCs=questionKSCs)
+        return self.questionKSCIncidence
+
+    # Function to return the QuestionIds that have no primary KSC
+    def getQuestionsWithoutPrimaryKSC(self) -> list:
+        return list(self.getQuestionKSCIncidence().getQuestionsWithoutPrimaryKSC())
+
+    # Function to return the KSCIds (of the given chapters, or of all clusters)
+    # that have no questions mapped to them
+    def getKSCsWithoutQuestions(self, courseChapters: pd.DataFrame = None) -> list:
+        graph = self.getMappingGraph()
+        if courseChapters is not None:
+            chapterKSCs = graph.getKSCsForCourseChapters(
+                courseChapterIds=list(courseChapters["CourseChapterId"])
+            )
+            kscIds = chapterKSCs["KSCId"]
+        else:
+            kscIds = graph.edges["ClusterKSC"].edges["KSCId"]
+        return list(self.getQuestionKSCIncidence().getKSCsWithoutQuestions(kscIds=kscIds))
+
+    # Function to return the KSC and question coverage for each CourseChapter
+    def getChapterCoverage(self, courseChapters: pd.DataFrame) -> pd.DataFrame:
+        chapterKSCs = self.getMappingGraph().getKSCsForCourseChapters(
+            courseChapterIds=list(courseChapters["CourseChapterId"])
+        )
+        return self.getQuestionKSCIncidence().getChapterCoverage(chapterKSCs=chapterKSCs)
+
+    # Function to return the pairs of KSCClusters (of the given chapters) that
+    # share questions, with the number of shared questions
+    def getKSCClusterOverlap(self, courseChapters: pd.DataFrame) -> pd.DataFrame:
+        graph = self.getMappingGraph()
+        kscClusters = graph.getEdges(
+            edgeType="ChapterCluster", ids=list(courseChapters["CourseChapterId"])
+        )
+        clusterKSCs = graph.getEdges(
+            edgeType="ClusterKSC", ids=list(kscClusters["KSCClusterId"])
+        )
+        return self.getQuestionKSCIncidence().getClusterOverlap(
+            clusterKSCs=clusterKSCs[["KSCClusterId", "KSCId"]]
+        )
 
     # Function to fetch existing KSCClusterKSC mappings from DB
     def getKSCClusterKSCs(
@@ -185,7 +786,7 @@ class Data:
         # Use the CourseChapterIds to get the list of applicable KSCs
         courseKSCs, _ = self.db.selectWithSQL(
             tableName="CourseKSC",
-            columnList=columnList,
+            columnList=columnList if columnList is not None else self.courseKSCColumns,
             filterColumn="CourseChapterId",
             filterQuery=courseChaptersQuery,
             onlyQuery=False,
@@ -199,17 +800,117 @@ class Data:
 
     # Function to get the list of questions that are excluded from specific
     # coursechapters in the CourseChapterQuestionExclusion table
+    # The exclusions are served from the per-chapter exclusion cache
     def getExcludedQuestions(self, courseChapters: pd.DataFrame):
+        chapterExclusions = self.questionExclusions.get(
+            courseChapterIds=list(pd.unique(courseChapters["CourseChapterId"])),
+            loadFunction=self.loadExcludedQuestions,
+        )
+        excludedQuestions = pd.DataFrame(
+            {
+                "CourseChapterId": np.repeat(
+                    list(chapterExclusions.keys()),
+                    [len(ids) for ids in chapterExclusions.values()],
+                ),
+                "QuestionId": np.concatenate(
+                    [np.array([], dtype=np.int64)] + list(chapterExclusions.values())
+                ),
+            }
+        )
+        if self.utils.isNullDataFrame(excludedQuestions):
+            return None
+        return excludedQuestions
+
+    # Function that reads the exclusions of the given CourseChapterIds from DB
+    def loadExcludedQuestions(self, courseChapterIds: list) -> pd.DataFrame:
         excludedQuestions, _ = self.db.selectWithWhere(
             tableName="CourseChapterQuestionExclusion",
+            columnList=["CourseChapterId", "QuestionId"],
             filterColumn="CourseChapterId",
-            filterValue=list(courseChapters["CourseChapterId"]),
+            filterValue=courseChapterIds,
             onlyQuery=False,
         )
-        if self.utils.isNullDataFrame(excludedQuestions):
-            return None
         return excludedQuestions
 
+    # Function that returns a boolean mask of the question rows (QuestionId, KSCId)
+    # excluded for the given course chapters. An exclusion only applies to its own
+    # chapter - a row is excluded when it is excluded in every chapter of the
+    # group that maps its KSC
+    def getExclusionMask(
+        self, courseChapters: pd.DataFrame, questions: pd.DataFrame
+    ) -> np.ndarray:
+        courseChapterIds = list(pd.unique(courseChapters["CourseChapterId"]))
+        chapterExclusions = self.questionExclusions.get(
+            courseChapterIds=courseChapterIds, loadFunction=self.loadExcludedQuestions
+        )
+        if all(len(excludedIds) == 0 for excludedIds in chapterExclusions.values()):
+            return np.zeros(questions.shape[0], dtype=bool)
+        if len(courseChapterIds) == 1:
+            return self.questionExclusions.contains(
+                excludedIds=chapterExclusions[courseChapterIds[0]],
+                questionIds=questions["QuestionId"].to_numpy(),
+            )
+
+        chapterKSCs = self.getChapterKSCPairs(courseChapterIds=courseChapterIds)
+        if self.utils.isNullDataFrame(chapterKSCs):
+            return np.zeros(questions.shape[0], dtype=bool)
+        rowChapters = (
+            questions[["QuestionId", "KSCId"]]
+            .assign(RowIdx=np.arange(questions.shape[0]))
+            .merge(
+                chapterKSCs[["CourseChapterId", "KSCId"]].drop_duplicates(),
+                on="KSCId",
+                how="inner",
+            )
+        )
+        isExcluded = self.getChapterExclusionMask(
+            chapterQuestions=rowChapters, chapterExclusions=chapterExclusions
+        )
+        rowExcluded = (
+            pd.Series(isExcluded)
+            .groupby(rowChapters["RowIdx"].to_numpy())
+            .all()
+            .reindex(np.arange(questions.shape[0]), fill_value=False)
+        )
+        return rowExcluded.to_numpy()
+
+    # Function that returns a boolean mask of the (CourseChapterId, QuestionId)
+    # rows that are excluded in their own chapter
+    def getChapterExclusionMask(
+        self, chapterQuestions: pd.DataFrame, chapterExclusions: dict = None
+    ) -> np.ndarray:
+        if chapterExclusions is None:
+            chapterExclusions = self.questionExclusions.get(
+                courseChapterIds=list(pd.unique(chapterQuestions["CourseChapterId"])),
+                loadFunction=self.loadExcludedQuestions,
+            )
+        isExcluded = np.zeros(chapterQuestions.shape[0], dtype=bool)
+        for courseChapterId, positions in chapterQuestions.groupby(
+            "CourseChapterId", sort=False
+        ).indices.items():
+            isExcluded[positions] = self.questionExclusions.contains(
+                excludedIds=chapterExclusions[courseChapterId],
+                questionIds=chapterQuestions["QuestionId"].to_numpy()[positions],
+            )
+        return isExcluded
+
+    # Function that replaces the exclusions of the given CourseChapterIds with the
+    # (CourseChapterId, QuestionId) rows in exclusions and drops their cache entries
+    def saveExcludedQuestions(
+        self, courseChapterIds: list, exclusions: pd.DataFrame
+    ) -> bool:
+        with self.db.readYourWrites():
+            try:
+                result = self.db.execReplaceByData(
+                    tableName="CourseChapterQuestionExclusion",
+                    deleteData=pd.DataFrame({"CourseChapterId": courseChapterIds}),
+                    insertData=exclusions[["CourseChapterId", "QuestionId"]],
+                )
+            finally:
+                # Also covers writes that did not go through the invalidation events
+                self.questionExclusions.invalidate(courseChapterIds=courseChapterIds)
+        return result
+
     # Function to return the QuestionIds for a given list of CourseKSCs
     def getQuestionsForCourseChapters(
         self,
@@ -218,75 +919,239 @@ class Data:
         onlyPrimary: bool = False,
         includeMetrics: bool = False,
         metricsColumns: list = None,
+        shardSize: int = None,
+        asIterator: bool = False,
+        questionIds: list = None,
     ) -> pd.DataFrame:
-        _, baseQuery = self.getKSCsForCourseChapters(
-            courseChapters=courseChapters,  onlyQuery=True
-        )
-        courseKSCQuery = self.db.setSelectColumns(query=baseQuery, columnList=["KSCId"])
-        # Use the KSCIds to get the list of valid questions from
-        # QuestionKSCView where IsPrimaryKSC is true
-        questions, baseQuery = self.db.selectWithMultipleSQLs(
-            tableName="QuestionKSCView",
-            filterQueries=[("KSCId", courseKSCQuery)],
-            columnList=["QuestionId", "KSCId","IsPrimaryKSC"],
-            onlyQuery=False,
-        )
-        questionsQuery = self.db.setSelectColumns(
-            query=baseQuery, columnList=["QuestionId"]
-        )
-        # Remove excluded questions based on the CourseChapterQuestionExclusion table
-        excludedQuestions = self.getExcludedQuestions(courseChapters=courseChapters)
-        if not self.utils.isNullDataFrame(excludedQuestions):
-            questions = questions.loc[
-                ~questions["QuestionId"].isin(excludedQuestions["QuestionId"])
-            ]
-
-        # Add details for each question from QuestionView
-        questionDetails, _ = self.db.selectWithMultipleSQLs(
-            tableName="QuestionView",
-            columnList=columnList,
-            filterQueries=[
-                ("QuestionId", questionsQuery),
-                ("IsSuspended", 0),
-            ],
-        )
+        # Large chapter lists are split into shards that are extracted in parallel
+        if shardSize is None:
+            shardSize = self.config.get("questionShardSize")
+        if (shardSize is not None) and (
+            asIterator or (courseChapters.shape[0] > shardSize)
+        ):
+            return self.getQuestionsForChapterShards(
+                courseChapters=courseChapters,
+                shardSize=shardSize,
+                asIterator=asIterator,
+                columnList=columnList,
+                onlyPrimary=onlyPrimary,
+                includeMetrics=includeMetrics,
+                metricsColumns=metricsColumns,
+                questionIds=questionIds,
+            )
+        if asIterator:
+            # Not sharded - the whole result is the only frame of the iterator
+            questions = self.getQuestionsForCourseChapters(
+                courseChapters=courseChapters,
+                columnList=columnList,
+                onlyPrimary=onlyPrimary,
+                includeMetrics=includeMetrics,
+                metricsColumns=metricsColumns,
+                shardSize=shardSize,
+                questionIds=questionIds,
+            )
+            return iter([] if self.utils.isNullDataFrame(questions) else [questions])
 
-        if self.utils.isNullDataFrame(questionDetails):
-            self.logger.warn(f"No question details found for given CourseChapters.")
-            return None
+        # The KSC and question subqueries are each used by two selects - they are
+        # materialized once into session temp tables and dropped at the end
+        with self.db.tempTableSession():
+            _, baseQuery = self.getKSCsForCourseChapters(
+                courseChapters=courseChapters,  onlyQuery=True
+            )
+            # Chapters without KSCClusters have no KSCs and no questions
+            if baseQuery is None:
+                return None
+            courseKSCQuery = self.db.setSelectColumns(query=baseQuery, columnList=["KSCId"])
+            courseKSCQuery = self.db.materializeQuery(
+                query=courseKSCQuery,
+                tableName="CourseKSC",
+                columnList=["KSCId"],
+                indexColumns=["KSCId"],
+            )
+            # Use the KSCIds to get the list of valid questions from
+            # QuestionKSCView where IsPrimaryKSC is true
+            # With questionIds, only the rows of those questions are extracted
+            questionFilters = [("KSCId", courseKSCQuery)]
+            if questionIds is not None:
+                questionFilters.append(
+                    ("QuestionId", self.db.getSQLString(filterValue=list(questionIds)))
+                )
+            questions, baseQuery = self.db.selectWithMultipleSQLs(
+                tableName="QuestionKSCView",
+                filterQueries=questionFilters,
+                columnList=["QuestionId", "KSCId","IsPrimaryKSC"],
+                onlyQuery=False,
+            )
+            questionsQuery = self.db.setSelectColumns(
+                query=baseQuery, columnList=["QuestionId"]
+            )
+            questionsQuery = self.db.materializeQuery(
+                query=questionsQuery,
+                tableName="CourseQuestion",
+                columnList=["QuestionId"],
+                indexColumns=["QuestionId"],
+            )
+            # Remove excluded questions based on the CourseChapterQuestionExclusion table
+            if not self.utils.isNullDataFrame(questions):
+                questions = questions.loc[
+                    ~self.getExclusionMask(
+                        courseChapters=courseChapters, questions=questions
+                    )
+                ]
+
+            if self.utils.isNullDataFrame(questions):
+                self.logger.warn(f"No questions found for given CourseChapters.")
+                return None
+
+            # Add details for each question from QuestionView - from the warmed
+            # question index when it holds all the requested columns
+            self.refreshSnapshotsIfDue()
+            questionIndex = self.questionIndex
+            if (
+                (questionIndex is not None)
+                and (columnList is not None)
+                and set(columnList).issubset(questionIndex.columns)
+            ):
+                questionDetails = self.getQuestionIndexRows(
+                    questionIds=list(pd.unique(questions["QuestionId"])),
+                    columnList=columnList,
+                )
+            else:
+                questionDetails, _ = self.db.selectWithMultipleSQLs(
+                    tableName="QuestionView",
+                    columnList=columnList,
+                    filterQueries=[
+                        ("QuestionId", questionsQuery),
+                        ("IsSuspended", 0),
+                    ],
+                )
+
+            if self.utils.isNullDataFrame(questionDetails):
+                self.logger.warn(f"No question details found for given CourseChapters.")
+                return None
+
+            # Add KSC details for each question from KSCView
+            kscDetails = self.getKSCDetails(
+                kscIds=list(pd.unique(questions["KSCId"])), kscQuery=courseKSCQuery
+            )
 
-        # Add KSC details for each question from KSCView
-        kscDetails, _ = self.db.selectWithSQL(
-            tableName="KSCView",
-            columnList=["KSCId", "KSCText", "KSCDiagramURL"],
-            filterColumn="KSCId",
-            filterQuery=courseKSCQuery,
-        )
+            if self.utils.isNullDataFrame(kscDetails):
+                self.logger.warn(f"No KSC details found for given CourseChapters.")
+                return None
+
+            # Join questionDetails and kscDetails to questions data
+            questions = questions.merge(questionDetails, on="QuestionId", how="inner")
+            questions = questions.merge(kscDetails, on="KSCId", how="inner")
+
+            if includeMetrics:
+                questionMetrics, _ = self.db.selectWithMultipleSQLs(
+                    tableName="QuestionMetrics",
+                    filterQueries=[("QuestionId", questionsQuery), ("IsParentMetric", 0)],
+                    columnList=["QuestionId", "CourseChapterId"] + metricsColumns,
+                )
+                questionMetrics = questionMetrics.merge(
+                    courseChapters[["CourseChapterId"]],
+                    on="CourseChapterId",
+                    how="inner",
+                )
+                questions = questions.merge(questionMetrics, on="QuestionId", how="left")
 
-        if self.utils.isNullDataFrame(kscDetails):
-            self.logger.warn(f"No KSC details found for given CourseChapters.")
-            return None
+        questions.sort_values(by=[ "QuestionId"], inplace=True)
+        questions.reset_index(drop=True, inplace=True)
 
-        # Join questionDetails and kscDetails to questions data
-        questions = questions.merge(questionDetails, on="QuestionId", how="inner")
-        questions = questions.merge(kscDetails, on="KSCId", how="inner")
+        return questions
 
-        if includeMetrics:
-            questionMetrics, _ = self.db.selectWithMultipleSQLs(
-                tableName="QuestionMetrics",
-                filterQueries=[("QuestionId", questionsQuery), ("IsParentMetric", 0)],
-                columnList=["QuestionId", "CourseChapterId"] + metricsColumns,
+    # Function that shards the chapter list into groups of shardSize chapters and
+    # extracts the questions of each group on a worker pool (pooled connections)
+    # Results are concatenated in shard order, or yielded shard by shard with
+    # asIterator. Per-shard timings are logged and, once all shards are read,
+    # kept in lastShardTimings (in shard order)
+    # With includeMetrics, the metrics of all the chapters of the list are merged
+    # into every shard - as in the unsharded select, a question carries the
+    # metrics of every chapter, not only those of the chapters of its shard
+    def getQuestionsForChapterShards(
+        self,
+        courseChapters: pd.DataFrame,
+        shardSize: int,
+        asIterator: bool = False,
+        includeMetrics: bool = False,
+        metricsColumns: list = None,
+        **kwargs,
+    ):
+        shards = [
+            courseChapters.iloc[idx : idx + shardSize]
+            for idx in range(0, courseChapters.shape[0], shardSize)
+        ]
+
+        def extractShard(shardIdx: int, shard: pd.DataFrame) -> (pd.DataFrame, dict):
+            startTime = time.perf_counter()
+            questions = self.getQuestionsForCourseChapters(
+                courseChapters=shard, shardSize=None, **kwargs
             )
-            questionMetrics = questionMetrics.merge(
-                courseChapters[["CourseChapterId"]],
-                on="CourseChapterId",
-                how="inner",
+            shardTiming = {
+                "shard": shardIdx,
+                "chapters": shard.shape[0],
+                "rows": 0 if questions is None else questions.shape[0],
+                "seconds": time.perf_counter() - startTime,
+            }
+            self.logger.info(
+                f"Question shard {shardIdx + 1}/{len(shards)}: {shardTiming['chapters']} chapters, "
+                + f"{shardTiming['rows']} rows in {shardTiming['seconds']:.2f} seconds."
             )
-            questions = questions.merge(questionMetrics, on="QuestionId", how="left")
+            return questions, shardTiming
 
-        questions.sort_values(by=[ "QuestionId"], inplace=True)
-        questions.reset_index(drop=True, inplace=True)
+        executor = ThreadPoolExecutor(
+            max_workers=self.config.get("extractWorkers", 4),
+            thread_name_prefix="QuestionShard",
+        )
+        # Shards read with the routing state of the caller (read-your-writes pin)
+        extractShard = self.db.bindRoutingContext(function=extractShard)
+        futures = [
+            executor.submit(extractShard, shardIdx, shard)
+            for shardIdx, shard in enumerate(shards)
+        ]
+        executor.shutdown(wait=False)
+
+        def iterShards():
+            shardTimings = list()
+            questionMetrics = None
+            try:
+                for future in futures:
+                    questions, shardTiming = future.result()
+                    shardTimings.append(shardTiming)
+                    if self.utils.isNullDataFrame(questions):
+                        continue
+                    if includeMetrics:
+                        if questionMetrics is None:
+                            questionMetrics = self.getChapterMetrics(
+                                courseChapters=courseChapters,
+                                metricsColumns=metricsColumns,
+                            )
+                        questions = questions.merge(
+                            questionMetrics, on="QuestionId", how="left"
+                        )
+                    yield questions
+                self.lastShardTimings = shardTimings
+            finally:
+                for future in futures:
+                    future.cancel()
+
+        if asIterator:
+            return iterShards()
+
+        shardFrames = list(iterShards())
+        if len(shardFrames) == 0:
+            self.logger.warn(f"No questions found for given CourseChapters.")
+            return None
 
+        # Questions of KSCs shared by chapters in different shards are returned
+        # by each of those shards
+        questions = pd.concat(shardFrames, axis=0, ignore_index=True)
+        questions = questions.drop_duplicates(
+            subset=[col for col in questions.columns if col in ("QuestionId", "KSCId", "CourseChapterId")]
+        )
+        questions.sort_values(by=["QuestionId"], kind="stable", inplace=True)
+        questions.reset_index(drop=True, inplace=True)
         return questions
 
     # Function to return the QuestionIds for a given list of CourseKSCs
@@ -294,19 +1159,20 @@ class Data:
         self,
         courseKSCs: pd.DataFrame,
         columnList: list = None,
-        onlyPrimary: bool = False,
+        onlyPrimary: bool = True,
     ) -> pd.DataFrame:
         # Set the filter conditions for questions
         kscIds = list(courseKSCs["KSCId"])
-        filterConditions = [("KSCId", kscIds, False)]
+        filterConditions = [("KSCId", kscIds)]
         if onlyPrimary:
-            filterConditions += [("IsPrimaryKSC", 1, False)]
+            filterConditions += [("IsPrimaryKSC", 1)]
         # Use the KSCIds to get the list of valid questions from
-        # QuestionKSCView where IsPrimaryKSC is true
-        questions, _ = self.db.selectMultipleWheres(
+        # QuestionKSCView where IsPrimaryKSC is true (all mappings without
+        # onlyPrimary)
+        questions, _ = self.db.selectWithMultipleWheres(
             tableName="QuestionKSCView",
-            columnList=columnList,
-            filterConditions=[("KSCId", kscIds), ("IsPrimaryKSC", 1)],
+            columnList=columnList if columnList is not None else self.questionKSCColumns,
+            filterConditions=filterConditions,
             onlyQuery=False,
         )
 
@@ -325,9 +1191,34 @@ class Data:
         columnList: list = None,
     ) -> pd.DataFrame:
 
+        filterQueries = self.getQuestionKSCReviewFilters(courseChapters=courseChapters)
+        if filterQueries is None:
+            return None
+
+        # Use the QuestionIds and KSCIds to get the list of existing
+        # QuestionKSCReviews from DB
+        questionReviews, _ = self.db.selectWithMultipleSQLs(
+            tableName=dbTableName,
+            columnList=columnList,
+            filterQueries=filterQueries,
+        )
+
+        if self.utils.isNullDataFrame(questionReviews):
+            self.logger.debug(
+                f"No QuestionReviews found for courseChapters={courseChapters}"
+            )
+            return None
+
+        return questionReviews
+
+    # Function that returns the (QuestionId, KSCId) subquery filters selecting the
+    # QuestionKSCReview rows of the given course chapters
+    def getQuestionKSCReviewFilters(self, courseChapters: pd.DataFrame) -> list:
         _, baseQuery = self.getKSCsForCourseChapters(
             courseChapters=courseChapters, onlyQuery=True
         )
+        if baseQuery is None:
+            return None
         kscQuery = self.db.setSelectColumns(query=baseQuery, columnList=["KSCId"])
 
         _, baseQuery = self.db.selectWithMultipleSQLs(
@@ -338,22 +1229,89 @@ class Data:
         questionQuery = self.db.setSelectColumns(
             query=baseQuery, columnList=["QuestionId"]
         )
+        return [("QuestionId", questionQuery), ("KSCId", kscQuery)]
+
+    # Function that brings a cached QuestionKSCReview frame up to date by fetching
+    # only the rows with watermarkColumn at or after the cached watermark
+    # Changed rows replace their cached versions by keyColumns (the table's
+    # primary key by default), and a key-only reconciliation query drops the
+    # cached rows deleted since. Without a cached frame, all rows are fetched
+    # Returns the review frame and its new watermark
+    def getQuestionKSCReviewsDelta(
+        self,
+        dbTableName: str,
+        courseChapters: pd.DataFrame,
+        cachedReviews: pd.DataFrame = None,
+        watermark: datetime = None,
+        columnList: list = None,
+        keyColumns: list = None,
+        watermarkColumn: str = "UpdatedOn",
+        reconcileDeletes: bool = True,
+    ) -> (pd.DataFrame, datetime):
+        keyColumns = keyColumns if keyColumns is not None else [f"{dbTableName}Id"]
+        if columnList is not None:
+            columnList = list(
+                dict.fromkeys(keyColumns + [watermarkColumn] + list(columnList))
+            )
 
-        # Use the QuestionIds and KSCIds to get the list of existing
-        # QuestionKSCReviews from DB
-        questionReviews, _ = self.db.selectWithMultipleSQLs(
+        filterQueries = self.getQuestionKSCReviewFilters(courseChapters=courseChapters)
+        if filterQueries is None:
+            return None, None
+
+        isIncremental = (cachedReviews is not None) and (watermark is not None)
+        if not self.db.checkTableExists(tableName=dbTableName, schemaName=None):
+            self.logger.warn(f"Select statement failed - {dbTableName} does not exist.")
+            return cachedReviews, watermark
+        deltaQuery = self.db.getSelectWithSQLsQuery(
             tableName=dbTableName,
             columnList=columnList,
-            filterQueries=[("QuestionId", questionQuery), ("KSCId", kscQuery)],
+            filterQueries=filterQueries,
         )
-
-        if self.utils.isNullDataFrame(questionReviews):
-            self.logger.debug(
-                f"No QuestionReviews found for courseChapters={courseChapters}"
+        if isIncremental:
+            # Rows saved in the same instant as the watermark are fetched again -
+            # they are deduplicated by key below
+            deltaQuery = self.db.addDatesFilterToQuery(
+                query=deltaQuery,
+                dateColumn=watermarkColumn,
+                dateStart=watermark,
+                includeStart=True,
             )
-            return None
+        deltaReviews = self.db.execSelectQuery(query=deltaQuery)
+
+        if not isIncremental:
+            questionReviews = deltaReviews
+        else:
+            questionReviews = cachedReviews
+            if not self.utils.isNullDataFrame(deltaReviews):
+                questionReviews = pd.concat(
+                    [cachedReviews, deltaReviews], axis=0, ignore_index=True
+                ).drop_duplicates(subset=keyColumns, keep="last")
+
+            if reconcileDeletes and not self.utils.isNullDataFrame(questionReviews):
+                keyQuery = self.db.getSelectWithSQLsQuery(
+                    tableName=dbTableName,
+                    columnList=keyColumns,
+                    filterQueries=filterQueries,
+                )
+                liveKeys = self.db.execSelectQuery(query=keyQuery)
+                if self.utils.isNullDataFrame(liveKeys):
+                    liveKeys = pd.DataFrame(columns=keyColumns)
+                isLive = pd.MultiIndex.from_frame(questionReviews[keyColumns]).isin(
+                    pd.MultiIndex.from_frame(liveKeys[keyColumns])
+                )
+                questionReviews = questionReviews.loc[isLive]
 
-        return questionReviews
+        if self.utils.isNullDataFrame(questionReviews):
+            return None, watermark
+        questionReviews = questionReviews.reset_index(drop=True)
+        newWatermark = questionReviews[watermarkColumn].max()
+        if (watermark is not None) and ((pd.isnull(newWatermark)) or (newWatermark < watermark)):
+            newWatermark = watermark
+        self.logger.debug(
+            f"{dbTableName}: {0 if deltaReviews is None else deltaReviews.shape[0]} rows fetched "
+            + f"({'delta' if isIncremental else 'full'}), watermark={newWatermark}"
+        )
+        return questionReviews, newWatermark
 
     # ----------------------------------------------- KSC Mapping Data ------------------------------------------------ #
 
@@ -365,25 +1323,37 @@ class Data:
     ) -> pd.DataFrame:
 
         kscIds = list(allKSCs["KSCId"])
-        courseKSCs, _ = self.db.selectWithWhere(
-            tableName="CourseKSC",
-            columnList=["KSCId", "CourseChapterId"],
-            filterColumn="KSCId",
-            filterValue=kscIds,
-            onlyQuery=False,
-        )
+        # The mapping graph (when loaded) answers the chapter and cluster lookups
+        # without a DB round trip
+        graph = self.mappingGraph
+        if graph is not None:
+            courseKSCs = graph.getCourseChaptersForKSCs(kscIds=kscIds)
+        else:
+            courseKSCs, _ = self.db.selectWithWhere(
+                tableName="CourseKSC",
+                columnList=["KSCId", "CourseChapterId"],
+                filterColumn="KSCId",
+                filterValue=kscIds,
+                onlyQuery=False,
+            )
 
         if self.utils.isNullDataFrame(courseKSCs):
             self.logger.warn(f"No data found for query={kscIds}")
             return None
 
-        kscClusters, _ = self.db.selectWithWhere(
-            tableName="KSCCluster",
-            columnList=["CourseChapterId", "KSCClusterId", "KSCClusterName"],
-            filterColumn="CourseChapterId",
-            filterValue=list(courseKSCs["CourseChapterId"]),
-            onlyQuery=False,
-        )
+        courseChapterIds = list(pd.unique(courseKSCs["CourseChapterId"]))
+        if graph is not None:
+            kscClusters = graph.getEdges(edgeType="ChapterCluster", ids=courseChapterIds)[
+                ["CourseChapterId", "KSCClusterId", "KSCClusterName"]
+            ]
+        else:
+            kscClusters, _ = self.db.selectWithWhere(
+                tableName="KSCCluster",
+                columnList=["CourseChapterId", "KSCClusterId", "KSCClusterName"],
+                filterColumn="CourseChapterId",
+                filterValue=courseChapterIds,
+                onlyQuery=False,
+            )
 
         allCoursesClusters = courseKSCs.join(
             kscClusters.set_index("CourseChapterId"), on="CourseChapterId", how="inner"
@@ -398,29 +1368,134 @@ class Data:
         )
         return allCoursesClusters
 
-    # Function to return the KSCCluster data for a given list of KSCIds
+    # Function that resolves the KSCCluster and KSCClusterKSC rows of the given
+    # course chapters with one read per table (none when the mapping graph is
+    # loaded). The result is passed as chapterKeys to the batched getters below
+    # so that a request resolves its keys only once. Resolved keys are cached per
+    # set of chapters until KSCCluster or KSCClusterKSC is written
+    def resolveChapterKeys(self, courseChapters: pd.DataFrame) -> ChapterKeys:
+        return self.chapterKeysCache.get(
+            key=self.getChapterKey(courseChapters=courseChapters),
+            loadFunction=lambda: self.loadChapterKeys(courseChapters=courseChapters),
+        )
+
+    # Function that reads the KSCCluster and KSCClusterKSC rows of the given
+    # course chapters (from the mapping graph when it is loaded)
+    def loadChapterKeys(self, courseChapters: pd.DataFrame) -> ChapterKeys:
+        courseChapterIds = list(pd.unique(courseChapters["CourseChapterId"]))
+        graph = self.mappingGraph
+        if graph is not None:
+            chapterClusters = graph.getEdges(edgeType="ChapterCluster", ids=courseChapterIds)
+        else:
+            chapterClusters, _ = self.db.selectWithWhere(
+                tableName="KSCCluster",
+                columnList=self.kscClusterColumns,
+                filterColumn="CourseChapterId",
+                filterValue=courseChapterIds,
+            )
+        if self.utils.isNullDataFrame(chapterClusters):
+            self.logger.warn(f"No KSCClusters found for CourseChapterIds={courseChapterIds}")
+            return None
+
+        kscClusterIds = list(pd.unique(chapterClusters["KSCClusterId"]))
+        if graph is not None:
+            clusterKSCs = graph.getEdges(edgeType="ClusterKSC", ids=kscClusterIds)
+        else:
+            clusterKSCs, _ = self.db.selectWithWhere(
+                tableName="KSCClusterKSC",
+                columnList=self.kscClusterKSCColumns,
+                filterColumn="KSCClusterId",
+                filterValue=kscClusterIds,
+            )
+        if self.utils.isNullDataFrame(clusterKSCs):
+            clusterKSCs = pd.DataFrame(columns=["KSCClusterId", "KSCId"])
+
+        return ChapterKeys(
+            courseChapterIds=courseChapterIds,
+            chapterClusters=chapterClusters,
+            clusterKSCs=clusterKSCs,
+        )
+
+    # Function that returns the KSCCluster rows of all the given chapters joined with their
+    # KSCClusterKSC rows - served entirely from the resolved chapterKeys, so only the
+    # kscClusterColumns and kscClusterKSCColumns projections are returned
     def getKSCClusterMappings(
         self,
         courseChapters: pd.DataFrame,
         columnList: list = None,
+        chapterKeys: ChapterKeys = None,
     ) -> pd.DataFrame:
-        return None
+        if chapterKeys is None:
+            chapterKeys = self.resolveChapterKeys(courseChapters=courseChapters)
+        if (chapterKeys is None) or self.utils.isNullDataFrame(chapterKeys.clusterKSCs):
+            return None
 
+        clusterKSCs = chapterKeys.clusterKSCs.drop(
+            columns=chapterKeys.clusterKSCs.columns.intersection(
+                chapterKeys.chapterClusters.columns.drop("KSCClusterId")
+            )
+        )
+        clusterMappings = chapterKeys.chapterClusters.merge(
+            clusterKSCs, on="KSCClusterId", how="inner"
+        )
+        if columnList is not None:
+            clusterMappings = clusterMappings[columnList]
+        clusterMappings.reset_index(drop=True, inplace=True)
+        return clusterMappings
+
+    # Function that returns the chapter rating reviews of all the given chapters
+    # with a single select
     def getChaptersRatingReviews(
         self,
         dbTableName: str,
         courseChapters: pd.DataFrame,
         columnList: list = None,
+        chapterKeys: ChapterKeys = None,
     ) -> pd.DataFrame:
-        return None
+        courseChapterIds = (
+            chapterKeys.courseChapterIds
+            if chapterKeys is not None
+            else list(pd.unique(courseChapters["CourseChapterId"]))
+        )
+        ratingReviews, _ = self.db.selectWithWhere(
+            tableName=dbTableName,
+            columnList=columnList,
+            filterColumn="CourseChapterId",
+            filterValue=courseChapterIds,
+        )
+        if self.utils.isNullDataFrame(ratingReviews):
+            self.logger.debug(
+                f"No ChapterRatingReviews found for CourseChapterIds={courseChapterIds}"
+            )
+            return None
+        return ratingReviews
 
+    # Function that returns the KSCCluster reviews of all the clusters of the given
+    # chapters with a single select
     def getKSCClusterReviews(
         self,
         dbTableName: str,
         courseChapters: pd.DataFrame,
         columnList: list = None,
+        chapterKeys: ChapterKeys = None,
     ) -> pd.DataFrame:
-        return None
+        if chapterKeys is None:
+            chapterKeys = self.resolveChapterKeys(courseChapters=courseChapters)
+        if chapterKeys is None:
+            return None
+
+        clusterReviews, _ = self.db.selectWithWhere(
+            tableName=dbTableName,
+            columnList=columnList,
+            filterColumn="KSCClusterId",
+            filterValue=chapterKeys.kscClusterIds,
+        )
+        if self.utils.isNullDataFrame(clusterReviews):
+            self.logger.debug(
+                f"No KSCClusterReviews found for CourseChapterIds={chapterKeys.courseChapterIds}"
+            )
+            return None
+        return clusterReviews
 
     def getKSCClustersforKSCIds(
         self,
@@ -431,31 +1506,49 @@ class Data:
 
         kscIds = list(allKSCs["KSCId"])
         courseChapterId = list(allKSCs["CourseChapterId"])
-        courseKSCs, _ = self.db.selectWithWhere(
-            tableName="CourseKSC",
-            columnList=["CourseChapterId", "KSCId"],
-            filterColumn="courseChapterId",
-            filterValue=courseChapterId,
-            onlyQuery=False,
-        )
+        # The mapping graph (when loaded) answers all three lookups without a DB
+        # round trip
+        graph = self.mappingGraph
+        if graph is not None:
+            courseKSCs = graph.getKSCsForCourseChapters(
+                courseChapterIds=list(pd.unique(allKSCs["CourseChapterId"]))
+            )
+        else:
+            courseKSCs, _ = self.db.selectWithWhere(
+                tableName="CourseKSC",
+                columnList=["CourseChapterId", "KSCId"],
+                filterColumn="courseChapterId",
+                filterValue=courseChapterId,
+                onlyQuery=False,
+            )
         if self.utils.isNullDataFrame(courseKSCs):
             self.logger.warn(f"No data found for query={kscIds}")
             return None
 
-        kscclustersId, _ = self.db.selectWithWhere(
-            tableName="KSCClusterKSC",
-            columnList=["KSCId", "KSCClusterId"],
-            filterColumn="KSCId",
-            filterValue=kscIds,
-            onlyQuery=False,
-        )
-        kscClustersName, _ = self.db.selectWithWhere(
-            tableName="KSCCluster",
-            columnList=["KSCClusterId", "KSCClusterName"],
-            filterColumn="KSCClusterId",
-            filterValue=list(kscclustersId["KSCClusterId"]),
-            onlyQuery=False,
-        )
+        if graph is not None:
+            kscclustersId = graph.getKSCClustersForKSCs(kscIds=kscIds)[
+                ["KSCId", "KSCClusterId"]
+            ]
+            kscClustersName = graph.getEdges(
+                edgeType="ChapterCluster",
+                ids=list(pd.unique(kscclustersId["KSCClusterId"])),
+                reverse=True,
+            )[["KSCClusterId", "KSCClusterName"]].drop_duplicates(subset=["KSCClusterId"])
+        else:
+            kscclustersId, _ = self.db.selectWithWhere(
+                tableName="KSCClusterKSC",
+                columnList=["KSCId", "KSCClusterId"],
+                filterColumn="KSCId",
+                filterValue=kscIds,
+                onlyQuery=False,
+            )
+            kscClustersName, _ = self.db.selectWithWhere(
+                tableName="KSCCluster",
+                columnList=["KSCClusterId", "KSCClusterName"],
+                filterColumn="KSCClusterId",
+                filterValue=list(kscclustersId["KSCClusterId"]),
+                onlyQuery=False,
+            )
 
         kscClusterMapping = courseKSCs.merge(
             kscclustersId,
@@ -477,7 +1570,7 @@ class Data:
         courseChapterIds = list(courseChapters["CourseChapterId"])
         courseKSCs, baseQuery = self.db.selectWithWhere(
             tableName="CourseKSC",
-            columnList=columnList,
+            columnList=columnList if columnList is not None else self.courseKSCColumns,
             filterColumn="CourseChapterId",
             filterValue=courseChapterIds,
             onlyQuery=False,
@@ -505,3 +1598,1242 @@ class Data:
         courseKSCs.reset_index(inplace=True, drop=True)
 
         return courseKSCs, baseQuery
+
+    # ------------------------------------------------ Batch Loaders ------------------------------------------------- #
+
+    # Function that returns a new set of request-scoped batch loaders for KSC,
+    # Question and KSCCluster details. Lookups queued on a loader within one
+    # callback are fetched with a single keyed select and memoized for the request
+    # Without questionColumns, the Question loader returns the (cached) heavy
+    # question columns of getQuestionDetails
+    def newRequestLoaders(self, questionColumns: list = None) -> RequestLoaders:
+        return RequestLoaders(
+            loaders={
+                "KSC": BatchLoader(
+                    batchFunction=lambda kscIds: self.getDetailsByIds(
+                        tableName="KSCView",
+                        keyColumn="KSCId",
+                        ids=kscIds,
+                        columnList=["KSCId", "KSCText", "KSCDiagramURL"],
+                    ),
+                    keyColumn="KSCId",
+                ),
+                "Question": BatchLoader(
+                    batchFunction=(
+                        lambda questionIds: self.getDetailsByIds(
+                            tableName="QuestionView",
+                            keyColumn="QuestionId",
+                            ids=questionIds,
+                            columnList=questionColumns,
+                        )
+                    )
+                    if questionColumns is not None
+                    else self.getQuestionDetails,
+                    keyColumn="QuestionId",
+                ),
+                "KSCCluster": BatchLoader(
+                    batchFunction=lambda kscClusterIds: self.getDetailsByIds(
+                        tableName="KSCCluster",
+                        keyColumn="KSCClusterId",
+                        ids=kscClusterIds,
+                        columnList=["KSCClusterId", "KSCClusterName", "CourseChapterId"],
+                    ),
+                    keyColumn="KSCClusterId",
+                ),
+            }
+        )
+
+    # Function to fetch the rows of a table for a list of ids in one select
+    def getDetailsByIds(
+        self, tableName: str, keyColumn: str, ids: list, columnList: list = None
+    ) -> pd.DataFrame:
+        if (columnList is not None) and (keyColumn not in columnList):
+            columnList = [keyColumn] + columnList
+        details, _ = self.db.selectWithWhere(
+            tableName=tableName,
+            columnList=columnList,
+            filterColumn=keyColumn,
+            filterValue=list(ids),
+            onlyQuery=False,
+        )
+        return details
+
+    # ----------------------------------------------- Chapter Bundles ------------------------------------------------ #
+
+    # Function that builds the final question (with Accuracy and AvgTimeTaken) and
+    # KSC frames the dashboard needs for the given course chapters
+    # With questionIds, only the question rows of those questions are built
+    def buildChapterFrames(
+        self, courseChapters: pd.DataFrame, questionIds: list = None
+    ) -> (pd.DataFrame, pd.DataFrame):
+        allKsc, _ = self.getKSCsForCourseChapters(
+            courseChapters=courseChapters, includeKSCDetails=True
+        )
+        if self.utils.isNullDataFrame(allKsc):
+            return None, None
+        if self.config.get("shareChapterContent", True) and (questionIds is None):
+            allQuestions = self.getSharedChapterQuestions(courseChapters=courseChapters)
+        else:
+            allQuestions = self.getQuestionsForCourseChapters(
+                courseChapters=courseChapters,
+                columnList=self.getChapterQuestionColumns(),
+                includeMetrics=True,
+                metricsColumns=self.chapterMetricsColumns,
+                questionIds=questionIds,
+            )
+        if self.utils.isNullDataFrame(allQuestions):
+            return None, None
+
+        allQuestions = self.addQuestionRatios(questions=allQuestions)
+        allQuestions.rename(
+            columns={"FullSolutionURL": "FullSolutionDiagramURL"}, inplace=True
+        )
+        allQuestions.reset_index(inplace=True, drop=True)
+
+        return allQuestions, allKsc
+
+    # Function that adds the Accuracy and AvgTimeTaken of each question row
+    def addQuestionRatios(self, questions: pd.DataFrame) -> pd.DataFrame:
+        questions["Accuracy"] = questions["Correct"] / questions["Attempted"]
+        questions["AvgTimeTaken"] = questions["TimeTaken"] / questions["Attempted"]
+        return questions
+
+    # Function that returns the question frame (with metrics) of the given course
+    # chapters. The question-KSC content is shared by all chapter sets with the
+    # same mapping fingerprint (e.g. one chapter used by several courses) and is
+    # cached once per fingerprint. Metrics stay per CourseChapterId
+    def getSharedChapterQuestions(self, courseChapters: pd.DataFrame) -> pd.DataFrame:
+        fingerprint = self.getChapterSetFingerprint(
+            courseChapterIds=list(pd.unique(courseChapters["CourseChapterId"]))
+        )
+        if fingerprint is None:
+            # Chapters without mapped KSCs - nothing to share
+            return self.getQuestionsForCourseChapters(
+                courseChapters=courseChapters,
+                columnList=self.getChapterQuestionColumns(),
+                includeMetrics=True,
+                metricsColumns=self.chapterMetricsColumns,
+            )
+        questions = self.chapterContentCache.get(
+            key=fingerprint,
+            loadFunction=lambda: self.getQuestionsForCourseChapters(
+                courseChapters=courseChapters,
+                columnList=self.getChapterQuestionColumns(),
+            ),
+        )
+        if self.utils.isNullDataFrame(questions):
+            return None
+        return self.addChapterMetrics(questions=questions, courseChapters=courseChapters)
+
+    # Function that merges the metrics of the given course chapters into the
+    # question rows - one row per chapter with metrics for the question
+    def addChapterMetrics(
+        self, questions: pd.DataFrame, courseChapters: pd.DataFrame
+    ) -> pd.DataFrame:
+        questionMetrics = self.getChapterMetrics(
+            courseChapters=courseChapters, metricsColumns=self.chapterMetricsColumns
+        )
+        questions = questions.merge(questionMetrics, on="QuestionId", how="left")
+        questions[self.chapterMetricsColumns] = questions[
+            self.chapterMetricsColumns
+        ].astype(float)
+        questions.sort_values(by=["QuestionId"], kind="stable", inplace=True)
+        questions.reset_index(drop=True, inplace=True)
+        return questions
+
+    # Function that returns the (QuestionId, CourseChapterId) metrics rows of the
+    # given course chapters
+    def getChapterMetrics(
+        self, courseChapters: pd.DataFrame, metricsColumns: list
+    ) -> pd.DataFrame:
+        questionMetrics, _ = self.db.selectWithMultipleWheres(
+            tableName="QuestionMetrics",
+            columnList=["QuestionId", "CourseChapterId"] + metricsColumns,
+            filterConditions=[
+                ("CourseChapterId", list(pd.unique(courseChapters["CourseChapterId"]))),
+                ("IsParentMetric", 0),
+            ],
+        )
+        if self.utils.isNullDataFrame(questionMetrics):
+            questionMetrics = pd.DataFrame(
+                columns=["QuestionId", "CourseChapterId"] + metricsColumns
+            )
+        return questionMetrics
+
+    # Function that returns the mapping fingerprint of each CourseChapter - a hash
+    # of its KSCIds and excluded QuestionIds, which determine its questions
+    def getChapterFingerprints(self, courseChapterIds: list) -> dict:
+        chapterKSCs = self.getChapterKSCPairs(courseChapterIds=courseChapterIds)
+        if self.utils.isNullDataFrame(chapterKSCs):
+            return dict()
+        chapterKSCIds = {
+            courseChapterId: np.unique(rows["KSCId"].to_numpy())
+            for courseChapterId, rows in chapterKSCs.groupby("CourseChapterId")
+        }
+        chapterExclusions = self.questionExclusions.get(
+            courseChapterIds=list(chapterKSCIds), loadFunction=self.loadExcludedQuestions
+        )
+        return {
+            courseChapterId: hashlib.sha1(
+                (
+                    ",".join(map(str, kscIds))
+                    + "|"
+                    + ",".join(map(str, chapterExclusions[courseChapterId]))
+                ).encode()
+            ).hexdigest()[:16]
+            for courseChapterId, kscIds in chapterKSCIds.items()
+        }
+
+    # Function that returns the fingerprint of a set of CourseChapters (None if
+    # any of them has no mapped KSCs)
+    def getChapterSetFingerprint(self, courseChapterIds: list) -> str:
+        fingerprints = self.getChapterFingerprints(courseChapterIds=courseChapterIds)
+        if len(fingerprints) < len(set(courseChapterIds)):
+            return None
+        return "-".join(sorted(fingerprints.values()))
+
+    # Function that returns the question and KSC frames for the given course
+    # chapters - served from the bundle store when it is configured
+    def getChapterFrames(
+        self, courseChapters: pd.DataFrame
+    ) -> (pd.DataFrame, pd.DataFrame):
+        if self.bundleStore is None:
+            return self.buildChapterFrames(courseChapters=courseChapters)
+
+        courseChapterIds = list(courseChapters["CourseChapterId"])
+        verifyIds = self.getBundleIdsToVerify(courseChapterIds=courseChapterIds)
+        versions = (
+            self.getChapterVersions(courseChapterIds=verifyIds)
+            if len(verifyIds) > 0
+            else dict()
+        )
+        verifyTime = time.monotonic()
+        for courseChapterId in verifyIds:
+            self.bundleVerifyTimes[courseChapterId] = verifyTime
+        questionFrames, kscFrames = list(), list()
+        for courseChapterId in courseChapterIds:
+            bundle = self.getChapterBundle(
+                courseChapterId=courseChapterId,
+                version=versions.get(courseChapterId),
+            )
+            questionFrames.append(bundle["Questions"])
+            kscFrames.append(bundle["KSCs"])
+
+        allQuestions = pd.concat(questionFrames, axis=0, ignore_index=True)
+        allKsc = pd.concat(kscFrames, axis=0, ignore_index=True)
+        if self.utils.isNullDataFrame(allQuestions) or self.utils.isNullDataFrame(allKsc):
+            return None, None
+        if len(set(courseChapterIds)) > 1:
+            return self.mergeChapterBundles(
+                courseChapters=courseChapters, allQuestions=allQuestions, allKsc=allKsc
+            )
+        allQuestions.sort_values(by=["QuestionId"], kind="stable", inplace=True)
+        allQuestions.reset_index(drop=True, inplace=True)
+        return allQuestions, allKsc
+
+    # Function that turns the concatenated bundles of several chapters into the
+    # frames buildChapterFrames returns for the whole set - rows mapped by more
+    # than one chapter are kept once, the exclusions are applied across the set
+    # and the metrics of every chapter of the set are merged again
+    def mergeChapterBundles(
+        self,
+        courseChapters: pd.DataFrame,
+        allQuestions: pd.DataFrame,
+        allKsc: pd.DataFrame,
+    ) -> (pd.DataFrame, pd.DataFrame):
+        allKsc = allKsc.drop_duplicates(subset=["KSCClusterId", "KSCId"])
+        allKsc = allKsc.reset_index(drop=True)
+
+        metricsColumns = ["CourseChapterId", "Accuracy", "AvgTimeTaken"]
+        metricsColumns += self.chapterMetricsColumns
+        questions = allQuestions.drop(
+            columns=allQuestions.columns.intersection(metricsColumns)
+        )
+        questions = questions.drop_duplicates(subset=["QuestionId", "KSCId"])
+        questions = questions.reset_index(drop=True)
+        questions = questions.loc[
+            ~self.getExclusionMask(courseChapters=courseChapters, questions=questions)
+        ]
+        if self.utils.isNullDataFrame(questions):
+            return None, None
+        questions = self.addChapterMetrics(questions=questions, courseChapters=courseChapters)
+        return self.addQuestionRatios(questions=questions), allKsc
+
+    # Function that returns the chapters whose bundles have to be checked against
+    # the source checksums before they are served - all of them with
+    # bundleVerifyOnRead, else those not verified in the last bundleVerifySeconds
+    # Writes made through this process invalidate the bundles right away, the
+    # TTL bounds how long changes made elsewhere can be served stale
+    def getBundleIdsToVerify(self, courseChapterIds: list) -> list:
+        if self.config.get("bundleVerifyOnRead", False):
+            return list(courseChapterIds)
+        verifySeconds = self.config.get("bundleVerifySeconds", 600)
+        now = time.monotonic()
+        return [
+            courseChapterId
+            for courseChapterId in courseChapterIds
+            if (courseChapterId not in self.bundleVerifyTimes)
+            or (now - self.bundleVerifyTimes[courseChapterId] >= verifySeconds)
+        ]
+
+    # Function that returns the bundle of one CourseChapter, rebuilding it if the
+    # requested version is not on disk
+    def getChapterBundle(self, courseChapterId: int, version: str = None) -> dict:
+        bundle = self.bundleStore.read(courseChapterId=courseChapterId, version=version)
+        if bundle is None:
+            bundle = self.buildChapterBundle(
+                courseChapterId=courseChapterId, version=version
+            )
+        return bundle
+
+    # Function that builds and stores the bundle of one CourseChapter
+    def buildChapterBundle(self, courseChapterId: int, version: str = None) -> dict:
+        if version is None:
+            version = self.getChapterVersions(courseChapterIds=[courseChapterId])[
+                courseChapterId
+            ]
+        courseChapters = pd.DataFrame({"CourseChapterId": [courseChapterId]})
+        allQuestions, allKsc = self.buildChapterFrames(courseChapters=courseChapters)
+        if allQuestions is None:
+            # The KSCs of a chapter without questions are still part of the
+            # frames of any chapter set it belongs to
+            allKsc, _ = self.getKSCsForCourseChapters(
+                courseChapters=courseChapters, includeKSCDetails=True
+            )
+        bundle = {
+            "Questions": allQuestions if allQuestions is not None else pd.DataFrame(),
+            "KSCs": allKsc if allKsc is not None else pd.DataFrame(),
+        }
+        self.bundleStore.write(
+            courseChapterId=courseChapterId, version=version, bundle=bundle
+        )
+        return bundle
+
+    # Function that regenerates only the bundles whose source rows have changed
+    # since they were built. Returns the list of rebuilt CourseChapterIds
+    def rebuildChapterBundles(self, courseChapterIds: list = None) -> list:
+        if courseChapterIds is None:
+            courseChapters, _ = self.db.selectTable(
+                tableName="CourseChapter", columnList=["CourseChapterId"]
+            )
+            courseChapterIds = list(courseChapters["CourseChapterId"])
+
+        startTime = time.perf_counter()
+        versions = self.getChapterVersions(courseChapterIds=courseChapterIds)
+        changedIds = [
+            courseChapterId
+            for courseChapterId in courseChapterIds
+            if self.bundleStore.getVersion(courseChapterId=courseChapterId)
+            != versions[courseChapterId]
+        ]
+        for courseChapterId in changedIds:
+            self.buildChapterBundle(
+                courseChapterId=courseChapterId, version=versions[courseChapterId]
+            )
+        verifyTime = time.monotonic()
+        for courseChapterId in courseChapterIds:
+            self.bundleVerifyTimes[courseChapterId] = verifyTime
+        self.logger.info(
+            f"Rebuilt {len(changedIds)}/{len(courseChapterIds)} chapter bundles "
+            + f"in {time.perf_counter() - startTime:.2f} seconds."
+        )
+        return changedIds
+
+    # Function that rebuilds the changed chapter bundles in a background thread
+    # every refreshSeconds, so that reads rarely have to build a bundle inline
+    def startChapterBundleRebuild(self, refreshSeconds: int) -> threading.Thread:
+        if self.bundleStore is None:
+            return None
+        if self.bundleRebuildThread is not None:
+            return self.bundleRebuildThread
+
+        stopEvent = threading.Event()
+
+        def rebuildBundles():
+            while not stopEvent.wait(refreshSeconds):
+                try:
+                    self.rebuildChapterBundles()
+                except Exception as err:
+                    self.logger.error("Chapter bundle rebuild failed.")
+                    self.logger.error(err)
+
+        self.bundleRebuildThread = threading.Thread(
+            target=rebuildBundles, name="ChapterBundleRebuild", daemon=True
+        )
+        self.bundleRebuildThread.stopEvent = stopEvent
+        self.bundleRebuildThread.start()
+        return self.bundleRebuildThread
+
+    # Function that returns the data version of each CourseChapter - a hash of the
+    # checksums of its mapped questions and KSCs, exclusions and metrics
+    def getChapterVersions(self, courseChapterIds: list) -> dict:
+        schema = self.db.defaultSchema
+        chapterIdsStr = self.db.getSQLString(filterValue=list(courseChapterIds))
+        checksumQueries = [
+            f"SELECT cl.CourseChapterId, CHECKSUM_AGG(BINARY_CHECKSUM("
+            + "ck.KSCClusterId, ck.KSCId, ck.DisplayRank, ck.IsVisible, k.KSCText, k.KSCDiagramURL, "
+            + "qk.QuestionId, qk.IsPrimaryKSC, q.QuestionCode, q.AnswerOption, q.QuestionDiagramURL, "
+            + "q.FullSolutionURL, q.QuestionLatex, q.IsSuspended)) AS DataChecksum "
+            + f"FROM [{schema}].[KSCCluster] cl WITH (NOLOCK) "
+            + f"INNER JOIN [{schema}].[KSCClusterKSC] ck WITH (NOLOCK) ON ck.KSCClusterId = cl.KSCClusterId "
+            + f"LEFT JOIN [{schema}].[KSCView] k WITH (NOLOCK) ON k.KSCId = ck.KSCId "
+            + f"LEFT JOIN [{schema}].[QuestionKSCView] qk WITH (NOLOCK) ON qk.KSCId = ck.KSCId "
+            + f"LEFT JOIN [{schema}].[QuestionView] q WITH (NOLOCK) ON q.QuestionId = qk.QuestionId "
+            + f"WHERE cl.CourseChapterId IN ({chapterIdsStr}) GROUP BY cl.CourseChapterId",
+            f"SELECT CourseChapterId, CHECKSUM_AGG(BINARY_CHECKSUM(*)) AS DataChecksum "
+            + f"FROM [{schema}].[CourseChapterQuestionExclusion] WITH (NOLOCK) "
+            + f"WHERE CourseChapterId IN ({chapterIdsStr}) GROUP BY CourseChapterId",
+            f"SELECT CourseChapterId, CHECKSUM_AGG(BINARY_CHECKSUM(*)) AS DataChecksum "
+            + f"FROM [{schema}].[QuestionMetrics] WITH (NOLOCK) "
+            + f"WHERE CourseChapterId IN ({chapterIdsStr}) AND IsParentMetric = 0 GROUP BY CourseChapterId",
+        ]
+        checksums = {courseChapterId: list() for courseChapterId in courseChapterIds}
+        for query in checksumQueries:
+            results = self.db.execSelectQuery(query=query)
+            tableChecksums = dict(
+                zip(results["CourseChapterId"], results["DataChecksum"])
+            )
+            for courseChapterId in courseChapterIds:
+                checksums[courseChapterId].append(str(tableChecksums.get(courseChapterId)))
+
+        versions = {
+            courseChapterId: hashlib.sha1(
+                "|".join(checksums[courseChapterId]).encode()
+            ).hexdigest()[:16]
+            for courseChapterId in courseChapterIds
+        }
+        return versions
+
+    # ---------------------------------------------- Chapter Prefetch ------------------------------------------------ #
+
+    # Function that returns the cache key of a set of course chapters
+    def getChapterKey(self, courseChapters: pd.DataFrame) -> tuple:
+        return tuple(sorted(set(courseChapters["CourseChapterId"])))
+
+    # Function that returns the question and KSC frames for the given course
+    # chapters from the chapter cache (loaded inline on a cache miss)
+    def getCachedChapterFrames(
+        self, courseChapters: pd.DataFrame
+    ) -> (pd.DataFrame, pd.DataFrame):
+        return self.chapterPrefetcher.get(
+            key=self.getChapterKey(courseChapters=courseChapters),
+            loadFunction=lambda: self.getEncodedChapterFrames(
+                courseChapters=courseChapters
+            ),
+        )
+
+    # Function that returns the chapter frames with the repeated string columns
+    # encoded against the string dictionary - the form kept in the chapter cache
+    def getEncodedChapterFrames(
+        self, courseChapters: pd.DataFrame
+    ) -> (pd.DataFrame, pd.DataFrame):
+        allQuestions, allKsc = self.getChapterFrames(courseChapters=courseChapters)
+        if not self.config.get("internStrings", True):
+            return allQuestions, allKsc
+        return (
+            self.stringDictionary.encodeFrame(frame=allQuestions, columns=self.internedColumns),
+            self.stringDictionary.encodeFrame(frame=allKsc, columns=self.internedColumns),
+        )
+
+    # Function that decodes the string columns of chapter frames for rendering
+    def decodeChapterFrames(
+        self, allQuestions: pd.DataFrame, allKsc: pd.DataFrame
+    ) -> (pd.DataFrame, pd.DataFrame):
+        return (
+            self.stringDictionary.decodeFrame(frame=allQuestions, columns=self.internedColumns),
+            self.stringDictionary.decodeFrame(frame=allKsc, columns=self.internedColumns),
+        )
+
+    # Function that returns the next chapters of the same course subject (in
+    # chapter name order) after the given course chapters - one frame per chapter
+    def getNeighbourCourseChapters(
+        self, courseChapters: pd.DataFrame, count: int
+    ) -> list:
+        hierarchy = self.contentHierarchy
+        if (hierarchy is None) or self.utils.isNullDataFrame(courseChapters):
+            return list()
+
+        currentChapter = courseChapters.iloc[0]
+        subjectChapters = hierarchy.filterByIds(
+            courseIds=[currentChapter["CourseId"]],
+            classIds=[currentChapter["ClassId"]],
+            subjectIds=[currentChapter["SubjectId"]],
+            includeNames=True,
+        )
+        subjectChapters = subjectChapters.sort_values(
+            by=["ChapterName", "ChapterId"], kind="stable"
+        )
+        chapterIds = list(pd.unique(subjectChapters["ChapterId"]))
+        if currentChapter["ChapterId"] not in chapterIds:
+            return list()
+
+        nextIdx = chapterIds.index(currentChapter["ChapterId"]) + 1
+        return [
+            subjectChapters.loc[subjectChapters["ChapterId"] == chapterId]
+            for chapterId in chapterIds[nextIdx : nextIdx + count]
+        ]
+
+    # Function that warms the chapter cache with the next chapters of the same
+    # subject in the background. Pending prefetches of other chapters are cancelled
+    def prefetchNeighbourChapters(
+        self, courseChapters: pd.DataFrame, count: int = None
+    ) -> list:
+        if count is None:
+            count = self.config.get("prefetchChapterCount", 2)
+        if count <= 0:
+            return list()
+
+        neighbours = self.getNeighbourCourseChapters(
+            courseChapters=courseChapters, count=count
+        )
+        keyLoaders = [
+            (
+                self.getChapterKey(courseChapters=neighbour),
+                lambda neighbour=neighbour: self.getEncodedChapterFrames(
+                    courseChapters=neighbour
+                ),
+            )
+            for neighbour in neighbours
+        ]
+        self.chapterPrefetcher.cancelPending(keepKeys=[key for key, _ in keyLoaders])
+        self.chapterPrefetcher.prefetchEach(keyLoaders=keyLoaders)
+        return [key for key, _ in keyLoaders]
+
+    # Function that returns a checksum per QuestionId over everything the chapter
+    # frames show for it in the given chapters: its KSC mappings, question and KSC
+    # details, exclusion and metrics
+    def getChapterRowChecksums(self, courseChapterIds: list) -> pd.Series:
+        schema = self.db.defaultSchema
+        chapterIdsStr = self.db.getSQLString(filterValue=list(courseChapterIds))
+        query = (
+            "SELECT qk.QuestionId, CHECKSUM_AGG(BINARY_CHECKSUM("
+            + "cl.CourseChapterId, qk.KSCId, qk.IsPrimaryKSC, k.KSCText, k.KSCDiagramURL, "
+            + "q.QuestionCode, q.AnswerOption, q.QuestionDiagramURL, q.FullSolutionURL, "
+            + "q.QuestionLatex, q.IsSuspended, e.QuestionId, m.Attempted, m.Correct, m.TimeTaken"
+            + ")) AS RowChecksum "
+            + f"FROM [{schema}].[KSCCluster] cl WITH (NOLOCK) "
+            + f"INNER JOIN [{schema}].[KSCClusterKSC] ck WITH (NOLOCK) ON ck.KSCClusterId = cl.KSCClusterId "
+            + f"INNER JOIN [{schema}].[QuestionKSCView] qk WITH (NOLOCK) ON qk.KSCId = ck.KSCId "
+            + f"LEFT JOIN [{schema}].[KSCView] k WITH (NOLOCK) ON k.KSCId = qk.KSCId "
+            + f"LEFT JOIN [{schema}].[QuestionView] q WITH (NOLOCK) ON q.QuestionId = qk.QuestionId "
+            + f"LEFT JOIN [{schema}].[CourseChapterQuestionExclusion] e WITH (NOLOCK) "
+            + "ON e.CourseChapterId = cl.CourseChapterId AND e.QuestionId = qk.QuestionId "
+            + f"LEFT JOIN [{schema}].[QuestionMetrics] m WITH (NOLOCK) "
+            + "ON m.QuestionId = qk.QuestionId AND m.CourseChapterId = cl.CourseChapterId "
+            + "AND m.IsParentMetric = 0 "
+            + f"WHERE cl.CourseChapterId IN ({chapterIdsStr}) GROUP BY qk.QuestionId"
+        )
+        checksums = self.db.execSelectQuery(query=query)
+        if self.utils.isNullDataFrame(checksums):
+            return pd.Series(dtype=np.int64)
+        return checksums.set_index("QuestionId")["RowChecksum"]
+
+    # Function that refreshes the cached frames of the given course chapters by
+    # comparing per-question checksums with those of the last refresh - only the
+    # rows of changed questions are extracted and patched into the cached frame
+    # A chapter without cached frames or checksums is loaded in full
+    def refreshChapterFrames(
+        self, courseChapters: pd.DataFrame
+    ) -> (pd.DataFrame, pd.DataFrame):
+        chapterKey = self.getChapterKey(courseChapters=courseChapters)
+        generation = self.chapterPrefetcher.generation
+        checksums = self.getChapterRowChecksums(courseChapterIds=list(chapterKey))
+        oldChecksums = self.chapterRowChecksums.get(chapterKey)
+        cachedFrames = self.chapterPrefetcher.peek(key=chapterKey)
+
+        if (oldChecksums is None) or (cachedFrames is None) or (cachedFrames[0] is None):
+            frames = self.getEncodedChapterFrames(courseChapters=courseChapters)
+            self.chapterPrefetcher.put(key=chapterKey, value=frames, generation=generation)
+            self.chapterRowChecksums[chapterKey] = checksums
+            return frames
+
+        commonIds = checksums.index.intersection(oldChecksums.index)
+        changedIds = list(checksums.index.difference(oldChecksums.index)) + list(
+            commonIds[checksums[commonIds].to_numpy() != oldChecksums[commonIds].to_numpy()]
+        )
+        removedIds = list(oldChecksums.index.difference(checksums.index))
+        if (len(changedIds) == 0) and (len(removedIds) == 0):
+            return cachedFrames
+
+        startTime = time.perf_counter()
+        # The lazily loaded heavy columns of changed questions may be stale too
+        changedIdSet = set(changedIds)
+        self.questionDetailsCache.invalidate(keyFilter=lambda key: key in changedIdSet)
+        # So are their rows in the question index the changed rows are built from
+        if len(changedIds) > 0:
+            self.refreshQuestionIndex(questionIds=changedIds)
+        cachedQuestions, _ = cachedFrames
+        allQuestions = cachedQuestions.loc[
+            ~cachedQuestions["QuestionId"].isin(changedIds + removedIds)
+        ]
+        allKsc = None
+        if len(changedIds) > 0:
+            changedQuestions, allKsc = self.buildChapterFrames(
+                courseChapters=courseChapters, questionIds=changedIds
+            )
+            if self.config.get("internStrings", True):
+                # Changed rows are encoded like the cached rows they are merged with
+                changedQuestions = self.stringDictionary.encodeFrame(
+                    frame=changedQuestions,
+                    columns=self.stringDictionary.getEncodedColumns(frame=cachedQuestions),
+                    force=True,
+                )
+                allKsc = self.stringDictionary.encodeFrame(
+                    frame=allKsc, columns=self.internedColumns
+                )
+            if not self.utils.isNullDataFrame(changedQuestions):
+                allQuestions = pd.concat(
+                    [allQuestions, changedQuestions], axis=0, ignore_index=True
+                )
+        if allKsc is None:
+            allKsc = cachedFrames[1]
+        allQuestions = allQuestions.sort_values(by=["QuestionId"], kind="stable")
+        allQuestions.reset_index(drop=True, inplace=True)
+        allQuestions.attrs["encodedColumns"] = self.stringDictionary.getEncodedColumns(
+            frame=cachedQuestions
+        )
+
+        frames = (allQuestions, allKsc)
+        self.chapterPrefetcher.put(key=chapterKey, value=frames, generation=generation)
+        self.chapterRowChecksums[chapterKey] = checksums
+        # Checksums of chapters evicted from the chapter cache are of no use
+        for key in list(self.chapterRowChecksums):
+            if self.chapterPrefetcher.peek(key=key) is None:
+                self.chapterRowChecksums.pop(key, None)
+        self.logger.info(
+            f"Chapter {chapterKey} refreshed: {len(changedIds)} changed and "
+            + f"{len(removedIds)} removed questions in {time.perf_counter() - startTime:.2f} seconds."
+        )
+        return frames
+
+    # Function that returns the chapter cache statistics (hits, misses, hit rate)
+    def getChapterCacheStats(self) -> dict:
+        stats = self.chapterPrefetcher.getStats()
+        stats["internedStrings"] = len(self.stringDictionary)
+        stats["sharedContent"] = self.chapterContentCache.getStats()
+        return stats
+
+    # ----------------------------------------------- Mapping Export ------------------------------------------------- #
+
+    # Function that returns the (CourseChapterId, KSCClusterId, KSCId) rows of the
+    # given CourseChapterIds
+    def getChapterKSCPairs(self, courseChapterIds: list) -> pd.DataFrame:
+        chapterKeys = self.resolveChapterKeys(
+            courseChapters=pd.DataFrame({"CourseChapterId": courseChapterIds})
+        )
+        if chapterKeys is None:
+            return None
+        return chapterKeys.getChapterKSCs()
+
+    # Function that builds the joined question-KSC mapping rows (with per chapter
+    # metrics) of one group of course chapters
+    def getQuestionKSCMappingGroup(
+        self,
+        courseChapters: pd.DataFrame,
+        columnList: list = None,
+        includeMetrics: bool = True,
+        metricsColumns: list = None,
+    ) -> pd.DataFrame:
+        courseChapterIds = list(courseChapters["CourseChapterId"])
+        chapterKSCs = self.getChapterKSCPairs(courseChapterIds=courseChapterIds)
+        if self.utils.isNullDataFrame(chapterKSCs):
+            return None
+        questions = self.getQuestionsForCourseChapters(
+            courseChapters=courseChapters, columnList=columnList, shardSize=None
+        )
+        if self.utils.isNullDataFrame(questions):
+            return None
+        mappings = chapterKSCs.merge(questions, on="KSCId", how="inner")
+        # The question select only drops rows excluded in every chapter of the
+        # group - each mapping row is checked against its own chapter here
+        mappings = mappings.loc[
+            ~self.getChapterExclusionMask(chapterQuestions=mappings)
+        ]
+
+        # Metrics are per (QuestionId, CourseChapterId) - joined on both keys
+        if includeMetrics:
+            metricsColumns = (
+                metricsColumns if metricsColumns is not None else self.chapterMetricsColumns
+            )
+            questionMetrics, _ = self.db.selectWithMultipleWheres(
+                tableName="QuestionMetrics",
+                columnList=["QuestionId", "CourseChapterId"] + metricsColumns,
+                filterConditions=[
+                    ("CourseChapterId", courseChapterIds),
+                    ("IsParentMetric", 0),
+                ],
+            )
+            if self.utils.isNullDataFrame(questionMetrics):
+                questionMetrics = pd.DataFrame(
+                    columns=["QuestionId", "CourseChapterId"] + metricsColumns
+                )
+            mappings = mappings.merge(
+                questionMetrics, on=["QuestionId", "CourseChapterId"], how="left"
+            )
+            # Keep the metric types stable across groups with and without metrics
+            mappings[metricsColumns] = mappings[metricsColumns].astype(float)
+
+        mappings.sort_values(by=["CourseChapterId", "QuestionId"], kind="stable", inplace=True)
+        mappings.reset_index(drop=True, inplace=True)
+        return mappings
+
+    # Generator over the question-KSC mapping of the given course chapters (all
+    # CourseChapters by default) in groups of groupSize chapters. One group is
+    # loaded ahead while the current one is consumed, so at most two groups are
+    # held in memory
+    def iterQuestionKSCMappings(
+        self,
+        courseChapters: pd.DataFrame = None,
+        groupSize: int = None,
+        columnList: list = None,
+        includeMetrics: bool = True,
+        metricsColumns: list = None,
+    ):
+        if courseChapters is None:
+            courseChapters, _ = self.db.selectTable(
+                tableName="CourseChapter", columnList=["CourseChapterId"]
+            )
+            if self.utils.isNullDataFrame(courseChapters):
+                self.logger.warn("No CourseChapters found - nothing to export.")
+                return
+        if groupSize is None:
+            groupSize = self.config.get("exportGroupSize", 50)
+        courseChapters = courseChapters.sort_values(by=["CourseChapterId"])
+        groups = [
+            courseChapters.iloc[idx : idx + groupSize]
+            for idx in range(0, courseChapters.shape[0], groupSize)
+        ]
+
+        def loadGroup(group: pd.DataFrame) -> pd.DataFrame:
+            return self.getQuestionKSCMappingGroup(
+                courseChapters=group,
+                columnList=columnList,
+                includeMetrics=includeMetrics,
+                metricsColumns=metricsColumns,
+            )
+
+        loadGroup = self.db.bindRoutingContext(function=loadGroup)
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="MappingExport") as executor:
+            nextFuture = executor.submit(loadGroup, groups[0]) if groups else None
+            for groupIdx in range(len(groups)):
+                future = nextFuture
+                nextFuture = (
+                    executor.submit(loadGroup, groups[groupIdx + 1])
+                    if groupIdx + 1 < len(groups)
+                    else None
+                )
+                mappings = future.result()
+                self.logger.debug(
+                    f"Mapping export group {groupIdx + 1}/{len(groups)} loaded."
+                )
+                if not self.utils.isNullDataFrame(mappings):
+                    yield mappings
+                # Drop the reference before waiting on the next group
+                mappings = None
+        return
+
+    # Function that streams the question-KSC mapping to a Parquet or CSV file
+    # (format taken from the file extension unless given) with bounded memory.
+    # Returns the number of rows written
+    def exportQuestionKSCMappings(
+        self,
+        filePath: str,
+        fileFormat: str = None,
+        courseChapters: pd.DataFrame = None,
+        groupSize: int = None,
+        columnList: list = None,
+        includeMetrics: bool = True,
+        metricsColumns: list = None,
+    ) -> int:
+        startTime = time.perf_counter()
+        with MappingExportWriter(
+            filePath=filePath,
+            fileFormat=fileFormat,
+            compression=self.config.get("exportCompression", "zstd"),
+            columnTypes=self.exportColumnTypes,
+        ) as writer:
+            for mappings in self.iterQuestionKSCMappings(
+                courseChapters=courseChapters,
+                groupSize=groupSize,
+                columnList=columnList,
+                includeMetrics=includeMetrics,
+                metricsColumns=metricsColumns,
+            ):
+                writer.write(frame=mappings)
+        self.logger.info(
+            f"Exported {writer.rowCount} question-KSC mapping rows to {filePath} "
+            + f"in {time.perf_counter() - startTime:.2f} seconds."
+        )
+        return writer.rowCount
+
+    # ----------------------------------------------- Question Details ----------------------------------------------- #
+
+    # Function that returns the question columns of the chapter frames - without
+    # the heavy columns when they are loaded lazily
+    def getChapterQuestionColumns(self) -> list:
+        if not self.config.get("lazyQuestionColumns", False):
+            return self.chapterQuestionColumns
+        return [
+            col
+            for col in self.chapterQuestionColumns
+            if col not in self.heavyQuestionColumns
+        ]
+
+    # Function that returns the heavy columns (QuestionLatex and the question and
+    # solution diagram URLs) of the given questions, one row per QuestionId in
+    # the given order. Cached questions are served from the LRU cache and all the
+    # others are read with a single select
+    def getQuestionDetails(self, questionIds: list) -> pd.DataFrame:
+        questionIds = list(dict.fromkeys(questionIds))
+        details = self.questionDetailsCache.getMany(
+            keys=questionIds, loadFunction=self.loadQuestionDetails
+        )
+        rows = [details[questionId] for questionId in questionIds if details[questionId] is not None]
+        if len(rows) == 0:
+            return None
+        return pd.DataFrame(rows)
+
+    # Function that reads the heavy columns of the given questions with a single
+    # select - returns a dict of QuestionId -> row dict
+    def loadQuestionDetails(self, questionIds: list) -> dict:
+        details, _ = self.db.selectWithWhere(
+            tableName="QuestionView",
+            columnList=["QuestionId"] + self.heavyQuestionColumns,
+            filterColumn="QuestionId",
+            filterValue=questionIds,
+        )
+        if self.utils.isNullDataFrame(details):
+            return dict()
+        details = details.rename(columns={"FullSolutionURL": "FullSolutionDiagramURL"})
+        details = details.drop_duplicates(subset=["QuestionId"])
+        return {
+            row["QuestionId"]: row
+            for row in details.to_dict(orient="records")
+        }
+
+    # Function that returns the details of one question as a dict (None if missing)
+    def getQuestionDetail(self, questionId: int) -> dict:
+        details = self.getQuestionDetails(questionIds=[questionId])
+        if self.utils.isNullDataFrame(details):
+            return None
+        return details.iloc[0].to_dict()
+
+    # Function that loads the details of the next questions after questionId (in
+    # the order of allQuestions) in the background - one page of pageSize questions
+    def prefetchQuestionDetails(
+        self, allQuestions: pd.DataFrame, questionId: int, pageSize: int = None
+    ):
+        if not self.config.get("lazyQuestionColumns", False):
+            # The details are already part of the chapter frames
+            return None
+        if pageSize is None:
+            pageSize = self.config.get("questionDetailsPageSize", 10)
+        if self.utils.isNullDataFrame(allQuestions) or (pageSize <= 0):
+            return None
+        questionIds = list(pd.unique(allQuestions["QuestionId"]))
+        if questionId not in questionIds:
+            return None
+        nextIdx = questionIds.index(questionId) + 1
+        pageIds = questionIds[nextIdx : nextIdx + pageSize]
+        if len(pageIds) == 0:
+            return None
+        return self.questionDetailsCache.prefetch(
+            keys=pageIds, loadFunction=self.loadQuestionDetails
+        )
+
+    # ---------------------------------------------------- Warm Up --------------------------------------------------- #
+
+    # Function that returns the (KSCId, KSCText, KSCDiagramURL) rows of the given
+    # KSCs - from the warmed KSC details when loaded (KSCs added since the last
+    # refresh are read from KSCView), else from KSCView filtered by kscQuery (or
+    # by the ids)
+    def getKSCDetails(self, kscIds: list, kscQuery: str = None) -> pd.DataFrame:
+        self.refreshSnapshotsIfDue()
+        kscDetails = self.kscDetails
+        if kscDetails is not None:
+            kscDetails = kscDetails.loc[kscDetails["KSCId"].isin(kscIds)]
+            missingIds = list(set(kscIds).difference(kscDetails["KSCId"]))
+            if len(missingIds) == 0:
+                return kscDetails
+            missingDetails, _ = self.db.selectWithWhere(
+                tableName="KSCView",
+                columnList=["KSCId", "KSCText", "KSCDiagramURL"],
+                filterColumn="KSCId",
+                filterValue=missingIds,
+            )
+            if self.utils.isNullDataFrame(missingDetails):
+                return kscDetails
+            return pd.concat([kscDetails, missingDetails], axis=0, ignore_index=True)
+        if kscQuery is not None:
+            kscDetails, _ = self.db.selectWithSQL(
+                tableName="KSCView",
+                columnList=["KSCId", "KSCText", "KSCDiagramURL"],
+                filterColumn="KSCId",
+                filterQuery=kscQuery,
+            )
+        else:
+            kscDetails, _ = self.db.selectWithWhere(
+                tableName="KSCView",
+                columnList=["KSCId", "KSCText", "KSCDiagramURL"],
+                filterColumn="KSCId",
+                filterValue=kscIds,
+            )
+        return kscDetails
+
+    # Function that returns the given columns of the given active questions -
+    # from the warmed question index, with questions added since the last
+    # refresh read from QuestionView
+    def getQuestionIndexRows(self, questionIds: list, columnList: list) -> pd.DataFrame:
+        questionIndex = self.questionIndex
+        questionDetails = questionIndex.loc[
+            questionIndex["QuestionId"].isin(questionIds), columnList
+        ]
+        missingIds = list(set(questionIds).difference(questionDetails["QuestionId"]))
+        if len(missingIds) == 0:
+            return questionDetails
+        missingDetails, _ = self.db.selectWithMultipleWheres(
+            tableName="QuestionView",
+            columnList=columnList,
+            filterConditions=[("QuestionId", missingIds), ("IsSuspended", 0)],
+        )
+        if self.utils.isNullDataFrame(missingDetails):
+            return questionDetails
+        return pd.concat([questionDetails, missingDetails], axis=0, ignore_index=True)
+
+    # Function that returns the ids whose checksum is new, removed or changed
+    def getChangedIds(self, checksums: pd.Series, oldChecksums: pd.Series) -> list:
+        commonIds = checksums.index.intersection(oldChecksums.index)
+        return (
+            list(checksums.index.difference(oldChecksums.index))
+            + list(oldChecksums.index.difference(checksums.index))
+            + list(
+                commonIds[
+                    checksums[commonIds].to_numpy() != oldChecksums[commonIds].to_numpy()
+                ]
+            )
+        )
+
+    # Function that returns the snapshot with the rows of the given ids replaced
+    # by the given rows (ids without rows are dropped)
+    def patchSnapshot(
+        self, snapshot: pd.DataFrame, idColumn: str, ids: list, rows: pd.DataFrame
+    ) -> pd.DataFrame:
+        snapshot = snapshot.loc[~snapshot[idColumn].isin(ids)]
+        if not self.utils.isNullDataFrame(rows):
+            rows = rows.drop_duplicates(subset=[idColumn])
+            snapshot = pd.concat([snapshot, rows[snapshot.columns]], axis=0, ignore_index=True)
+        return snapshot.sort_values(by=[idColumn], kind="stable").reset_index(drop=True)
+
+    # Function that returns a checksum of the row of every KSC in KSCView
+    def selectKSCDetailChecksums(self) -> pd.Series:
+        query = (
+            "SELECT KSCId, CHECKSUM_AGG(BINARY_CHECKSUM(KSCText, KSCDiagramURL)) AS RowChecksum "
+            + f"FROM [{self.db.defaultSchema}].[KSCView] WITH (NOLOCK) GROUP BY KSCId"
+        )
+        checksums = self.db.execSelectQuery(query=query)
+        if self.utils.isNullDataFrame(checksums):
+            return pd.Series(dtype=np.int64)
+        return checksums.set_index("KSCId")["RowChecksum"]
+
+    # Function that returns a checksum of the question index row of every
+    # active question
+    def selectQuestionIndexChecksums(self) -> pd.Series:
+        columnsStr = ", ".join(self.getChapterQuestionColumns())
+        query = (
+            f"SELECT QuestionId, CHECKSUM_AGG(BINARY_CHECKSUM({columnsStr})) AS RowChecksum "
+            + f"FROM [{self.db.defaultSchema}].[QuestionView] WITH (NOLOCK) "
+            + "WHERE IsSuspended = 0 GROUP BY QuestionId"
+        )
+        checksums = self.db.execSelectQuery(query=query)
+        if self.utils.isNullDataFrame(checksums):
+            return pd.Series(dtype=np.int64)
+        return checksums.set_index("QuestionId")["RowChecksum"]
+
+    # Function that loads the details of all KSCs with one bulk select
+    def loadKSCDetails(self) -> pd.DataFrame:
+        with self.snapshotLock:
+            self.snapshotCheckTimes["KSCDetails"] = time.monotonic()
+            checksums = self.selectKSCDetailChecksums()
+            kscDetails, _ = self.db.selectTable(
+                tableName="KSCView", columnList=["KSCId", "KSCText", "KSCDiagramURL"]
+            )
+            if self.utils.isNullDataFrame(kscDetails):
+                return None
+            self.kscDetails = kscDetails.drop_duplicates(subset=["KSCId"]).reset_index(
+                drop=True
+            )
+            self.kscDetailsChecksums = checksums
+        return self.kscDetails
+
+    # Function that loads the light columns of all active questions with one
+    # bulk select - the heavy columns are loaded on demand
+    def loadQuestionIndex(self) -> pd.DataFrame:
+        with self.snapshotLock:
+            self.snapshotCheckTimes["QuestionIndex"] = time.monotonic()
+            checksums = self.selectQuestionIndexChecksums()
+            questionIndex, _ = self.db.selectWithWhere(
+                tableName="QuestionView",
+                columnList=self.getChapterQuestionColumns(),
+                filterColumn="IsSuspended",
+                filterValue=0,
+            )
+            if self.utils.isNullDataFrame(questionIndex):
+                return None
+            questionIndex = questionIndex.drop_duplicates(subset=["QuestionId"])
+            self.questionIndex = questionIndex.sort_values(by=["QuestionId"]).reset_index(
+                drop=True
+            )
+            self.questionIndexChecksums = checksums
+        return self.questionIndex
+
+    # Function that brings the KSC details up to date - per-KSC checksums are
+    # compared with those of the last load and only changed, new and removed
+    # KSCs are read and patched in. Returns the number of patched KSCs
+    def refreshKSCDetails(self) -> int:
+        with self.snapshotLock:
+            self.snapshotCheckTimes["KSCDetails"] = time.monotonic()
+            kscDetails = self.kscDetails
+            if (kscDetails is None) or (self.kscDetailsChecksums is None):
+                return 0
+            checksums = self.selectKSCDetailChecksums()
+            changedIds = self.getChangedIds(
+                checksums=checksums, oldChecksums=self.kscDetailsChecksums
+            )
+            if len(changedIds) > 0:
+                changedRows, _ = self.db.selectWithWhere(
+                    tableName="KSCView",
+                    columnList=["KSCId", "KSCText", "KSCDiagramURL"],
+                    filterColumn="KSCId",
+                    filterValue=changedIds,
+                )
+                kscDetails = self.patchSnapshot(
+                    snapshot=kscDetails, idColumn="KSCId", ids=changedIds, rows=changedRows
+                )
+            # An invalidation during the refresh drops the snapshot for good
+            if self.kscDetails is None:
+                return 0
+            self.kscDetails = kscDetails
+            self.kscDetailsChecksums = checksums
+        self.logger.debug(f"KSC details: {len(changedIds)} KSCs patched.")
+        return len(changedIds)
+
+    # Function that brings the question index up to date like refreshKSCDetails -
+    # suspended questions drop out of the index. With questionIds, only those
+    # questions are re-read (without comparing checksums)
+    def refreshQuestionIndex(self, questionIds: list = None) -> int:
+        with self.snapshotLock:
+            questionIndex = self.questionIndex
+            if (questionIndex is None) or (self.questionIndexChecksums is None):
+                return 0
+            checksums = None
+            if questionIds is None:
+                self.snapshotCheckTimes["QuestionIndex"] = time.monotonic()
+                checksums = self.selectQuestionIndexChecksums()
+                questionIds = self.getChangedIds(
+                    checksums=checksums, oldChecksums=self.questionIndexChecksums
+                )
+            if len(questionIds) > 0:
+                changedRows, _ = self.db.selectWithMultipleWheres(
+                    tableName="QuestionView",
+                    columnList=list(questionIndex.columns),
+                    filterConditions=[("QuestionId", list(questionIds)), ("IsSuspended", 0)],
+                )
+                questionIndex = self.patchSnapshot(
+                    snapshot=questionIndex,
+                    idColumn="QuestionId",
+                    ids=list(questionIds),
+                    rows=changedRows,
+                )
+            if self.questionIndex is None:
+                return 0
+            self.questionIndex = questionIndex
+            if checksums is not None:
+                self.questionIndexChecksums = checksums
+        self.logger.debug(f"Question index: {len(questionIds)} questions patched.")
+        return len(questionIds)
+
+    # Function that refreshes the KSC details and question index when their last
+    # check is older than snapshotRefreshSeconds
+    def refreshSnapshotsIfDue(self):
+        refreshSeconds = self.config.get("snapshotRefreshSeconds", 300)
+        now = time.monotonic()
+        for name, snapshot, refreshFunction in [
+            ("KSCDetails", self.kscDetails, self.refreshKSCDetails),
+            ("QuestionIndex", self.questionIndex, self.refreshQuestionIndex),
+        ]:
+            if snapshot is None:
+                continue
+            if now - self.snapshotCheckTimes.get(name, 0) < refreshSeconds:
+                continue
+            try:
+                refreshFunction()
+            except Exception as err:
+                self.logger.error(f"Refresh of {name} failed.")
+                self.logger.error(err)
+        return
+
+    # Function that loads all the registered reference tables
+    def loadReferenceData(self):
+        for name in list(self.referenceData.tables):
+            self.referenceData.get(name=name)
+        return
+
+    # Function that fills the in-process caches with a few bulk queries. The
+    # reference tables are loaded first (the hierarchy needs the content names),
+    # then the hierarchy, mapping graph, KSC details and question index in
+    # parallel, then the incidence matrix from the graph. Returns the seconds
+    # taken by each component (None for failed ones). With background, the
+    # warm-up runs in a daemon thread and the timings land in lastWarmUpTimings
+    def warmUpCaches(self, components: list = None, background: bool = False):
+        if background:
+            self.warmUpThread = threading.Thread(
+                target=self.warmUpCaches,
+                kwargs={"components": components},
+                name="CacheWarmUp",
+                daemon=True,
+            )
+            self.warmUpThread.start()
+            return self.warmUpThread
+
+        stages = [
+            {"ReferenceData": self.loadReferenceData},
+            {
+                "ContentHierarchy": self.loadContentHierarchy,
+                "MappingGraph": self.loadMappingGraph,
+                "KSCDetails": self.loadKSCDetails,
+                "QuestionIndex": self.loadQuestionIndex,
+                "QuestionLookup": self.loadQuestionLookup,
+            },
+            {"QuestionKSCIncidence": lambda: self.getQuestionKSCIncidence(refresh=True)},
+        ]
+        if components is None:
+            components = self.config.get("warmUpComponents")
+        timings = dict()
+
+        def runComponent(name: str, loadFunction: object):
+            startTime = time.perf_counter()
+            try:
+                loadFunction()
+                timings[name] = time.perf_counter() - startTime
+            except Exception as err:
+                timings[name] = None
+                self.logger.error(f"Warm-up of {name} failed.")
+                self.logger.error(err)
+
+        startTime = time.perf_counter()
+        with ThreadPoolExecutor(
+            max_workers=self.config.get("warmUpWorkers", 4), thread_name_prefix="CacheWarmUp"
+        ) as executor:
+            for stage in stages:
+                futures = [
+                    executor.submit(runComponent, name, loadFunction)
+                    for name, loadFunction in stage.items()
+                    if (components is None) or (name in components)
+                ]
+                for future in futures:
+                    future.result()
+        timings["Total"] = time.perf_counter() - startTime
+
+        self.lastWarmUpTimings = timings
+        self.logger.info(
+            "Cache warm-up: "
+            + ", ".join(
+                f"{name}={'failed' if seconds is None else f'{seconds:.2f}s'}"
+                for name, seconds in timings.items()
+            )
+        )
+        return timings
+
+    # ------------------------------------------------ Question Lookup ----------------------------------------------- #
+
+    # Function that returns the FROM clause joining every question to its KSCs,
+    # clusters and chapters (questions without chapters are kept)
+    def getQuestionLookupFromSQL(self) -> str:
+        schema = self.db.defaultSchema
+        return (
+            f"FROM [{schema}].[QuestionKSCView] qk WITH (NOLOCK) "
+            + f"LEFT JOIN [{schema}].[QuestionView] q WITH (NOLOCK) ON q.QuestionId = qk.QuestionId "
+            + f"LEFT JOIN [{schema}].[KSCClusterKSC] ck WITH (NOLOCK) ON ck.KSCId = qk.KSCId "
+            + f"LEFT JOIN [{schema}].[KSCCluster] cl WITH (NOLOCK) ON cl.KSCClusterId = ck.KSCClusterId"
+        )
+
+    # Function that reads the lookup rows of all questions (or the given ones)
+    def selectQuestionLookupRows(self, questionIds: list = None) -> pd.DataFrame:
+        query = (
+            "SELECT qk.QuestionId, q.QuestionCode, qk.KSCId, qk.IsPrimaryKSC, "
+            + "ck.KSCClusterId, cl.CourseChapterId "
+            + self.getQuestionLookupFromSQL()
+        )
+        if questionIds is not None:
+            query += f" WHERE qk.QuestionId IN ({self.db.getSQLString(filterValue=list(questionIds))})"
+        return self.db.execSelectQuery(query=query)
+
+    # Function that returns a checksum of the lookup rows of every QuestionId
+    def selectQuestionLookupChecksums(self) -> pd.Series:
+        query = (
+            "SELECT qk.QuestionId, CHECKSUM_AGG(BINARY_CHECKSUM("
+            + "q.QuestionCode, qk.KSCId, qk.IsPrimaryKSC, ck.KSCClusterId, cl.CourseChapterId"
+            + ")) AS RowChecksum "
+            + self.getQuestionLookupFromSQL()
+            + " GROUP BY qk.QuestionId"
+        )
+        checksums = self.db.execSelectQuery(query=query)
+        if self.utils.isNullDataFrame(checksums):
+            return pd.Series(dtype=np.int64)
+        return checksums.set_index("QuestionId")["RowChecksum"]
+
+    # Function that builds the question lookup index with one bulk query
+    def loadQuestionLookup(self) -> QuestionLookupIndex:
+        with self.questionLookupLock:
+            self.questionLookupStale = False
+            checksums = self.selectQuestionLookupChecksums()
+            questionRows = self.selectQuestionLookupRows()
+            if self.utils.isNullDataFrame(questionRows):
+                self.logger.warn("No questions found - question lookup index not built.")
+                return None
+            self.questionLookup = QuestionLookupIndex(questionRows=questionRows)
+            self.questionLookupChecksums = checksums
+        return self.questionLookup
+
+    # Function that brings the lookup index up to date - per-question checksums
+    # are compared with those of the last build and only the rows of changed,
+    # new and removed questions are read and patched in. Returns the number of
+    # patched questions
+    def refreshQuestionLookup(self) -> int:
+        if self.questionLookup is None:
+            self.loadQuestionLookup()
+            return 0 if self.questionLookup is None else len(self.questionLookupChecksums)
+
+        with self.questionLookupLock:
+            self.questionLookupStale = False
+            checksums = self.selectQuestionLookupChecksums()
+            changedIds = self.getChangedIds(
+                checksums=checksums, oldChecksums=self.questionLookupChecksums
+            )
+            if len(changedIds) > 0:
+                self.questionLookup.patchRows(
+                    questionIds=changedIds,
+                    questionRows=self.selectQuestionLookupRows(questionIds=changedIds),
+                )
+            self.questionLookupChecksums = checksums
+        self.logger.debug(f"Question lookup index: {len(changedIds)} questions patched.")
+        return len(changedIds)
+
+    # Function that returns the KSC mappings and CourseChapters of a question by
+    # QuestionId or QuestionCode - one row per (KSC, chapter) mapping
+    def lookupQuestion(self, questionId: int = None, questionCode: str = None) -> pd.DataFrame:
+        if self.questionLookup is None:
+            self.loadQuestionLookup()
+        elif self.questionLookupStale:
+            self.refreshQuestionLookup()
+        if self.questionLookup is None:
+            return None
+
+        if questionId is not None:
+            questionRows = self.questionLookup.lookupId(questionId=questionId)
+        else:
+            questionRows = self.questionLookup.lookupCode(questionCode=questionCode)
+        if questionRows.shape[0] == 0:
+            return None
+        return questionRows
@@ -3,17 +3,25 @@ import pathlib
 import json
 import tempfile
 import subprocess
+import threading
+import queue
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import pandas as pd
 from datetime import datetime
 import pyodbc
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from sqlalchemy import create_engine
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
 from sqlalchemy.orm import Session
 import logging
 
+from cache import TableChange
+from usage import ColumnUsageTracker
+
 pyodbc.pooling = False
 
 
@@ -26,7 +34,13 @@ class DBColumn:
     isAutoIncrement: bool = False
     isNullable: bool = False
 
-    def getCreateString(self, tableName: str):
+    def getCreateString(
+        self,
+        tableName: str,
+        isClustered: bool = True,
+        storageStr: str = "[PRIMARY]",
+        extraKeyColumns: list = None,
+    ):
 
         createStr = "[" + self.columnName + "] " + self.columnType + " "
         createStr += " IDENTITY(1,1)" if self.isAutoIncrement else ""
@@ -35,14 +49,124 @@ class DBColumn:
 
         primaryKeyIndexStr = None
         if self.isPrimaryKey:
+            # Partitioned tables need the partition column in the primary key
+            keyColumns = [self.columnName] + [
+                col for col in (extraKeyColumns or []) if col != self.columnName
+            ]
+            keyStr = ", ".join([f"[{col}] ASC" for col in keyColumns])
             primaryKeyIndexStr = (
-                f"CONSTRAINT [PK_{tableName}] PRIMARY KEY CLUSTERED ([{self.columnName}] ASC) "
+                f"CONSTRAINT [PK_{tableName}] PRIMARY KEY {'CLUSTERED' if isClustered else 'NONCLUSTERED'} ({keyStr}) "
                 + f"WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, IGNORE_DUP_KEY = OFF, ALLOW_ROW_LOCKS = ON, "
-                + f"ALLOW_PAGE_LOCKS = ON) ON [PRIMARY]"
+                + f"ALLOW_PAGE_LOCKS = ON) ON {storageStr}"
             )
         return createStr, primaryKeyIndexStr
 
 
+# Nonclustered index definition - supports composite keys and covering
+# (INCLUDE) columns
+@dataclass
+class DBIndex:
+
+    columns: list
+    includeColumns: list = None
+    isUnique: bool = False
+    indexName: str = None
+
+    def getCreateString(
+        self,
+        tableName: str,
+        schemaName: str,
+        storageStr: str = "[PRIMARY]",
+        compression: str = None,
+        extraKeyColumns: list = None,
+    ) -> str:
+        indexName = (
+            self.indexName
+            if self.indexName is not None
+            else f"IX_{tableName}_{'_'.join(self.columns)}"
+        )
+        # Unique indexes on partitioned tables need the partition column in the key
+        keyColumns = list(self.columns)
+        if self.isUnique:
+            keyColumns += [col for col in (extraKeyColumns or []) if col not in keyColumns]
+        keyStr = ", ".join([f"[{col}] ASC" for col in keyColumns])
+
+        createStr = (
+            f"CREATE {'UNIQUE ' if self.isUnique else ''}NONCLUSTERED INDEX [{indexName}] "
+            + f"ON {schemaName}.{tableName} ({keyStr})"
+        )
+        if self.includeColumns:
+            includeStr = ", ".join([f"[{col}]" for col in self.includeColumns])
+            createStr += f" INCLUDE ({includeStr})"
+        createStr += " WITH (STATISTICS_NORECOMPUTE = OFF, DROP_EXISTING = OFF, ONLINE = OFF"
+        createStr += f", DATA_COMPRESSION = {compression}" if compression else ""
+        createStr += f") ON {storageStr}; "
+        return createStr
+
+
+# Physical design of a table - columnstore vs rowstore, secondary indexes,
+# compression and date partitioning
+@dataclass
+class DBTableDesign:
+
+    isColumnstore: bool = False
+    indexes: list = None
+    compression: str = None  # NONE / ROW / PAGE (rowstore), COLUMNSTORE / COLUMNSTORE_ARCHIVE
+    partitionFunction: str = None
+    partitionColumn: str = None
+    partitionColumnType: str = "DATETIME"
+    partitionBoundaries: list = None
+
+    def __post_init__(self):
+        self.validate()
+
+    # A partitioned design needs its boundaries - without them no partition
+    # function can be created and the DDL would reference a missing scheme
+    def validate(self):
+        if self.isPartitioned() and (not self.partitionBoundaries):
+            raise ValueError(
+                f"No boundaries given for partition function {self.partitionFunction}."
+            )
+
+    def isPartitioned(self) -> bool:
+        return (self.partitionFunction is not None) and (
+            self.partitionColumn is not None
+        )
+
+    def getPartitionScheme(self) -> str:
+        return f"PS_{self.partitionFunction}"
+
+    def getStorageString(self) -> str:
+        if not self.isPartitioned():
+            return "[PRIMARY]"
+        return f"[{self.getPartitionScheme()}] ([{self.partitionColumn}])"
+
+    def getPartitionColumns(self) -> list:
+        return [self.partitionColumn] if self.isPartitioned() else None
+
+    # Compression for the rowstore structures (table, primary key and indexes)
+    def getRowstoreCompression(self) -> str:
+        if self.compression in ("NONE", "ROW", "PAGE"):
+            return self.compression
+        return None
+
+    # Compression for the clustered columnstore index
+    def getColumnstoreCompression(self) -> str:
+        if self.compression in ("COLUMNSTORE", "COLUMNSTORE_ARCHIVE"):
+            return self.compression
+        return "COLUMNSTORE"
+
+
+# Read endpoint (replica) that select queries can be routed to
+@dataclass
+class DBEndpoint:
+
+    name: str
+    engine: object
+    isHealthy: bool = True
+    lastCheckTime: float = None
+
+
 class DBConnection:
 
     utils = None
@@ -53,15 +177,39 @@ class DBConnection:
     alchemyCnxn: object = None
     defaultSchema: str = None
 
+    readEndpoints: list = None
+    readEndpointIdx: int = 0
+    routingLock: object = None
+    routingState: object = None
+    lastWriteTime: float = None
+
+    isConnected: bool = False
+    cnxnLock: object = None
+    keepAliveThread: object = None
+
+    invalidationListeners: list = None
+    columnUsage: ColumnUsageTracker = None
+
     def __init__(self, utils, config):
         self.logger = logging.getLogger(__name__)
 
         self.utils = utils
         self.config = config["db"]
+        self.routingLock = threading.Lock()
+        self.routingState = threading.local()
+        self.cnxnLock = threading.Lock()
+        self.invalidationListeners = list()
+        # Debug mode - report the fetched columns that are never read
+        if self.config.get("trackColumnUsage", False):
+            self.columnUsage = ColumnUsageTracker()
         self.getConnectionConfig(secretsConfig=config["secrets"])
-        self.openDBConnection()
 
         self.defaultSchema = self.config["defaultSchema"]
+
+        # Connections are opened lazily on the first query, unless a background
+        # warm-up is requested in the config
+        if self.config.get("warmUpConnection", False):
+            self.startConnectionWarmUp()
         return
 
     def getConnectionConfig(self, secretsConfig: dict) -> dict:
@@ -99,30 +247,225 @@ class DBConnection:
         )
 
         # sqlalchemy connection for write operations
+        sqlAlchemyString = self.getSQLAlchemyString(
+            server=self.config["server"], database=self.config["database"]
+        )
+
+        self.logger.info(
+            f"Connected to DB: {self.config['database']}@{self.config['server']}"
+        )
+        self.alchemyCnxn = create_engine(sqlAlchemyString, fast_executemany=True)
+
+        # sqlalchemy connections to the read endpoints (if any)
+        self.openReadEndpoints()
+
+        self.isConnected = True
+        self.startKeepAlive()
+        return True
+
+    # Function that builds the sqlalchemy connection string for a given server
+    def getSQLAlchemyString(self, server: str, database: str) -> str:
+        trustedCnxn = (
+            True
+            if (self.config["uid"] is None or len(self.config["uid"]) == 0)
+            else False
+        )
         sqlAlchemyString = (
             "mssql+pyodbc://"
             + ("" if trustedCnxn else self.config["uid"] + ":" + self.config["pwd"])
             + "@"
-            + self.config["server"]
+            + server
             + "/"
-            + self.config["database"]
+            + database
             + "?driver="
             + self.config["driver"].replace(" ", "+")
             + ("&trusted_connection=yes" if trustedCnxn else "")
         )
-
-        self.logger.info(
-            f"Connected to DB: {self.config['database']}@{self.config['server']}"
-        )
-        self.alchemyCnxn = create_engine(sqlAlchemyString, fast_executemany=True)
-
-        return True
+        return sqlAlchemyString
 
     def closeDBConnection(self):
+        self.isConnected = False
         if self.pyodbcCnxn is not None:
             self.pyodbcCnxn.close()
         if self.alchemyCnxn is not None:
-            self.alchemyCnxn.close()
+            self.alchemyCnxn.dispose()
+        for endpoint in self.readEndpoints or []:
+            endpoint.engine.dispose()
+        if self.columnUsage is not None:
+            self.columnUsage.logReport()
+
+    # Function that opens the DB connections on first use. Entry points that never
+    # run a query never connect to the DB
+    def ensureDBConnection(self) -> bool:
+        if self.isConnected:
+            return True
+        with self.cnxnLock:
+            if not self.isConnected:
+                self.openDBConnection()
+        return True
+
+    # Function that opens the DB connections in a background thread so that
+    # process startup does not wait on DB latency
+    def startConnectionWarmUp(self) -> threading.Thread:
+        def warmUp():
+            try:
+                self.ensureDBConnection()
+            except (pyodbc.Error, SQLAlchemyError) as err:
+                self.logger.warn("DB connection warm-up failed.")
+                self.logger.warn(err)
+
+        warmUpThread = threading.Thread(
+            target=warmUp, name="DBConnectionWarmUp", daemon=True
+        )
+        warmUpThread.start()
+        return warmUpThread
+
+    # Function that starts a background thread pinging the DB every
+    # keepAliveSeconds (from the config) so idle connections are not dropped
+    def startKeepAlive(self):
+        keepAliveSeconds = self.config.get("keepAliveSeconds", 0)
+        if (keepAliveSeconds <= 0) or (self.keepAliveThread is not None):
+            return
+
+        def keepAlive():
+            while True:
+                time.sleep(keepAliveSeconds)
+                if not self.isConnected:
+                    continue
+                try:
+                    with self.alchemyCnxn.connect() as cnxn:
+                        cnxn.exec_driver_sql("SELECT 1")
+                except SQLAlchemyError as err:
+                    self.logger.warn("DB keep-alive ping failed.")
+                    self.logger.debug(err)
+                for endpoint in self.readEndpoints or []:
+                    self.checkEndpointHealth(endpoint=endpoint)
+
+        self.keepAliveThread = threading.Thread(
+            target=keepAlive, name="DBKeepAlive", daemon=True
+        )
+        self.keepAliveThread.start()
+        return
+
+    # -------------------------------------------------------------------------#
+    # ------------------------ READ/WRITE ROUTING -----------------------------#
+
+    # Function that opens sqlalchemy engines for the read endpoints listed in the
+    # "readServers" config. Each entry is either a server name (same database and
+    # credentials as the primary), a dict with "server"/"database" keys or a dict
+    # with a full sqlalchemy "url" (useful for pointing at local stand-in databases)
+    def openReadEndpoints(self) -> list:
+        self.readEndpoints = list()
+        self.readEndpointIdx = 0
+        for readServer in self.config.get("readServers") or []:
+            if isinstance(readServer, str):
+                readServer = {"server": readServer}
+            if "url" in readServer:
+                sqlAlchemyString = readServer["url"]
+                name = readServer.get("name", sqlAlchemyString.split("@")[-1])
+            else:
+                database = readServer.get("database", self.config["database"])
+                sqlAlchemyString = self.getSQLAlchemyString(
+                    server=readServer["server"], database=database
+                )
+                name = f"{database}@{readServer['server']}"
+            self.readEndpoints.append(
+                DBEndpoint(name=name, engine=create_engine(sqlAlchemyString))
+            )
+            self.logger.info(f"Added read endpoint: {name}")
+        return self.readEndpoints
+
+    # Function that checks if a read endpoint can serve queries
+    def checkEndpointHealth(self, endpoint: DBEndpoint) -> bool:
+        endpoint.lastCheckTime = time.monotonic()
+        try:
+            with endpoint.engine.connect() as cnxn:
+                cnxn.exec_driver_sql("SELECT 1")
+            endpoint.isHealthy = True
+        except SQLAlchemyError as err:
+            self.logger.warn(f"Read endpoint {endpoint.name} failed health check.")
+            self.logger.debug(err)
+            endpoint.isHealthy = False
+        return endpoint.isHealthy
+
+    # Function that marks a read endpoint as unhealthy after a failed query so that
+    # it is skipped until the next health check
+    def markEndpointUnhealthy(self, endpoint: DBEndpoint, err: Exception):
+        self.logger.warn(
+            f"Read endpoint {endpoint.name} failed - routing reads to primary."
+        )
+        self.logger.debug(err)
+        endpoint.isHealthy = False
+        endpoint.lastCheckTime = time.monotonic()
+        return
+
+    # Context manager that pins all reads inside the block to the primary so that
+    # a flow like "save reviews and reload them" always reads its own writes
+    @contextmanager
+    def readYourWrites(self):
+        self.routingState.pinDepth = getattr(self.routingState, "pinDepth", 0) + 1
+        try:
+            yield self
+        finally:
+            self.routingState.pinDepth -= 1
+
+    # Function that returns the routing state of the current thread - carried into
+    # the worker threads that run reads on its behalf
+    def getRoutingContext(self) -> dict:
+        return {"pinDepth": getattr(self.routingState, "pinDepth", 0)}
+
+    # Function that wraps a function so that it runs with the given routing state
+    # (by default the one of the calling thread) in whichever thread executes it
+    # Pool workers of parallel reads keep the read-your-writes pin this way
+    def bindRoutingContext(
+        self, function: object, routingContext: dict = None
+    ) -> object:
+        if routingContext is None:
+            routingContext = self.getRoutingContext()
+
+        def runWithContext(*args, **kwargs):
+            previousContext = self.getRoutingContext()
+            self.routingState.pinDepth = routingContext["pinDepth"]
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.routingState.pinDepth = previousContext["pinDepth"]
+
+        return runWithContext
+
+    # Function that returns True if reads should currently go to the primary
+    def isReadPinnedToPrimary(self) -> bool:
+        if getattr(self.routingState, "pinDepth", 0) > 0:
+            return True
+        readYourWritesSeconds = self.config.get("readYourWritesSeconds", 0)
+        return (
+            (self.lastWriteTime is not None)
+            and (readYourWritesSeconds > 0)
+            and ((time.monotonic() - self.lastWriteTime) < readYourWritesSeconds)
+        )
+
+    # Function that returns the engine to use for the next query along with the read
+    # endpoint it belongs to (None for the primary). Reads are spread across healthy
+    # read endpoints in round-robin order; writes and DDL always go to the primary
+    def getRoutedEngine(self, readOnly: bool = False) -> (object, DBEndpoint):
+        if (not readOnly) or (not self.readEndpoints) or self.isReadPinnedToPrimary():
+            return self.alchemyCnxn, None
+
+        healthCheckSeconds = self.config.get("healthCheckSeconds", 30)
+        with self.routingLock:
+            endpointCount = len(self.readEndpoints)
+            for _ in range(endpointCount):
+                endpoint = self.readEndpoints[self.readEndpointIdx % endpointCount]
+                self.readEndpointIdx = (self.readEndpointIdx + 1) % endpointCount
+                if (not endpoint.isHealthy) and (
+                    time.monotonic() - endpoint.lastCheckTime >= healthCheckSeconds
+                ):
+                    self.checkEndpointHealth(endpoint=endpoint)
+                if endpoint.isHealthy:
+                    return endpoint.engine, endpoint
+
+        self.logger.debug("No healthy read endpoint found - reading from primary.")
+        return self.alchemyCnxn, None
 
     # -------------------------------------------------------------------------#
     # ------------------------- DATABASE READ/WRITE  --------------------------#
@@ -136,16 +479,28 @@ class DBConnection:
         execFunction: object = None,
         alchemySession: bool = False,
         alchemyExecute: bool = False,
+        readOnly: bool = False,
         **kwargs,
     ):
         results = None
         retryCount = 0
         retryFlag = True
         maxRetries = self.config["maxRetries"]
+        self.ensureDBConnection()
+
+        # Reads inside a temp table session must use the session's connection
+        if (
+            readOnly
+            and (getattr(self.routingState, "sessionCnxn", None) is not None)
+            and (execFunction is not None)
+        ):
+            return self.execWithSessionRetry(execFunction=execFunction, **kwargs)
+
         while retryFlag and retryCount < maxRetries:
+            engine, endpoint = self.getRoutedEngine(readOnly=readOnly)
             try:
                 if alchemySession:
-                    with Session(self.alchemyCnxn) as session:
+                    with Session(engine) as session:
                         if alchemyExecute:
                             session.execute(
                                 **kwargs,
@@ -155,7 +510,14 @@ class DBConnection:
                         session.commit()
                 else:
                     results = execFunction(con=self.pyodbcCnxn, **kwargs)
+                if not readOnly:
+                    self.lastWriteTime = time.monotonic()
             except SQLAlchemyError as err:
+                if endpoint is not None:
+                    # Read endpoint failure - retry the query on the next healthy
+                    # endpoint (or the primary once all endpoints are marked down)
+                    self.markEndpointUnhealthy(endpoint=endpoint, err=err)
+                    continue
                 self.logger.error(
                     f"{type(err)} error encountered when executing SQL query."
                 )
@@ -180,20 +542,79 @@ class DBConnection:
             retryFlag = False
         return results
 
+    # Function that executes a read on the connection of the active temp table
+    # session. On a communication failure the session connection is reopened, its
+    # temp tables are materialized again and the read is retried
+    def execWithSessionRetry(self, execFunction: object, **kwargs):
+        retryCount = 0
+        maxRetries = self.config["maxRetries"]
+        while retryCount < maxRetries:
+            try:
+                return execFunction(con=self.routingState.sessionCnxn, **kwargs)
+            except (SQLAlchemyError, pyodbc.Error) as err:
+                if not self.isCommunicationFailure(err=err):
+                    self.logger.error(
+                        f"{type(err)} error encountered when executing SQL query."
+                    )
+                    self.logger.error(err)
+                    exit()
+                retryCount += 1
+                self.logger.error(
+                    f"DB communication failure in temp table session: {retryCount}/{maxRetries}. Reconnecting."
+                )
+                self.reopenTempTableSession()
+        return None
+
+    # Function that returns True if the error is a lost/ broken DB connection
+    def isCommunicationFailure(self, err: Exception) -> bool:
+        if isinstance(err, DBAPIError):
+            if err.connection_invalidated:
+                return True
+            err = err.orig
+        return isinstance(err, pyodbc.Error) and bool(err.args) and (err.args[0] == "08S01")
+
     # Function to execute any select query and return a dataframe of results
+    # Select queries are routed to the read endpoints when they are configured
     def execSelectQuery(self, query: str) -> pd.DataFrame:
         results = self.execWithCnxnRetry(
             execFunction=pd.read_sql,
             alchemySession=True,
             alchemyExecute=False,
+            readOnly=True,
             sql=query,
             chunksize=self.config["maxReadRows"],
         )
 
         results = pd.concat([chunk for chunk in results], axis=0, ignore_index=True)
         results.reset_index(drop=True, inplace=True)
+        if self.columnUsage is not None:
+            results = self.columnUsage.track(
+                frame=results,
+                site=self.columnUsage.getCallSite(skipFiles=["db.py", "usage.py"]),
+            )
         return results
 
+    # Function that returns the fetched but never read columns by select site
+    # (only with the trackColumnUsage debug option)
+    def getColumnUsageReport(self) -> dict:
+        if self.columnUsage is None:
+            return None
+        return self.columnUsage.getUnreadColumns()
+
+    # Function to execute any select query and return an iterator over chunks of
+    # results (maxReadRows rows each) instead of one dataframe
+    def iterSelectQuery(self, query: str):
+        results = self.execWithCnxnRetry(
+            execFunction=pd.read_sql,
+            alchemySession=True,
+            alchemyExecute=False,
+            readOnly=True,
+            sql=query,
+            chunksize=self.config["maxReadRows"],
+        )
+        for chunk in results:
+            yield chunk.reset_index(drop=True)
+
     # Function to create a new table in the database, given a schema name,
     # table name and a list of columns of type DBColumn
     def execCreateTableQuery(
@@ -202,6 +623,7 @@ class DBConnection:
         columnList: list,
         indexColumns: list = None,
         dropExisting: bool = False,
+        tableDesign: DBTableDesign = None,
     ) -> bool:
 
         query = ""
@@ -211,26 +633,18 @@ class DBConnection:
             # Table already exists and dropExisting is False
             return True
 
-        query += f"CREATE TABLE {self.defaultSchema}.{tableName} ("
-        primaryKeyIndexStr = None
-        for column in columnList:
-            createStr, pkStr = column.getCreateString(tableName=tableName)
-            if pkStr is not None:
-                primaryKeyIndexStr = pkStr
-            query += createStr
-        if primaryKeyIndexStr is not None:
-            query += primaryKeyIndexStr
-
-        query += ") ON [PRIMARY]; "
-
-        if indexColumns is not None:
-            for columnName in indexColumns:
-                query += f"CREATE NONCLUSTERED INDEX [IX_{tableName}_{columnName}] ON {self.defaultSchema}.{tableName} ([{columnName}] ASC)"
-                query += " WITH (STATISTICS_NORECOMPUTE = OFF, DROP_EXISTING = OFF, ONLINE = OFF) ON [PRIMARY]; "
+        query += self.getCreateTableQuery(
+            tableName=tableName,
+            columnList=columnList,
+            indexColumns=indexColumns,
+            tableDesign=tableDesign,
+        )
 
         self.execWithCnxnRetry(
             alchemySession=True, alchemyExecute=True, statement=query
         )
+        if dropExisting:
+            self.publishTableChange(change=TableChange(tableName=tableName))
 
         return True
 
@@ -258,6 +672,7 @@ class DBConnection:
             self.execWithCnxnRetry(
                 alchemySession=True, alchemyExecute=True, statement=query
             )
+            self.publishTableChange(change=TableChange(tableName=tableName))
 
         if (self.config["bcpToggle"] == 1) and (
             insertData.shape[0] >= self.config["maxInsertRows"]
@@ -274,6 +689,9 @@ class DBConnection:
                 chunksize=self.config["maxInsertRows"],
                 method=None,
             )
+        self.publishTableChange(
+            change=TableChange.fromData(tableName=tableName, data=insertData)
+        )
 
         return True
 
@@ -285,7 +703,10 @@ class DBConnection:
         for col in deleteData.columns:
             deleteQueries.append((col, list(deleteData[col])))
         return self.execDeleteByQueries(
-            tableName=tableName, deleteQueries=deleteQueries, isQueryCondition=False
+            tableName=tableName,
+            deleteQueries=deleteQueries,
+            isQueryCondition=False,
+            deleteData=deleteData,
         )
 
     # Function to delete rows from an SQL table filtered by a delete query
@@ -297,8 +718,13 @@ class DBConnection:
         )
 
     # Function to delete rows from an SQL table filtered by multiple delete queries
+    # deleteData (the rows of a delete by value) is passed on with the TableChange
     def execDeleteByQueries(
-        self, tableName: str, deleteQueries: list, isQueryCondition: bool = True
+        self,
+        tableName: str,
+        deleteQueries: list,
+        isQueryCondition: bool = True,
+        deleteData: pd.DataFrame = None,
     ) -> bool:
         if not self.checkTableExists(
             tableName=tableName, schemaName=self.defaultSchema
@@ -314,14 +740,96 @@ class DBConnection:
         self.execWithCnxnRetry(
             alchemySession=True, alchemyExecute=True, statement=query
         )
+        # Deletes by value can be narrowed down to the deleted ids, deletes by
+        # subquery invalidate the whole table
+        changedKeys = None
+        if not isQueryCondition:
+            changedKeys = {
+                filterColumn: filterValue
+                if isinstance(filterValue, list)
+                else [filterValue]
+                for filterColumn, filterValue in deleteQueries
+                if (filterColumn is not None) and filterColumn.endswith("Id")
+            }
+        self.publishTableChange(
+            change=TableChange(
+                tableName=tableName,
+                changedKeys=changedKeys,
+                rows=None if isQueryCondition else deleteData,
+                isDelete=True,
+            )
+        )
         return True
 
+    # Function that deletes the rows matching deleteData (same semantics as
+    # execDeleteByData) and inserts insertData in one transaction, so readers never
+    # see the table with the old rows deleted and the new ones not yet inserted
+    def execReplaceByData(
+        self, tableName: str, deleteData: pd.DataFrame, insertData: pd.DataFrame
+    ) -> bool:
+        if not self.checkTableExists(
+            tableName=tableName, schemaName=self.defaultSchema
+        ):
+            self.logger.warn(f"Replace statement failed - {tableName} does not exist.")
+            return False
+
+        deleteQuery = f"DELETE FROM [{self.defaultSchema}].[{tableName}]"
+        deleteQuery += self.getMultipleConditionsSQL(
+            filterConditions=[
+                (col, list(deleteData[col])) for col in deleteData.columns
+            ],
+            isQueryCondition=False,
+        )
+
+        def replaceRows(con):
+            with con.begin() as cnxn:
+                cnxn.exec_driver_sql(deleteQuery)
+                if not self.utils.isNullDataFrame(insertData):
+                    insertData.to_sql(
+                        name=tableName,
+                        con=cnxn,
+                        schema=self.defaultSchema,
+                        if_exists="append",
+                        index=False,
+                        chunksize=self.config["maxInsertRows"],
+                    )
+            return True
+
+        result = self.execWithCnxnRetry(execFunction=replaceRows, alchemySession=True)
+        self.publishTableChange(
+            change=TableChange.fromData(
+                tableName=tableName, data=deleteData, isDelete=True
+            )
+        )
+        if not self.utils.isNullDataFrame(insertData):
+            self.publishTableChange(
+                change=TableChange.fromData(tableName=tableName, data=insertData)
+            )
+        return bool(result)
+
     # Function to drop an SQL table from the DB
     def dropTableFromDB(self, tableName: str):
         query = f"DROP TABLE IF EXISTS {self.defaultSchema}.{tableName}; "
         self.execWithCnxnRetry(
             alchemySession=True, alchemyExecute=True, statement=query
         )
+        self.publishTableChange(change=TableChange(tableName=tableName))
+        return
+
+    # Function that registers a listener called with the TableChange of every
+    # write made through this connection (e.g. CacheDependencies.publish)
+    def addInvalidationListener(self, listener: object):
+        self.invalidationListeners.append(listener)
+        return
+
+    # Function that notifies the invalidation listeners of a table change
+    def publishTableChange(self, change: TableChange):
+        for listener in list(self.invalidationListeners):
+            try:
+                listener(change)
+            except Exception as err:
+                self.logger.error(f"Invalidation listener failed for {change.tableName}.")
+                self.logger.error(err)
         return
 
     # Function that takes as input a dataframe and writes it to the DB
@@ -335,6 +843,7 @@ class DBConnection:
         addUpdateDate: bool = True,
         overrideTypes: dict = None,
         indexColumns: list = None,
+        tableDesign: DBTableDesign = None,
     ) -> bool:
 
         if addUpdateDate and ("UpdatedOn" not in data):
@@ -356,6 +865,7 @@ class DBConnection:
                 columnList=columnList,
                 indexColumns=indexColumns,
                 dropExisting=False,
+                tableDesign=tableDesign,
             )
 
         insertResult = False
@@ -384,6 +894,83 @@ class DBConnection:
         )
         return
 
+    # -------------------------------------------------------------------------#
+    # ------------------------ SESSION TEMP TABLES ----------------------------#
+
+    # Context manager that holds one connection for the current thread so that
+    # shared subqueries can be materialized once into indexed #temp tables and
+    # reused by the follow-up selects. The temp tables are dropped on exit
+    # The session is pinned to the primary - temp tables live on one server and
+    # the materialized rows must not lag behind recent writes
+    @contextmanager
+    def tempTableSession(self):
+        if getattr(self.routingState, "sessionCnxn", None) is not None:
+            # Nested session - keep using the outer connection and temp tables
+            yield self
+            return
+
+        self.ensureDBConnection()
+        self.routingState.sessionCnxn = self.alchemyCnxn.connect()
+        self.routingState.tempTables = list()
+        try:
+            yield self
+        finally:
+            cnxn = self.routingState.sessionCnxn
+            for tempTable, _ in self.routingState.tempTables:
+                try:
+                    cnxn.exec_driver_sql(f"DROP TABLE IF EXISTS {tempTable}")
+                except SQLAlchemyError as err:
+                    self.logger.warn(f"Failed to drop temp table {tempTable}.")
+                    self.logger.debug(err)
+            cnxn.close()
+            self.routingState.sessionCnxn = None
+            self.routingState.tempTables = None
+
+    # Function that replaces a broken temp table session connection with a new
+    # one to the primary and materializes the session's temp tables again
+    def reopenTempTableSession(self):
+        try:
+            self.routingState.sessionCnxn.close()
+        except SQLAlchemyError as err:
+            self.logger.debug(err)
+        cnxn = self.alchemyCnxn.connect()
+        self.routingState.sessionCnxn = cnxn
+        for tempTable, tempQuery in self.routingState.tempTables:
+            cnxn.exec_driver_sql(tempQuery)
+        cnxn.commit()
+
+    # Function that materializes the distinct rows of a select query into an indexed
+    # #temp table and returns a query over the temp table that can replace the
+    # original one in IN (...) filters. Outside a temp table session (or if the
+    # temp table cannot be created) the original query is returned unchanged
+    def materializeQuery(
+        self,
+        query: str,
+        tableName: str,
+        columnList: list,
+        indexColumns: list = None,
+    ) -> str:
+        cnxn = getattr(self.routingState, "sessionCnxn", None)
+        if (cnxn is None) or (query is None):
+            return query
+
+        tempTable = f"#{tableName}_{len(self.routingState.tempTables)}"
+        columnsStr = ",".join(columnList)
+        tempQuery = f"SELECT DISTINCT {columnsStr} INTO {tempTable} FROM ({query}) AS src; "
+        if not self.utils.isNullList(indexColumns):
+            indexStr = ", ".join([f"[{col}] ASC" for col in indexColumns])
+            tempQuery += f"CREATE CLUSTERED INDEX [IX_{tableName}] ON {tempTable} ({indexStr}); "
+        try:
+            cnxn.exec_driver_sql(tempQuery)
+            cnxn.commit()
+        except SQLAlchemyError as err:
+            self.logger.warn(f"Failed to materialize {tableName} - using subquery.")
+            self.logger.debug(err)
+            return query
+
+        self.routingState.tempTables.append((tempTable, tempQuery))
+        return f"SELECT {columnsStr} FROM {tempTable}"
+
     # -------------------------------------------------------------------------#
     # -----------------------  SELECT QUERY VARIATIONS ------------------------#
 
@@ -449,6 +1036,10 @@ class DBConnection:
         return data, baseQuery
 
     # Function to select specific columns from a specific table with a date filter
+    # With parallelParts > 1 (or partitionBoundaries) the date window is split into
+    # subranges that are read concurrently and stitched back in date order
+    # With asIterator, an iterator over chunks of maxReadRows rows is returned
+    # instead (in date order for parallel reads)
     def selectWithDates(
         self,
         tableName: str,
@@ -458,6 +1049,9 @@ class DBConnection:
         dateStart: datetime = None,
         dateEnd: datetime = None,
         onlyQuery: bool = False,
+        parallelParts: int = None,
+        partitionBoundaries: list = None,
+        asIterator: bool = False,
     ) -> (pd.DataFrame, str):
         def addDates(query: str):
             return self.addDatesFilterToQuery(
@@ -478,13 +1072,153 @@ class DBConnection:
         execQuery, baseQuery = self.getSelectQuery(
             tableName=tableName, schemaName=schemaName, columnList=columnList
         )
+        dateRanges = self.getDateSubranges(
+            dateStart=dateStart,
+            dateEnd=dateEnd,
+            parts=parallelParts,
+            partitionBoundaries=partitionBoundaries,
+        )
+        rangeQueries = [
+            self.addDatesFilterToQuery(
+                query=execQuery,
+                dateColumn=dateColumn,
+                dateStart=rangeStart,
+                includeStart=True,
+                dateEnd=rangeEnd,
+                includeEnd=(idx == len(dateRanges) - 1),
+            )
+            for idx, (rangeStart, rangeEnd) in enumerate(dateRanges)
+        ]
         execQuery = addDates(query=execQuery)
         baseQuery = addDates(query=baseQuery)
         if onlyQuery:
             return None, baseQuery
-        data = self.execSelectQuery(query=execQuery)
+        if len(rangeQueries) > 1:
+            data = self.execParallelSelectQueries(
+                queries=rangeQueries, asIterator=asIterator
+            )
+        elif asIterator:
+            data = self.iterSelectQuery(query=execQuery)
+        else:
+            data = self.execSelectQuery(query=execQuery)
         return data, baseQuery
 
+    # Function that splits [dateStart, dateEnd] into contiguous subranges - either
+    # at the given partition boundaries or into equal parts. Each subrange includes
+    # its start date and excludes its end date (except for the last one)
+    def getDateSubranges(
+        self,
+        dateStart: datetime,
+        dateEnd: datetime,
+        parts: int = None,
+        partitionBoundaries: list = None,
+    ) -> list:
+        if (dateStart is None) or (dateEnd is None) or (dateStart >= dateEnd):
+            return [(dateStart, dateEnd)]
+
+        if partitionBoundaries is not None:
+            splitDates = sorted(
+                [d for d in partitionBoundaries if dateStart < d < dateEnd]
+            )
+        elif (parts is not None) and (parts > 1):
+            step = (dateEnd - dateStart) / parts
+            splitDates = [dateStart + (step * idx) for idx in range(1, parts)]
+        else:
+            return [(dateStart, dateEnd)]
+
+        rangeDates = [dateStart] + splitDates + [dateEnd]
+        return list(zip(rangeDates[:-1], rangeDates[1:]))
+
+    # Function that executes a list of select queries concurrently on pooled
+    # connections and returns the results stitched in the order of the queries
+    # With asIterator, the queries are streamed in chunks instead (see
+    # iterParallelSelectQueries)
+    def execParallelSelectQueries(self, queries: list, asIterator: bool = False):
+        if getattr(self.routingState, "sessionCnxn", None) is not None:
+            # Worker threads cannot see the session's connection or its temp tables
+            raise RuntimeError(
+                "Parallel reads are not supported inside a temp table session."
+            )
+        self.ensureDBConnection()
+        maxWorkers = min(len(queries), self.config.get("maxReadWorkers", 4))
+        if asIterator:
+            return self.iterParallelSelectQueries(
+                queries=queries,
+                maxWorkers=maxWorkers,
+                routingContext=self.getRoutingContext(),
+            )
+        executor = ThreadPoolExecutor(
+            max_workers=maxWorkers, thread_name_prefix="DBParallelRead"
+        )
+        # Workers read with the routing state of the caller (read-your-writes pin)
+        execSelectQuery = self.bindRoutingContext(function=self.execSelectQuery)
+        futures = [
+            executor.submit(execSelectQuery, query=query) for query in queries
+        ]
+        executor.shutdown(wait=False)
+
+        results = pd.concat(
+            [future.result() for future in futures], axis=0, ignore_index=True
+        )
+        results.reset_index(drop=True, inplace=True)
+        return results
+
+    # Function that streams a list of select queries concurrently and yields their
+    # chunks (maxReadRows rows each) in the order of the queries. Each worker
+    # reads its query with iterSelectQuery and stays at most maxQueuedChunks
+    # chunks ahead of the consumer, so memory is bounded by the running workers
+    # rather than by the size of the result. Closing the iterator stops the workers
+    def iterParallelSelectQueries(
+        self, queries: list, maxWorkers: int, routingContext: dict = None
+    ):
+        chunkQueues = [
+            queue.Queue(maxsize=self.config.get("maxQueuedChunks", 2)) for _ in queries
+        ]
+        stopEvent = threading.Event()
+        endOfQuery = object()
+
+        def putChunk(chunkQueue: queue.Queue, item: object) -> bool:
+            while not stopEvent.is_set():
+                try:
+                    chunkQueue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def streamQuery(query: str, chunkQueue: queue.Queue):
+            try:
+                for chunk in self.iterSelectQuery(query=query):
+                    if not putChunk(chunkQueue=chunkQueue, item=chunk):
+                        return
+            except Exception as err:
+                putChunk(chunkQueue=chunkQueue, item=err)
+                return
+            putChunk(chunkQueue=chunkQueue, item=endOfQuery)
+
+        # Workers read with the routing state of the caller (read-your-writes pin)
+        streamQuery = self.bindRoutingContext(
+            function=streamQuery, routingContext=routingContext
+        )
+        # Workers start in query order, so the query being consumed is always running
+        executor = ThreadPoolExecutor(
+            max_workers=maxWorkers, thread_name_prefix="DBParallelRead"
+        )
+        for query, chunkQueue in zip(queries, chunkQueues):
+            executor.submit(streamQuery, query, chunkQueue)
+        executor.shutdown(wait=False)
+        try:
+            for chunkQueue in chunkQueues:
+                while True:
+                    item = chunkQueue.get()
+                    if item is endOfQuery:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+        finally:
+            stopEvent.set()
+
     # Function to select specific columns from a specific table with an
     # additional sql query as filter
     def selectWithSQL(
@@ -568,6 +1302,87 @@ class DBConnection:
     # -------------------------------------------------------------------------#
     # -------------------------- SQL UTIL FUNCTIONS ---------------------------#
 
+    # Function that generates the CREATE TABLE statement (and its partition
+    # function, columnstore and secondary indexes) for a given physical design
+    # No DB access is needed so the generated DDL can be checked directly
+    def getCreateTableQuery(
+        self,
+        tableName: str,
+        columnList: list,
+        indexColumns: list = None,
+        tableDesign: DBTableDesign = None,
+    ) -> str:
+        if tableDesign is None:
+            tableDesign = DBTableDesign()
+        tableDesign.validate()
+        storageStr = tableDesign.getStorageString()
+        partitionColumns = tableDesign.getPartitionColumns()
+        rowstoreCompression = tableDesign.getRowstoreCompression()
+
+        query = self.getPartitionQuery(tableDesign=tableDesign)
+        query += f"CREATE TABLE {self.defaultSchema}.{tableName} ("
+        primaryKeyIndexStr = None
+        for column in columnList:
+            if tableDesign.isPartitioned() and (
+                column.columnName == tableDesign.partitionColumn
+            ):
+                # Partition column is part of the primary key so it cannot be null
+                column = replace(column, isNullable=False)
+            createStr, pkStr = column.getCreateString(
+                tableName=tableName,
+                isClustered=not tableDesign.isColumnstore,
+                storageStr=storageStr,
+                extraKeyColumns=partitionColumns,
+            )
+            if pkStr is not None:
+                primaryKeyIndexStr = pkStr
+            query += createStr
+        if primaryKeyIndexStr is not None:
+            query += primaryKeyIndexStr
+
+        query += f") ON {storageStr}"
+        if (not tableDesign.isColumnstore) and (rowstoreCompression is not None):
+            query += f" WITH (DATA_COMPRESSION = {rowstoreCompression})"
+        query += "; "
+
+        if tableDesign.isColumnstore:
+            query += (
+                f"CREATE CLUSTERED COLUMNSTORE INDEX [CCI_{tableName}] ON {self.defaultSchema}.{tableName} "
+                + f"WITH (DATA_COMPRESSION = {tableDesign.getColumnstoreCompression()}) ON {storageStr}; "
+            )
+
+        indexList = [DBIndex(columns=[col]) for col in (indexColumns or [])]
+        indexList += tableDesign.indexes or []
+        for index in indexList:
+            query += index.getCreateString(
+                tableName=tableName,
+                schemaName=self.defaultSchema,
+                storageStr=storageStr,
+                compression=rowstoreCompression,
+                extraKeyColumns=partitionColumns,
+            )
+
+        return query
+
+    # Function that generates the partition function and scheme for a partitioned
+    # table design - both are only created if they do not exist yet
+    def getPartitionQuery(self, tableDesign: DBTableDesign) -> str:
+        if not tableDesign.isPartitioned():
+            return ""
+        boundariesStr = self.getSQLString(filterValue=tableDesign.partitionBoundaries)
+        partitionScheme = tableDesign.getPartitionScheme()
+        query = (
+            f"IF NOT EXISTS (SELECT 1 FROM sys.partition_functions WHERE name = '{tableDesign.partitionFunction}') "
+            + f"CREATE PARTITION FUNCTION [{tableDesign.partitionFunction}] ({tableDesign.partitionColumnType}) "
+            + f"AS RANGE RIGHT FOR VALUES ({boundariesStr}); "
+        )
+        query += (
+            f"IF NOT EXISTS (SELECT 1 FROM sys.partition_schemes WHERE name = '{partitionScheme}') "
+            + f"CREATE PARTITION SCHEME [{partitionScheme}] "
+            + f"AS PARTITION [{tableDesign.partitionFunction}] ALL TO ([PRIMARY]); "
+        )
+        return query
+
     # Function that generates a list of sql columns based on the dataframe
     def getColumnListFromData(
         self,
@@ -622,6 +1437,26 @@ class DBConnection:
         results = self.execSelectQuery(query)
         return results, str
 
+    # Function that returns the aggregate checksum of a table (or view) so that
+    # cached copies can check if the source rows have changed
+    def selectChecksum(
+        self,
+        tableName: str,
+        schemaName: str = None,
+        filterConditions: list = None,
+    ) -> int:
+        _, baseQuery = self.getSelectQuery(tableName=tableName, schemaName=schemaName)
+        query = self.setSelectColumns(
+            query=baseQuery,
+            columnList=["CHECKSUM_AGG(BINARY_CHECKSUM(*)) AS TableChecksum"],
+        )
+        query += self.getMultipleConditionsSQL(filterConditions=filterConditions)
+        results = self.execSelectQuery(query=query)
+        if self.utils.isNullDataFrame(results):
+            return None
+        checksum = results["TableChecksum"].iloc[0]
+        return None if pd.isna(checksum) else int(checksum)
+
     def setSelectColumns(self, query: str, columnList: list) -> str:
         if self.utils.isNullList(columnList):
             return query
@@ -638,6 +1473,33 @@ class DBConnection:
         execQuery = self.setSelectColumns(query=baseQuery, columnList=columnList)
         return execQuery, baseQuery
 
+    # Function that returns the base select query with WHERE conditions, without
+    # checking the table or running the query
+    def getSelectWithWheresQuery(
+        self, tableName: str, schemaName: str = None, filterConditions: list = None
+    ) -> str:
+        _, baseQuery = self.getSelectQuery(tableName=tableName, schemaName=schemaName)
+        baseQuery += self.getMultipleConditionsSQL(filterConditions=filterConditions)
+        return baseQuery
+
+    # Function that returns the select query of the given columns with additional
+    # sql queries as filters, without checking the table or running the query
+    def getSelectWithSQLsQuery(
+        self,
+        tableName: str,
+        schemaName: str = None,
+        columnList: list = None,
+        filterQueries: list = None,
+    ) -> str:
+        execQuery, _ = self.getSelectQuery(
+            tableName=tableName, schemaName=schemaName, columnList=columnList
+        )
+        for filterColumn, filterQuery in filterQueries or []:
+            if (filterColumn is not None) & (filterQuery is not None):
+                connectorStr = "AND" if "WHERE" in execQuery else "WHERE"
+                execQuery += f" {connectorStr} {filterColumn} IN ({filterQuery})"
+        return execQuery
+
     # Function that generates the SQL WHERE condition statement based
     # on the list of filter conditions
     def getMultipleConditionsSQL(
@@ -0,0 +1,95 @@
+import threading
+import numpy as np
+import pandas as pd
+import logging
+
+
+# Cache of the excluded QuestionIds of each CourseChapter, kept as sorted integer
+# arrays so that exclusion checks are vectorized binary searches. Chapters are
+# loaded on first use (all missing chapters with a single load call) and dropped
+# with invalidate() when their exclusions are written. Loads that overlap an
+# invalidate() are returned to their caller but not cached
+class QuestionExclusions:
+
+    logger = None
+    chapterExclusions: dict = None
+    lock: object = None
+    generation: int = 0
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.chapterExclusions = dict()
+        self.lock = threading.Lock()
+        self.generation = 0
+
+    # Function that returns the sorted excluded QuestionIds of the given chapters,
+    # loading the uncached ones with loadFunction(courseChapterIds). loadFunction
+    # returns a frame of (CourseChapterId, QuestionId) rows (or None)
+    def get(self, courseChapterIds: list, loadFunction: object) -> dict:
+        with self.lock:
+            chapterArrays = {
+                courseChapterId: self.chapterExclusions[courseChapterId]
+                for courseChapterId in courseChapterIds
+                if courseChapterId in self.chapterExclusions
+            }
+            generation = self.generation
+        missingIds = [
+            courseChapterId
+            for courseChapterId in courseChapterIds
+            if courseChapterId not in chapterArrays
+        ]
+        if len(missingIds) > 0:
+            chapterArrays.update(
+                self.set(
+                    exclusions=loadFunction(missingIds),
+                    courseChapterIds=missingIds,
+                    generation=generation,
+                )
+            )
+        return {
+            courseChapterId: chapterArrays.get(
+                courseChapterId, np.array([], dtype=np.int64)
+            )
+            for courseChapterId in courseChapterIds
+        }
+
+    # Function that stores the exclusions of the given chapters - chapters without
+    # rows are cached as empty arrays. With generation, nothing is cached if the
+    # exclusions were invalidated since that generation. Returns the arrays
+    def set(
+        self, exclusions: pd.DataFrame, courseChapterIds: list, generation: int = None
+    ) -> dict:
+        chapterArrays = {
+            courseChapterId: np.array([], dtype=np.int64)
+            for courseChapterId in courseChapterIds
+        }
+        if (exclusions is not None) and (exclusions.shape[0] > 0):
+            for courseChapterId, rows in exclusions.groupby("CourseChapterId"):
+                chapterArrays[courseChapterId] = np.unique(
+                    rows["QuestionId"].to_numpy(dtype=np.int64)
+                )
+        with self.lock:
+            if (generation is None) or (generation == self.generation):
+                self.chapterExclusions.update(chapterArrays)
+        return chapterArrays
+
+    # Function that returns a boolean mask of the questionIds excluded in a chapter
+    def contains(self, excludedIds: np.ndarray, questionIds) -> np.ndarray:
+        questionIds = np.asarray(questionIds, dtype=np.int64)
+        if len(excludedIds) == 0:
+            return np.zeros(len(questionIds), dtype=bool)
+        positions = np.minimum(
+            np.searchsorted(excludedIds, questionIds), len(excludedIds) - 1
+        )
+        return excludedIds[positions] == questionIds
+
+    # Function that drops the cached exclusions of the given chapters (or all)
+    def invalidate(self, courseChapterIds: list = None):
+        with self.lock:
+            self.generation += 1
+            if courseChapterIds is None:
+                self.chapterExclusions = dict()
+            else:
+                for courseChapterId in courseChapterIds:
+                    self.chapterExclusions.pop(courseChapterId, None)
+        return
@@ -0,0 +1,112 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import logging
+
+
+# Writer that streams frames to a single Parquet or CSV file one frame at a time
+# Parquet frames are appended as row groups and CSV frames as appended rows, so
+# only the frame being written is held in memory. The column order of the first
+# frame is kept for every later frame. Parquet column types are taken from
+# columnTypes (pyarrow type aliases, e.g. "int64") and otherwise inferred from
+# the first frame - columns that are all null there are written as strings
+class MappingExportWriter:
+
+    logger = None
+    filePath: str = None
+    tmpPath: str = None
+    fileFormat: str = None
+    compression: str = None
+    columnTypes: dict = None
+    columns: list = None
+    schema: pa.Schema = None
+    parquetWriter: pq.ParquetWriter = None
+    rowCount: int = 0
+    frameCount: int = 0
+
+    def __init__(
+        self,
+        filePath: str,
+        fileFormat: str = None,
+        compression: str = "zstd",
+        columnTypes: dict = None,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.filePath = filePath
+        if fileFormat is None:
+            fileFormat = "csv" if filePath.lower().endswith(".csv") else "parquet"
+        if fileFormat not in ("parquet", "csv"):
+            raise ValueError(f"Unsupported export format - {fileFormat}")
+        self.fileFormat = fileFormat
+        self.compression = compression
+        self.columnTypes = dict(columnTypes or dict())
+
+        exportDir = os.path.dirname(self.filePath)
+        if (exportDir != "") and (not os.path.exists(exportDir)):
+            os.makedirs(exportDir)
+        # Write to a temp file first so that readers never see partial exports
+        self.tmpPath = self.filePath + ".tmp"
+        if os.path.exists(self.tmpPath):
+            os.remove(self.tmpPath)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close(commit=excType is None)
+        return False
+
+    # Function that appends one frame to the export file
+    def write(self, frame: pd.DataFrame):
+        if (frame is None) or (frame.shape[0] == 0):
+            return
+        if self.columns is None:
+            self.columns = list(frame.columns)
+        frame = frame.reindex(columns=self.columns)
+
+        if self.fileFormat == "parquet":
+            if self.schema is None:
+                self.schema = self.getSchema(frame=frame)
+                self.parquetWriter = pq.ParquetWriter(
+                    self.tmpPath, schema=self.schema, compression=self.compression
+                )
+            table = pa.Table.from_pandas(
+                frame, schema=self.schema, preserve_index=False, safe=False
+            )
+            self.parquetWriter.write_table(table)
+        else:
+            frame.to_csv(
+                self.tmpPath, mode="a", header=(self.frameCount == 0), index=False
+            )
+
+        self.rowCount += frame.shape[0]
+        self.frameCount += 1
+        return
+
+    # Function that builds the parquet schema of the export from the declared
+    # column types and the types of the first frame
+    def getSchema(self, frame: pd.DataFrame) -> pa.Schema:
+        fields = list()
+        for field in pa.Schema.from_pandas(frame, preserve_index=False):
+            fieldType = field.type
+            if field.name in self.columnTypes:
+                fieldType = pa.type_for_alias(self.columnTypes[field.name])
+            elif pa.types.is_null(fieldType):
+                fieldType = pa.string()
+            fields.append(pa.field(field.name, fieldType))
+        return pa.schema(fields)
+
+    # Function that finishes the export file (or discards it without commit)
+    def close(self, commit: bool = True):
+        if self.parquetWriter is not None:
+            self.parquetWriter.close()
+            self.parquetWriter = None
+        if not os.path.exists(self.tmpPath):
+            self.logger.warn(f"Nothing written to {self.filePath}.")
+            return
+        if commit:
+            os.replace(self.tmpPath, self.filePath)
+        else:
+            os.remove(self.tmpPath)
+        return
@@ -0,0 +1,303 @@
+import threading
+import numpy as np
+import pandas as pd
+import logging
+
+
+# Compressed sparse row (CSR) index over the edges of one mapping table, keyed
+# either by the source id (forward) or by the destination id (reverse)
+class CSRIndex:
+
+    keyIds: np.ndarray = None
+    indptr: np.ndarray = None
+    edgePositions: np.ndarray = None
+
+    def __init__(self, edgeKeys: np.ndarray):
+        self.keyIds, keyCodes = np.unique(edgeKeys, return_inverse=True)
+        self.edgePositions = np.argsort(keyCodes, kind="stable")
+        counts = np.bincount(keyCodes, minlength=len(self.keyIds))
+        self.indptr = np.concatenate([[0], np.cumsum(counts)])
+
+    # Function that returns the positions of all edges for the given keys along
+    # with the index of the key each edge belongs to - O(edges touched)
+    def lookup(self, ids: np.ndarray) -> (np.ndarray, np.ndarray):
+        ids = np.asarray(ids)
+        if (len(self.keyIds) == 0) or (len(ids) == 0):
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+        codes = np.searchsorted(self.keyIds, ids)
+        codes = np.minimum(codes, len(self.keyIds) - 1)
+        isFound = self.keyIds[codes] == ids
+        starts = np.where(isFound, self.indptr[codes], 0)
+        lengths = np.where(isFound, self.indptr[codes + 1] - starts, 0)
+
+        owners = np.repeat(np.arange(len(ids)), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths
+        )
+        positions = self.edgePositions[np.repeat(starts, lengths) + offsets]
+        return positions, owners
+
+
+# Edges of one mapping table (e.g. KSCClusterId -> KSCId) with any extra columns
+# kept as edge attributes. Saved changes go to a small delta on top of the base
+# edges - removed base positions and a frame of added edges with its own CSR
+# indexes - so an update only costs O(changed edges). The delta is merged into
+# the base once it grows past compactRatio of the base. Base, delta and their
+# indexes are swapped together as one snapshot, so readers never see a
+# half-applied update
+class MappingEdges:
+
+    srcColumn: str = None
+    dstColumn: str = None
+    compactRatio: float = None
+    snapshot: tuple = None
+
+    def __init__(
+        self,
+        srcColumn: str,
+        dstColumn: str,
+        edges: pd.DataFrame,
+        compactRatio: float = 0.1,
+    ):
+        self.srcColumn = srcColumn
+        self.dstColumn = dstColumn
+        self.compactRatio = compactRatio
+        self.setEdges(edges=edges)
+
+    # Function that returns all current edges (base without the removed edges
+    # followed by the added ones) - O(edges), meant for full rebuilds only
+    @property
+    def edges(self) -> pd.DataFrame:
+        baseEdges, _, _, removed, delta, _, _ = self.snapshot
+        if (len(removed) == 0) and (len(delta) == 0):
+            return baseEdges
+        isKept = np.ones(len(baseEdges), dtype=bool)
+        isKept[removed] = False
+        return pd.concat([baseEdges.loc[isKept], delta], ignore_index=True)
+
+    def setEdges(self, edges: pd.DataFrame):
+        edges = edges.reset_index(drop=True)
+        self.snapshot = (
+            edges,
+            self.getIndex(edges=edges, column=self.srcColumn),
+            self.getIndex(edges=edges, column=self.dstColumn),
+            np.array([], dtype=np.int64),
+            edges.iloc[0:0],
+            self.getIndex(edges=edges.iloc[0:0], column=self.srcColumn),
+            self.getIndex(edges=edges.iloc[0:0], column=self.dstColumn),
+        )
+
+    def getIndex(self, edges: pd.DataFrame, column: str) -> CSRIndex:
+        return CSRIndex(edgeKeys=edges[column].to_numpy())
+
+    # Function that returns the (frame, positions, owners) of the base and delta
+    # edges from (or, with reverse, to) the given ids
+    def lookupParts(self, ids, reverse: bool = False) -> list:
+        ids = np.asarray(ids)
+        baseEdges, forward, reverseIndex, removed, delta, deltaForward, deltaReverse = (
+            self.snapshot
+        )
+        positions, owners = (reverseIndex if reverse else forward).lookup(ids=ids)
+        if len(removed) > 0:
+            isKept = ~np.isin(positions, removed)
+            positions, owners = positions[isKept], owners[isKept]
+        parts = [(baseEdges, positions, owners)]
+        if len(delta) > 0:
+            positions, owners = (deltaReverse if reverse else deltaForward).lookup(ids=ids)
+            parts.append((delta, positions, owners))
+        return parts
+
+    # Function that returns the values of one column for the edges from (or, with
+    # reverse, to) the given ids along with the index of the id of each edge
+    def lookupValues(
+        self, ids, column: str, reverse: bool = False
+    ) -> (np.ndarray, np.ndarray):
+        parts = self.lookupParts(ids=ids, reverse=reverse)
+        values = np.concatenate(
+            [edges[column].to_numpy()[positions] for edges, positions, _ in parts]
+        )
+        owners = np.concatenate([owners for _, _, owners in parts])
+        order = np.argsort(owners, kind="stable")
+        return values[order], owners[order]
+
+    # Function that returns the edge rows from (or, with reverse, to) the given ids
+    def lookup(self, ids, reverse: bool = False) -> pd.DataFrame:
+        parts = self.lookupParts(ids=ids, reverse=reverse)
+        if len(parts) == 1:
+            edges, positions, _ = parts[0]
+            return edges.iloc[positions].reset_index(drop=True)
+        rows = pd.concat(
+            [edges.iloc[positions] for edges, positions, _ in parts], ignore_index=True
+        )
+        owners = np.concatenate([owners for _, _, owners in parts])
+        return rows.iloc[np.argsort(owners, kind="stable")].reset_index(drop=True)
+
+    # Function that returns the base positions and delta rows holding any of
+    # the given (src, dst) pairs - only the edges of the given sources are read
+    def findEdges(
+        self,
+        edges: pd.DataFrame,
+        baseEdges: pd.DataFrame,
+        forward: CSRIndex,
+        removed: np.ndarray,
+        delta: pd.DataFrame,
+    ) -> (np.ndarray, np.ndarray):
+        keys = pd.MultiIndex.from_frame(edges[[self.srcColumn, self.dstColumn]])
+        srcIds = np.unique(edges[self.srcColumn].to_numpy())
+
+        positions, _ = forward.lookup(ids=srcIds)
+        positions = positions[~np.isin(positions, removed)]
+        candidates = baseEdges.iloc[positions]
+        isFound = pd.MultiIndex.from_frame(
+            candidates[[self.srcColumn, self.dstColumn]]
+        ).isin(keys)
+        isDeltaFound = pd.MultiIndex.from_frame(
+            delta[[self.srcColumn, self.dstColumn]]
+        ).isin(keys)
+        return positions[isFound], isDeltaFound
+
+    # Function that applies added and removed edges to the delta - existing
+    # (src, dst) pairs of added edges are replaced
+    def updateEdges(
+        self, addedEdges: pd.DataFrame = None, removedEdges: pd.DataFrame = None
+    ):
+        baseEdges, forward, reverse, removed, delta, _, _ = self.snapshot
+        for edges in [removedEdges, addedEdges]:
+            if (edges is None) or (len(edges) == 0):
+                continue
+            basePositions, isDeltaFound = self.findEdges(
+                edges=edges,
+                baseEdges=baseEdges,
+                forward=forward,
+                removed=removed,
+                delta=delta,
+            )
+            removed = np.union1d(removed, basePositions)
+            delta = delta.loc[~isDeltaFound]
+        if (addedEdges is not None) and (len(addedEdges) > 0):
+            addedEdges = addedEdges.drop_duplicates(
+                subset=[self.srcColumn, self.dstColumn], keep="last"
+            )
+            delta = pd.concat(
+                [delta, addedEdges.reindex(columns=baseEdges.columns)], ignore_index=True
+            )
+        delta = delta.reset_index(drop=True)
+
+        if len(removed) + len(delta) > self.compactRatio * max(len(baseEdges), 1):
+            isKept = np.ones(len(baseEdges), dtype=bool)
+            isKept[removed] = False
+            self.setEdges(edges=pd.concat([baseEdges.loc[isKept], delta]))
+            return
+        self.snapshot = (
+            baseEdges,
+            forward,
+            reverse,
+            removed,
+            delta,
+            self.getIndex(edges=delta, column=self.srcColumn),
+            self.getIndex(edges=delta, column=self.dstColumn),
+        )
+
+    # Function that adds new edges - existing (src, dst) pairs are replaced
+    def addEdges(self, edges: pd.DataFrame):
+        self.updateEdges(addedEdges=edges)
+
+    # Function that removes the given (src, dst) pairs
+    def removeEdges(self, edges: pd.DataFrame):
+        self.updateEdges(removedEdges=edges)
+
+
+# In-process graph of the content mapping:
+# CourseChapter -> KSCCluster -> KSC -> Question
+# Every edge type is a MappingEdges store with forward and reverse CSR indexes,
+# so traversals in either direction only touch the edges they return
+class MappingGraph:
+
+    # Edge type -> (source id column, destination id column)
+    edgeTypes = {
+        "ChapterCluster": ("CourseChapterId", "KSCClusterId"),
+        "ClusterKSC": ("KSCClusterId", "KSCId"),
+        "KSCQuestion": ("KSCId", "QuestionId"),
+    }
+    # Order of edge types from CourseChapter down to Question
+    pathOrder = ["ChapterCluster", "ClusterKSC", "KSCQuestion"]
+
+    logger = None
+    edges: dict = None
+    updateLock: object = None
+
+    def __init__(self, edgeData: dict):
+        self.logger = logging.getLogger(__name__)
+        self.updateLock = threading.Lock()
+        self.edges = dict()
+        for edgeType, data in edgeData.items():
+            srcColumn, dstColumn = self.edgeTypes[edgeType]
+            self.edges[edgeType] = MappingEdges(
+                srcColumn=srcColumn, dstColumn=dstColumn, edges=data
+            )
+
+    # Function that walks the graph from the ids in startColumn to endColumn and
+    # returns the (start id, end id) pairs reached - in either direction
+    def traverse(self, ids, startColumn: str, endColumn: str) -> pd.DataFrame:
+        columnOrder = [self.edgeTypes[edgeType][0] for edgeType in self.pathOrder]
+        columnOrder.append(self.edgeTypes[self.pathOrder[-1]][1])
+        startIdx, endIdx = columnOrder.index(startColumn), columnOrder.index(endColumn)
+        reverse = endIdx < startIdx
+        pathTypes = (
+            self.pathOrder[startIdx:endIdx]
+            if not reverse
+            else self.pathOrder[endIdx:startIdx][::-1]
+        )
+
+        origins = np.unique(np.asarray(ids))
+        currents = origins
+        for edgeType in pathTypes:
+            store = self.edges[edgeType]
+            nextColumn = store.srcColumn if reverse else store.dstColumn
+            currents, owners = store.lookupValues(
+                ids=currents, column=nextColumn, reverse=reverse
+            )
+            origins = origins[owners]
+
+        pairs = pd.DataFrame({startColumn: origins, endColumn: currents})
+        return pairs.drop_duplicates().reset_index(drop=True)
+
+    # Function that returns the edge rows of one edge type for the given ids
+    def getEdges(self, edgeType: str, ids, reverse: bool = False) -> pd.DataFrame:
+        return self.edges[edgeType].lookup(ids=ids, reverse=reverse)
+
+    def getQuestionsForCourseChapters(self, courseChapterIds: list) -> pd.DataFrame:
+        return self.traverse(
+            ids=courseChapterIds, startColumn="CourseChapterId", endColumn="QuestionId"
+        )
+
+    def getKSCsForCourseChapters(self, courseChapterIds: list) -> pd.DataFrame:
+        return self.traverse(
+            ids=courseChapterIds, startColumn="CourseChapterId", endColumn="KSCId"
+        )
+
+    def getKSCClustersForKSCs(self, kscIds: list) -> pd.DataFrame:
+        return self.getEdges(edgeType="ClusterKSC", ids=kscIds, reverse=True)
+
+    def getCourseChaptersForKSCs(self, kscIds: list) -> pd.DataFrame:
+        return self.traverse(
+            ids=kscIds, startColumn="KSCId", endColumn="CourseChapterId"
+        )
+
+    def getCourseChaptersForQuestions(self, questionIds: list) -> pd.DataFrame:
+        return self.traverse(
+            ids=questionIds, startColumn="QuestionId", endColumn="CourseChapterId"
+        )
+
+    # Function that applies saved mapping changes to one edge type
+    def updateEdges(
+        self,
+        edgeType: str,
+        addedEdges: pd.DataFrame = None,
+        removedEdges: pd.DataFrame = None,
+    ):
+        with self.updateLock:
+            self.edges[edgeType].updateEdges(
+                addedEdges=addedEdges, removedEdges=removedEdges
+            )
+        return
@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+import logging
+
+
+# In-memory index over the Course > Class > Subject > Chapter content hierarchy
+# Every CourseChapter row is stored once with integer-coded names per level, and
+# the rows under every (course, class, subject, chapter) prefix are precomputed
+# so that any dropdown filter is a dictionary lookup instead of a full scan
+class ContentHierarchy:
+
+    contentLabels = ["Course", "Class", "Subject", "Chapter"]
+
+    logger = None
+    courseChapters: pd.DataFrame = None
+    baseColumns: list = None
+    idArrays: dict = None
+    nameCodes: dict = None
+    nameToCode: dict = None
+    codeToName: dict = None
+    idToName: dict = None
+    prefixRows: dict = None
+    isActiveRow: np.ndarray = None
+    isNamedRow: np.ndarray = None
+
+    def __init__(
+        self,
+        courseChapters: pd.DataFrame,
+        baseColumns: list = None,
+        activeCourseIds: list = None,
+    ):
+        self.logger = logging.getLogger(__name__)
+
+        self.courseChapters = courseChapters.reset_index(drop=True)
+        self.baseColumns = (
+            list(baseColumns)
+            if baseColumns is not None
+            else [
+                col
+                for col in self.courseChapters.columns
+                if col not in self.getNameColumns()
+            ]
+        )
+        self.buildIndex()
+        self.isActiveRow = (
+            np.ones(len(self.courseChapters), dtype=bool)
+            if activeCourseIds is None
+            else np.isin(self.idArrays["Course"], activeCourseIds)
+        )
+        return
+
+    def getNameColumns(self) -> list:
+        return [f"{label}Name" for label in self.contentLabels]
+
+    # Function that builds the integer codes, name <-> id maps and prefix rows
+    def buildIndex(self):
+        self.idArrays = dict()
+        self.nameCodes = dict()
+        self.nameToCode = dict()
+        self.codeToName = dict()
+        self.idToName = dict()
+        for label in self.contentLabels:
+            idColumn, nameColumn = f"{label}Id", f"{label}Name"
+            self.idArrays[label] = self.courseChapters[idColumn].to_numpy()
+            if nameColumn not in self.courseChapters:
+                self.nameCodes[label] = np.full(len(self.courseChapters), -1)
+                self.nameToCode[label] = dict()
+                self.codeToName[label] = np.array([], dtype=object)
+                self.idToName[label] = dict()
+                continue
+
+            # Missing names are coded as -1
+            codes, names = pd.factorize(self.courseChapters[nameColumn])
+            self.nameCodes[label] = codes.astype(np.int32)
+            self.codeToName[label] = np.asarray(names, dtype=object)
+            self.nameToCode[label] = {name: code for code, name in enumerate(names)}
+            idNames = self.courseChapters[[idColumn, nameColumn]].dropna()
+            self.idToName[label] = dict(zip(idNames[idColumn], idNames[nameColumn]))
+
+        # Rows with a missing name at any level are dropped by the name joins of
+        # Data.getCourseChapters, so name based filters skip them as well
+        self.isNamedRow = np.ones(len(self.courseChapters), dtype=bool)
+        for label in self.contentLabels:
+            if f"{label}Name" in self.courseChapters:
+                self.isNamedRow &= self.nameCodes[label] >= 0
+
+        # Row positions for every prefix of name codes, e.g. (course,),
+        # (course, class), ... down to (course, class, subject, chapter)
+        self.prefixRows = dict()
+        codesFrame = pd.DataFrame(self.nameCodes)
+        for depth in range(1, len(self.contentLabels) + 1):
+            prefixLabels = self.contentLabels[:depth]
+            for key, rows in codesFrame.groupby(prefixLabels).indices.items():
+                key = key if isinstance(key, tuple) else (key,)
+                self.prefixRows[key] = rows
+        return
+
+    # Function that returns the row positions matching the selected names
+    # Only levels up to sourceLabel are used (child dropdowns get reset anyway)
+    def getRowsByNames(
+        self, selectedNames: dict, sourceLabel: str = None, activeOnly: bool = False
+    ):
+        rows = self.getAllRowsByNames(selectedNames=selectedNames, sourceLabel=sourceLabel)
+        if activeOnly:
+            rows = rows[self.isActiveRow[rows]]
+        return rows
+
+    def getAllRowsByNames(self, selectedNames: dict, sourceLabel: str = None):
+        selectedCodes = list()
+        for label in self.contentLabels:
+            name = selectedNames.get(label)
+            if name is not None:
+                if name not in self.nameToCode[label]:
+                    return np.array([], dtype=np.int64)
+                selectedCodes.append((label, self.nameToCode[label][name]))
+                if sourceLabel and (label == sourceLabel):
+                    break
+
+        if len(selectedCodes) == 0:
+            return np.flatnonzero(self.isNamedRow)
+
+        labels = [label for label, _ in selectedCodes]
+        if labels == self.contentLabels[: len(labels)]:
+            # Selection is a prefix of the hierarchy - direct lookup
+            key = tuple([code for _, code in selectedCodes])
+            rows = self.prefixRows.get(key, np.array([], dtype=np.int64))
+            return rows[self.isNamedRow[rows]]
+
+        mask = self.isNamedRow.copy()
+        for label, code in selectedCodes:
+            mask &= self.nameCodes[label] == code
+        return np.flatnonzero(mask)
+
+    # Function that filters course chapters by the selected content names
+    def filterByNames(
+        self, selectedNames: dict, sourceLabel: str = None, activeOnly: bool = False
+    ) -> pd.DataFrame:
+        rows = self.getRowsByNames(
+            selectedNames=selectedNames, sourceLabel=sourceLabel, activeOnly=activeOnly
+        )
+        return self.courseChapters.iloc[rows].reset_index(drop=True)
+
+    # Function that returns the names available at childLabel under the
+    # selected content names (in order of first appearance)
+    def getChildNames(
+        self,
+        selectedNames: dict,
+        childLabel: str,
+        sourceLabel: str = None,
+        activeOnly: bool = False,
+    ) -> list:
+        rows = self.getRowsByNames(
+            selectedNames=selectedNames, sourceLabel=sourceLabel, activeOnly=activeOnly
+        )
+        codes = pd.unique(self.nameCodes[childLabel][rows])
+        codes = codes[codes >= 0]
+        return list(self.codeToName[childLabel][codes])
+
+    # Function that filters course chapters by content ids - same semantics as
+    # Data.getCourseChapters (names are inner joined when includeNames is set)
+    def filterByIds(
+        self,
+        courseIds: list = None,
+        classIds: list = None,
+        subjectIds: list = None,
+        chapterIds: list = None,
+        columnList: list = None,
+        includeNames: bool = False,
+    ) -> pd.DataFrame:
+        mask = np.ones(len(self.courseChapters), dtype=bool)
+        filterIds = zip(self.contentLabels, [courseIds, classIds, subjectIds, chapterIds])
+        for label, ids in filterIds:
+            if ids is not None:
+                mask &= np.isin(self.idArrays[label], ids)
+
+        columns = list(columnList) if columnList is not None else list(self.baseColumns)
+        if includeNames:
+            for label in self.contentLabels:
+                if (f"{label}Id" in columns) and (f"{label}Name" in self.courseChapters):
+                    columns.append(f"{label}Name")
+                    mask &= self.nameCodes[label] >= 0
+
+        return self.courseChapters.loc[mask, columns].reset_index(drop=True)
+
+    def getName(self, label: str, contentId) -> str:
+        return self.idToName[label].get(contentId)
@@ -12,7 +12,7 @@ from plotter import PlotlyPlotter
 def importModules(config):
     utils = Utils()
     db = DBConnection(utils=utils, config=config)
-    data = Data(db=db, utils=utils)
+    data = Data(db=db, utils=utils, config=config.get("data"))
     calc = Calculations(utils=utils)
     plotter = PlotlyPlotter(plotterConfig=config["plotter"])
     
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse
+import logging
+
+
+# Sparse question x KSC incidence matrices built from the QuestionKSCView mapping
+# QuestionIds and KSCIds are integer encoded (sorted unique ids) so that set
+# questions over the whole catalog become vectorized sparse matrix operations
+class QuestionKSCIncidence:
+
+    logger = None
+    questionIds: np.ndarray = None
+    kscIds: np.ndarray = None
+    mapping: scipy.sparse.csr_matrix = None
+    primary: scipy.sparse.csr_matrix = None
+
+    def __init__(self, questionKSCs: pd.DataFrame):
+        self.logger = logging.getLogger(__name__)
+
+        questionKSCs = questionKSCs.drop_duplicates(subset=["QuestionId", "KSCId"])
+        self.questionIds, questionCodes = np.unique(
+            questionKSCs["QuestionId"].to_numpy(), return_inverse=True
+        )
+        self.kscIds, kscCodes = np.unique(
+            questionKSCs["KSCId"].to_numpy(), return_inverse=True
+        )
+        shape = (len(self.questionIds), len(self.kscIds))
+        isPrimary = questionKSCs["IsPrimaryKSC"].fillna(0).to_numpy().astype(bool)
+
+        self.mapping = scipy.sparse.csr_matrix(
+            (np.ones(len(questionKSCs), dtype=np.int32), (questionCodes, kscCodes)),
+            shape=shape,
+        )
+        self.primary = scipy.sparse.csr_matrix(
+            (
+                np.ones(isPrimary.sum(), dtype=np.int32),
+                (questionCodes[isPrimary], kscCodes[isPrimary]),
+            ),
+            shape=shape,
+        )
+        return
+
+    # Function that encodes ids against a sorted id array (-1 for unknown ids)
+    def encodeIds(self, ids, sortedIds: np.ndarray) -> np.ndarray:
+        ids = np.asarray(ids)
+        if len(sortedIds) == 0:
+            return np.full(len(ids), -1)
+        codes = np.minimum(np.searchsorted(sortedIds, ids), len(sortedIds) - 1)
+        return np.where(sortedIds[codes] == ids, codes, -1)
+
+    # Function that builds a sparse (group x KSC) membership matrix from a frame
+    # of (groupColumn, KSCId) pairs - used for chapters and clusters
+    def getGroupMatrix(
+        self, groupKSCs: pd.DataFrame, groupColumn: str
+    ) -> (scipy.sparse.csr_matrix, np.ndarray):
+        groupIds, groupCodes = np.unique(
+            groupKSCs[groupColumn].to_numpy(), return_inverse=True
+        )
+        kscCodes = self.encodeIds(groupKSCs["KSCId"].to_numpy(), self.kscIds)
+        isKnown = kscCodes >= 0
+        groupMatrix = scipy.sparse.csr_matrix(
+            (
+                np.ones(isKnown.sum(), dtype=np.int32),
+                (groupCodes[isKnown], kscCodes[isKnown]),
+            ),
+            shape=(len(groupIds), len(self.kscIds)),
+        )
+        groupMatrix.data[:] = 1
+        return groupMatrix, groupIds
+
+    # Questions that are mapped to KSCs but have no primary KSC
+    def getQuestionsWithoutPrimaryKSC(self) -> np.ndarray:
+        primaryCounts = np.asarray(self.primary.sum(axis=1)).ravel()
+        return self.questionIds[primaryCounts == 0]
+
+    # KSCs of the given catalog without any question. The catalog has to come
+    # from outside the mapping - every KSC in the mapping has a question
+    def getKSCsWithoutQuestions(self, kscIds: list) -> np.ndarray:
+        questionCounts = np.asarray(self.mapping.sum(axis=0)).ravel()
+        kscIds = np.unique(np.asarray(kscIds))
+        kscCodes = self.encodeIds(kscIds, self.kscIds)
+        hasQuestions = np.zeros(len(kscIds), dtype=bool)
+        hasQuestions[kscCodes >= 0] = questionCounts[kscCodes[kscCodes >= 0]] > 0
+        return kscIds[~hasQuestions]
+
+    # Coverage per chapter from a frame of (CourseChapterId, KSCId) pairs:
+    # total KSCs, KSCs with questions, distinct questions and primary questions
+    def getChapterCoverage(self, chapterKSCs: pd.DataFrame) -> pd.DataFrame:
+        chapterMatrix, chapterIds = self.getGroupMatrix(
+            groupKSCs=chapterKSCs.drop_duplicates(), groupColumn="CourseChapterId"
+        )
+        totalKSCs = chapterKSCs.drop_duplicates().groupby("CourseChapterId").size()
+        kscHasQuestions = (np.asarray(self.mapping.sum(axis=0)).ravel() > 0).astype(
+            np.int32
+        )
+        chapterQuestions = chapterMatrix @ self.mapping.T
+        chapterPrimary = chapterMatrix @ self.primary.T
+
+        coverage = pd.DataFrame(
+            {
+                "CourseChapterId": chapterIds,
+                "TotalKSCs": totalKSCs.reindex(chapterIds).to_numpy(),
+                "MappedKSCs": chapterMatrix @ kscHasQuestions,
+                "Questions": chapterQuestions.getnnz(axis=1),
+                "PrimaryQuestions": chapterPrimary.getnnz(axis=1),
+            }
+        )
+        coverage["KSCCoverage"] = coverage["MappedKSCs"] / coverage["TotalKSCs"]
+        return coverage
+
+    # Pairs of clusters sharing questions, from a frame of (KSCClusterId, KSCId)
+    # pairs - returns the number of shared questions for each overlapping pair
+    def getClusterOverlap(self, clusterKSCs: pd.DataFrame) -> pd.DataFrame:
+        clusterMatrix, clusterIds = self.getGroupMatrix(
+            groupKSCs=clusterKSCs, groupColumn="KSCClusterId"
+        )
+        clusterQuestions = (clusterMatrix @ self.mapping.T).astype(bool).astype(np.int32)
+        overlap = scipy.sparse.triu(clusterQuestions @ clusterQuestions.T, k=1).tocoo()
+        return pd.DataFrame(
+            {
+                "KSCClusterId": clusterIds[overlap.row],
+                "OtherKSCClusterId": clusterIds[overlap.col],
+                "SharedQuestions": overlap.data,
+            }
+        )
@@ -0,0 +1,147 @@
+import threading
+import pandas as pd
+from dataclasses import dataclass
+import logging
+
+
+# Cluster and KSC keys resolved once for a set of CourseChapters and shared by
+# the getters of the same request, so each table is read at most once
+@dataclass
+class ChapterKeys:
+    courseChapterIds: list
+    chapterClusters: pd.DataFrame
+    clusterKSCs: pd.DataFrame
+
+    @property
+    def kscClusterIds(self) -> list:
+        return list(pd.unique(self.chapterClusters["KSCClusterId"]))
+
+    @property
+    def kscIds(self) -> list:
+        return list(pd.unique(self.clusterKSCs["KSCId"]))
+
+    # Function that returns the (CourseChapterId, KSCClusterId, KSCId) rows
+    def getChapterKSCs(self) -> pd.DataFrame:
+        return self.chapterClusters[["CourseChapterId", "KSCClusterId"]].merge(
+            self.clusterKSCs[["KSCClusterId", "KSCId"]], on="KSCClusterId", how="inner"
+        )
+
+
+# Handle to the rows of one or more keys requested from a BatchLoader. The rows
+# are fetched when the handle is first read, together with every other key
+# queued on the loader by then
+class LoadResult:
+
+    loader = None
+    keys: list = None
+
+    def __init__(self, loader, keys: list):
+        self.loader = loader
+        self.keys = keys
+
+    def get(self) -> pd.DataFrame:
+        return self.loader.getLoaded(keys=self.keys)
+
+
+# Request-scoped loader that batches per-id lookups: keys requested with load()
+# and loadMany() are queued, and the whole queue is fetched with a single keyed
+# select on dispatch (or on the first read of any result). Keys are deduplicated
+# and memoized, so the same key is never fetched twice within a request
+class BatchLoader:
+
+    logger = None
+    batchFunction: object = None
+    keyColumn: str = None
+    queue: dict = None
+    memo: dict = None
+    columns: list = None
+    lock: object = None
+    batchCount: int = 0
+
+    def __init__(self, batchFunction: object, keyColumn: str):
+        self.logger = logging.getLogger(__name__)
+        self.batchFunction = batchFunction
+        self.keyColumn = keyColumn
+        self.queue = dict()
+        self.memo = dict()
+        self.lock = threading.Lock()
+
+    # Function that queues a key and returns a handle to its rows
+    def load(self, key) -> LoadResult:
+        return self.loadMany(keys=[key])
+
+    # Function that queues many keys and returns a handle to their rows
+    def loadMany(self, keys: list) -> LoadResult:
+        keys = list(dict.fromkeys(keys))
+        with self.lock:
+            for key in keys:
+                if key not in self.memo:
+                    self.queue[key] = True
+        return LoadResult(loader=self, keys=keys)
+
+    # Function that fetches all the queued keys with one call of batchFunction
+    # and fans the rows back out to the memo
+    def dispatch(self):
+        with self.lock:
+            keys = [key for key in self.queue if key not in self.memo]
+            self.queue = dict()
+            if len(keys) == 0:
+                return
+            data = self.batchFunction(keys)
+            self.batchCount += 1
+            if data is None:
+                data = pd.DataFrame(columns=[self.keyColumn])
+            if self.columns is None:
+                self.columns = list(data.columns)
+            groupedRows = data.groupby(self.keyColumn, sort=False).indices
+            for key in keys:
+                rows = groupedRows.get(key)
+                self.memo[key] = (
+                    data.iloc[rows].reset_index(drop=True)
+                    if rows is not None
+                    else None
+                )
+        return
+
+    # Function that returns the rows of the given keys, dispatching the queue
+    # first if any of them has not been fetched yet
+    def getLoaded(self, keys: list) -> pd.DataFrame:
+        if any(key not in self.memo for key in keys):
+            self.loadMany(keys=keys)
+            self.dispatch()
+        frames = [self.memo[key] for key in keys if self.memo.get(key) is not None]
+        if len(frames) == 0:
+            return pd.DataFrame(columns=self.columns)
+        return pd.concat(frames, axis=0, ignore_index=True)
+
+    # Function to clear the memo - e.g. when the loader is reused for a new request
+    def clear(self):
+        with self.lock:
+            self.queue = dict()
+            self.memo = dict()
+        return
+
+
+# The batch loaders of one request, keyed by lookup type
+class RequestLoaders:
+
+    loaders: dict = None
+
+    def __init__(self, loaders: dict):
+        self.loaders = loaders
+
+    def __getitem__(self, name: str) -> BatchLoader:
+        return self.loaders[name]
+
+    # Function that returns the first row of a key as a dict (None if missing)
+    def getRow(self, name: str, key) -> dict:
+        rows = self.loaders[name].load(key=key).get()
+        if len(rows) == 0:
+            return None
+        return rows.iloc[0].to_dict()
+
+    # Function that fetches the queued keys of all loaders
+    def dispatchAll(self):
+        for loader in self.loaders.values():
+            loader.dispatch()
+        return
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import logging
+
+
+# Catalog-wide reverse index from QuestionId and QuestionCode to the question's
+# KSC mappings and CourseChapters. The mapping rows are kept as column arrays
+# sorted by QuestionId, and the codes as a sorted array next to their ids, so a
+# lookup is a pair of binary searches and a slice. The arrays are swapped
+# together as one snapshot on rebuilds and incremental patches
+class QuestionLookupIndex:
+
+    # Columns of the mapping rows
+    rowColumns = [
+        "QuestionId",
+        "QuestionCode",
+        "KSCId",
+        "IsPrimaryKSC",
+        "KSCClusterId",
+        "CourseChapterId",
+    ]
+
+    logger = None
+    snapshot: tuple = None
+
+    def __init__(self, questionRows: pd.DataFrame):
+        self.logger = logging.getLogger(__name__)
+        self.setRows(questionRows=questionRows)
+
+    # Function that builds the sorted arrays from the mapping rows
+    def setRows(self, questionRows: pd.DataFrame):
+        questionRows = questionRows[self.rowColumns].sort_values(
+            by=["QuestionId", "CourseChapterId", "KSCId"], kind="stable"
+        )
+        rowArrays = {col: questionRows[col].to_numpy() for col in self.rowColumns}
+
+        questionCodes = questionRows.drop_duplicates(subset=["QuestionId"])
+        questionCodes = questionCodes.loc[questionCodes["QuestionCode"].notna()]
+        codeOrder = np.argsort(questionCodes["QuestionCode"].astype(str).to_numpy(), kind="stable")
+        codes = questionCodes["QuestionCode"].astype(str).to_numpy()[codeOrder]
+        codeQuestionIds = questionCodes["QuestionId"].to_numpy()[codeOrder]
+
+        self.snapshot = (rowArrays, codes, codeQuestionIds)
+        return
+
+    def getRows(self) -> pd.DataFrame:
+        rowArrays, _, _ = self.snapshot
+        return pd.DataFrame(rowArrays)
+
+    def __len__(self) -> int:
+        return len(self.snapshot[0]["QuestionId"])
+
+    # Function that returns the mapping rows of one QuestionId
+    def lookupId(self, questionId: int) -> pd.DataFrame:
+        rowArrays, _, _ = self.snapshot
+        questionIds = rowArrays["QuestionId"]
+        start = np.searchsorted(questionIds, questionId, side="left")
+        end = np.searchsorted(questionIds, questionId, side="right")
+        return pd.DataFrame({col: values[start:end] for col, values in rowArrays.items()})
+
+    # Function that returns the QuestionId of a QuestionCode (None if unknown)
+    def getQuestionId(self, questionCode: str) -> int:
+        _, codes, codeQuestionIds = self.snapshot
+        questionCode = str(questionCode)
+        position = np.searchsorted(codes, questionCode)
+        if (position < len(codes)) and (codes[position] == questionCode):
+            return codeQuestionIds[position]
+        return None
+
+    # Function that returns the mapping rows of one QuestionCode
+    def lookupCode(self, questionCode: str) -> pd.DataFrame:
+        questionId = self.getQuestionId(questionCode=questionCode)
+        if questionId is None:
+            return pd.DataFrame(columns=self.rowColumns)
+        return self.lookupId(questionId=questionId)
+
+    # Function that replaces the rows of the given questions - questions without
+    # rows in questionRows are removed from the index
+    def patchRows(self, questionIds: list, questionRows: pd.DataFrame):
+        rows = self.getRows()
+        rows = rows.loc[~rows["QuestionId"].isin(questionIds)]
+        if (questionRows is not None) and (questionRows.shape[0] > 0):
+            rows = pd.concat([rows, questionRows[self.rowColumns]], axis=0, ignore_index=True)
+        self.setRows(questionRows=rows)
+        return
@@ -0,0 +1,240 @@
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+# Bounded LRU cache with background prefetching, used for the chapter frames,
+# the shared chapter content, the question details and the chapter keys
+# Keys requested with prefetch() (batched) or prefetchEach() (one load function
+# per key) are loaded by a small worker pool; get() and getMany() serve cached
+# keys directly, wait for in-flight keys and load any other key inline
+# Pending prefetch tasks can be cancelled (e.g. when the user moves elsewhere)
+# Every invalidate() starts a new generation - values loaded by calls started
+# before it are still returned to their caller but never stored in the cache
+class LRUCache:
+
+    logger = None
+    capacity: int = None
+    cache: OrderedDict = None
+    tasks: dict = None
+    taskGenerations: dict = None
+    executor: ThreadPoolExecutor = None
+    lock: object = None
+    stats: dict = None
+    generation: int = 0
+
+    def __init__(self, capacity: int = 16, maxWorkers: int = 2, name: str = "LRUCache"):
+        self.logger = logging.getLogger(__name__)
+        self.capacity = capacity
+        self.cache = OrderedDict()
+        self.tasks = dict()
+        self.taskGenerations = dict()
+        self.executor = ThreadPoolExecutor(
+            max_workers=maxWorkers, thread_name_prefix=f"{name}Prefetch"
+        )
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "inFlightHits": 0, "misses": 0, "prefetched": 0}
+        self.generation = 0
+
+    # Function that stores a value and evicts the least recently used keys
+    # With generation, the value is dropped if the cache was invalidated since
+    # that generation (i.e. while the value was being loaded)
+    def put(self, key, value, generation: int = None) -> bool:
+        with self.lock:
+            if (generation is not None) and (generation != self.generation):
+                return False
+            self.cache[key] = value
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.capacity:
+                self.cache.popitem(last=False)
+        return True
+
+    # Function that returns the value of a key - from the cache, from an
+    # in-flight prefetch or by calling loadFunction inline
+    def get(self, key, loadFunction: object):
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return self.cache[key]
+            future = self.tasks.get(key)
+            generation = self.generation
+
+        if (future is not None) and (not future.cancelled()):
+            try:
+                value = future.result()
+                with self.lock:
+                    self.stats["inFlightHits"] += 1
+                return value
+            except Exception as err:
+                self.logger.warn(f"Prefetch of {key} failed - loading inline.")
+                self.logger.debug(err)
+
+        with self.lock:
+            self.stats["misses"] += 1
+        value = loadFunction()
+        self.put(key=key, value=value, generation=generation)
+        return value
+
+    # Function that returns the cached value of a key (None if not cached)
+    # without loading it or counting it in the statistics
+    def peek(self, key):
+        with self.lock:
+            return self.cache.get(key)
+
+    # Function that returns the values of many keys - cached keys directly,
+    # in-flight keys from their prefetch and all the others with a single
+    # loadFunction(missingKeys) call, which returns a dict of key -> value
+    # Returns a dict of key -> value (None if not loaded)
+    def getMany(self, keys: list, loadFunction: object) -> dict:
+        values, missingKeys, inFlight = dict(), list(), dict()
+        with self.lock:
+            for key in keys:
+                if key in self.cache:
+                    self.cache.move_to_end(key)
+                    self.stats["hits"] += 1
+                    values[key] = self.cache[key]
+                elif key in self.tasks:
+                    inFlight[key] = self.tasks[key]
+                else:
+                    missingKeys.append(key)
+            generation = self.generation
+
+        for key, future in inFlight.items():
+            try:
+                values[key] = future.result()
+                with self.lock:
+                    self.stats["inFlightHits"] += 1
+            except Exception as err:
+                self.logger.debug(err)
+                missingKeys.append(key)
+        with self.lock:
+            self.stats["misses"] += len(missingKeys)
+
+        if len(missingKeys) > 0:
+            loadedValues = loadFunction(missingKeys)
+            for key in missingKeys:
+                values[key] = loadedValues.get(key)
+                if values[key] is not None:
+                    self.put(key=key, value=values[key], generation=generation)
+        return values
+
+    # Function that queues one background load of the given keys that are neither
+    # cached nor already in flight - loadFunction(keys) returns a dict of
+    # key -> value, like in getMany. Returns the future of the load (or None)
+    def prefetch(self, keys: list, loadFunction: object) -> Future:
+        with self.lock:
+            keys = [
+                key
+                for key in dict.fromkeys(keys)
+                if (key not in self.cache) and (key not in self.tasks)
+            ]
+            if len(keys) == 0:
+                return None
+            generation = self.generation
+            keyFutures = {key: Future() for key in keys}
+            for key, future in keyFutures.items():
+                self.tasks[key] = future
+                self.taskGenerations[key] = generation
+
+        def runTask():
+            # Keys cancelled or invalidated before the task started are skipped
+            liveKeys = [
+                key
+                for key, future in keyFutures.items()
+                if future.set_running_or_notify_cancel()
+            ]
+            try:
+                values = loadFunction(liveKeys) if len(liveKeys) > 0 else dict()
+                for key in liveKeys:
+                    value = values.get(key)
+                    if (value is not None) and self.put(
+                        key=key, value=value, generation=generation
+                    ):
+                        with self.lock:
+                            self.stats["prefetched"] += 1
+                    keyFutures[key].set_result(value)
+            except Exception as err:
+                for key in liveKeys:
+                    if not keyFutures[key].done():
+                        keyFutures[key].set_exception(err)
+                raise
+            finally:
+                with self.lock:
+                    for key, future in keyFutures.items():
+                        if self.tasks.get(key) is future:
+                            self.tasks.pop(key, None)
+                            self.taskGenerations.pop(key, None)
+
+        return self.executor.submit(runTask)
+
+    # Function that queues background loads for the keys that are neither cached
+    # nor already in flight. keyLoaders is a list of (key, loadFunction) tuples
+    def prefetchEach(self, keyLoaders: list):
+        def runTask(key, loadFunction, generation):
+            try:
+                value = loadFunction()
+                if self.put(key=key, value=value, generation=generation):
+                    with self.lock:
+                        self.stats["prefetched"] += 1
+                return value
+            finally:
+                with self.lock:
+                    # A newer task may have replaced this one after an invalidate
+                    if self.taskGenerations.get(key) == generation:
+                        self.tasks.pop(key, None)
+                        self.taskGenerations.pop(key, None)
+
+        with self.lock:
+            for key, loadFunction in keyLoaders:
+                if (key in self.cache) or (key in self.tasks):
+                    continue
+                self.taskGenerations[key] = self.generation
+                self.tasks[key] = self.executor.submit(
+                    runTask, key, loadFunction, self.generation
+                )
+        return
+
+    # Function that cancels the prefetch tasks that have not started yet
+    # (optionally keeping the given keys)
+    def cancelPending(self, keepKeys: list = None) -> int:
+        keepKeys = set(keepKeys or [])
+        cancelCount = 0
+        with self.lock:
+            for key, future in list(self.tasks.items()):
+                if (key not in keepKeys) and future.cancel():
+                    self.tasks.pop(key, None)
+                    self.taskGenerations.pop(key, None)
+                    cancelCount += 1
+        return cancelCount
+
+    # Function that drops cached values - all of them, or those matching keyFilter
+    # In-flight prefetches of the dropped keys are forgotten (so that get() loads
+    # them again) and the values of loads already running are not stored
+    def invalidate(self, keyFilter: object = None):
+        with self.lock:
+            self.generation += 1
+            for key in list(self.cache):
+                if (keyFilter is None) or keyFilter(key):
+                    self.cache.pop(key, None)
+            for key, future in list(self.tasks.items()):
+                if (keyFilter is None) or keyFilter(key):
+                    future.cancel()
+                    self.tasks.pop(key, None)
+                    self.taskGenerations.pop(key, None)
+        return
+
+    def getHitRate(self) -> float:
+        with self.lock:
+            hits = self.stats["hits"] + self.stats["inFlightHits"]
+            requests = hits + self.stats["misses"]
+        return (hits / requests) if requests > 0 else None
+
+    def getStats(self) -> dict:
+        with self.lock:
+            stats = dict(self.stats)
+            stats["cached"] = len(self.cache)
+            stats["pending"] = len(self.tasks)
+        stats["hitRate"] = self.getHitRate()
+        return stats
@@ -0,0 +1,119 @@
+import time
+import threading
+import logging
+from dataclasses import dataclass
+
+
+# A small dimension table held in memory along with the checksum of its source
+@dataclass
+class ReferenceTable:
+
+    name: str
+    loadFunction: object
+    checksumFunction: object = None
+    data: object = None
+    checksum: int = None
+    loadedAt: float = None
+
+
+# Service that keeps small reference (dimension) tables in memory
+# Tables are loaded on first use and refreshed every refreshSeconds - either
+# in the background or on the next read. A refresh first compares the source
+# checksum (e.g. CHECKSUM_AGG over the view) and only reloads when it changed
+# The first load skips the checksum, so the first refresh always reloads
+class ReferenceData:
+
+    logger = None
+    tables: dict = None
+    refreshSeconds: int = None
+    refreshLock: object = None
+    refreshThread: object = None
+
+    def __init__(self, refreshSeconds: int = 300):
+        self.logger = logging.getLogger(__name__)
+        self.tables = dict()
+        self.refreshSeconds = refreshSeconds
+        self.refreshLock = threading.Lock()
+
+    # Function to register a reference table with its loader and (optional)
+    # checksum function - both are called without arguments
+    def register(
+        self, name: str, loadFunction: object, checksumFunction: object = None
+    ) -> ReferenceTable:
+        self.tables[name] = ReferenceTable(
+            name=name, loadFunction=loadFunction, checksumFunction=checksumFunction
+        )
+        return self.tables[name]
+
+    # Function that returns the in-memory data of a reference table - the data
+    # loaded by this call when it loads, so a concurrent invalidate cannot turn
+    # it into None
+    def get(self, name: str):
+        table = self.tables[name]
+        data = table.data
+        if data is None:
+            data = self.reload(table=table)
+        elif (self.refreshSeconds is not None) and (
+            time.monotonic() - table.loadedAt >= self.refreshSeconds
+        ):
+            data = self.refresh(table=table)
+        return data
+
+    # Function that reloads a table only if its source checksum has changed (or
+    # is not known yet) and returns its data
+    def refresh(self, table: ReferenceTable):
+        checksum = None
+        if table.checksumFunction is not None:
+            checksum = table.checksumFunction()
+            with self.refreshLock:
+                data = table.data
+                if (data is not None) and (checksum is not None) and (
+                    checksum == table.checksum
+                ):
+                    table.loadedAt = time.monotonic()
+                    return data
+        return self.reload(table=table, checksum=checksum)
+
+    # Function that loads a table from source and returns the loaded data
+    def reload(self, table: ReferenceTable, checksum: int = None):
+        with self.refreshLock:
+            data = table.loadFunction()
+            table.data = data
+            table.checksum = checksum
+            table.loadedAt = time.monotonic()
+        self.logger.debug(f"Reference table {table.name} loaded.")
+        return data
+
+    # Function that drops the cached data so the next read reloads it. Waits for
+    # a reload in progress, so data loaded before the change is not kept
+    def invalidate(self, name: str = None):
+        tableNames = list(self.tables) if name is None else [name]
+        with self.refreshLock:
+            for tableName in tableNames:
+                self.tables[tableName].data = None
+                self.tables[tableName].checksum = None
+        return
+
+    # Function that refreshes all the loaded tables in a background thread
+    # every refreshSeconds, so reads never wait on a reload
+    def startRefresh(self) -> threading.Thread:
+        if (self.refreshThread is not None) or (self.refreshSeconds is None):
+            return self.refreshThread
+
+        def refreshTables():
+            while True:
+                time.sleep(self.refreshSeconds)
+                for table in list(self.tables.values()):
+                    if table.data is None:
+                        continue
+                    try:
+                        self.refresh(table=table)
+                    except Exception as err:
+                        self.logger.error(f"Reference table {table.name} refresh failed.")
+                        self.logger.error(err)
+
+        self.refreshThread = threading.Thread(
+            target=refreshTables, name="ReferenceDataRefresh", daemon=True
+        )
+        self.refreshThread.start()
+        return self.refreshThread
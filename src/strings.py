@@ -0,0 +1,112 @@
+import threading
+import numpy as np
+import pandas as pd
+import logging
+
+
+# Dictionary of repeated strings (KSC texts, diagram URLs, ...)
+# Frames keep int32 codes into the dictionary instead of string objects, so a
+# string shared by many rows, chapters and sessions is held in memory once
+# Codes are only valid within the process - frames are decoded before they are
+# written to disk or sent to the browser. Missing values are encoded as -1
+# The encoded columns of a frame are listed in frame.attrs["encodedColumns"]
+# Strings are never removed, so the dictionary stops taking new strings once it
+# holds maxSize of them - columns with new strings are then left unencoded
+class StringDictionary:
+
+    logger = None
+    maxSize: int = None
+    values: list = None
+    codes: dict = None
+    lock: object = None
+    valuesArray: np.ndarray = None
+
+    def __init__(self, maxSize: int = None):
+        self.logger = logging.getLogger(__name__)
+        self.maxSize = maxSize
+        self.values = list()
+        self.codes = dict()
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    # Function that returns the codes of the given strings, adding new strings
+    # to the dictionary. Returns None if the new strings do not fit under maxSize
+    # (unless force is set, e.g. to patch rows into an encoded frame)
+    def encode(self, values, force: bool = False) -> np.ndarray:
+        localCodes, uniques = pd.factorize(pd.Series(values, dtype=object))
+        with self.lock:
+            if (not force) and (self.maxSize is not None):
+                newCount = sum(1 for value in uniques if value not in self.codes)
+                if len(self.values) + newCount > self.maxSize:
+                    return None
+            uniqueCodes = np.empty(len(uniques), dtype=np.int32)
+            for idx, value in enumerate(uniques):
+                code = self.codes.get(value)
+                if code is None:
+                    code = len(self.values)
+                    self.values.append(value)
+                    self.codes[value] = code
+                uniqueCodes[idx] = code
+        # pd.factorize marks missing values with -1
+        return np.where(localCodes >= 0, uniqueCodes[localCodes], -1).astype(np.int32)
+
+    # Function that returns the strings of the given codes (None for -1)
+    def decode(self, codes) -> np.ndarray:
+        codes = np.asarray(codes, dtype=np.int64)
+        with self.lock:
+            if (self.valuesArray is None) or (len(self.valuesArray) != len(self.values) + 1):
+                # The last slot holds None so that code -1 decodes to None
+                self.valuesArray = np.array(self.values + [None], dtype=object)
+            valuesArray = self.valuesArray
+        return valuesArray[codes]
+
+    # Function that returns the encoded columns of a frame
+    def getEncodedColumns(self, frame: pd.DataFrame) -> list:
+        if frame is None:
+            return list()
+        return list(frame.attrs.get("encodedColumns", list()))
+
+    # Function that replaces the given string columns of a frame with their codes
+    # and records them as encoded. Columns already encoded are left as they are
+    def encodeFrame(
+        self, frame: pd.DataFrame, columns: list, force: bool = False
+    ) -> pd.DataFrame:
+        if frame is None:
+            return None
+        encodedColumns = self.getEncodedColumns(frame=frame)
+        encodeColumns = [
+            col for col in columns if (col in frame) and (col not in encodedColumns)
+        ]
+        if len(encodeColumns) == 0:
+            return frame
+        frame = frame.copy()
+        for col in encodeColumns:
+            codes = self.encode(frame[col], force=force)
+            if codes is None:
+                self.logger.debug(f"String dictionary full - {col} left unencoded.")
+                continue
+            frame[col] = codes
+            encodedColumns.append(col)
+        frame.attrs["encodedColumns"] = encodedColumns
+        return frame
+
+    # Function that replaces the encoded columns (of the given columns) of a
+    # frame with their strings
+    def decodeFrame(self, frame: pd.DataFrame, columns: list) -> pd.DataFrame:
+        if frame is None:
+            return None
+        encodedColumns = self.getEncodedColumns(frame=frame)
+        decodeColumns = [
+            col for col in encodedColumns if (col in columns) and (col in frame)
+        ]
+        if len(decodeColumns) == 0:
+            return frame
+        frame = frame.copy()
+        for col in decodeColumns:
+            frame[col] = self.decode(frame[col])
+        frame.attrs["encodedColumns"] = [
+            col for col in encodedColumns if col not in decodeColumns
+        ]
+        return frame
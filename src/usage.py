@@ -0,0 +1,111 @@
+import os
+import sys
+import threading
+import pandas as pd
+import logging
+
+
+# DataFrame that records the columns read from it (by item or attribute access)
+# in its ColumnUsageTracker. Frames derived from it (slices, merges, copies)
+# keep tracking against the same select site
+class TrackedDataFrame(pd.DataFrame):
+
+    _metadata = ["usageSite", "usageTracker"]
+
+    @property
+    def _constructor(self):
+        return TrackedDataFrame
+
+    def recordColumns(self, key):
+        tracker = getattr(self, "usageTracker", None)
+        if tracker is None:
+            return
+        if isinstance(key, str):
+            keys = [key]
+        elif isinstance(key, (list, tuple, pd.Index)):
+            keys = [k for k in key if isinstance(k, str)]
+        else:
+            return
+        tracker.recordRead(site=self.usageSite, columns=keys)
+        return
+
+    def __getitem__(self, key):
+        self.recordColumns(key)
+        return super().__getitem__(key)
+
+    def __getattr__(self, name: str):
+        if not name.startswith("_") and (name not in self._metadata):
+            # Only once the frame is constructed
+            if (self.__dict__.get("_mgr") is not None) and (name in self.columns):
+                self.recordColumns(name)
+        return super().__getattr__(name)
+
+
+# Debug aid that reports over-fetching: every select result is tagged with its
+# call site and the columns it fetched, and the columns read from the result
+# (or frames derived from it) are recorded. getUnreadColumns lists the columns
+# fetched at each site but never read - candidates for a narrower projection
+# Item and attribute access are tracked, so columns only used as merge keys or
+# in serialization show up as unread too
+class ColumnUsageTracker:
+
+    logger = None
+    fetched: dict = None
+    read: dict = None
+    lock: object = None
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.fetched = dict()
+        self.read = dict()
+        self.lock = threading.Lock()
+
+    # Function that returns the first caller outside of the DB layer as
+    # "<file>:<function>:<line>"
+    def getCallSite(self, skipFiles: list) -> str:
+        frame = sys._getframe(1)
+        while (frame is not None) and (
+            os.path.basename(frame.f_code.co_filename) in skipFiles
+        ):
+            frame = frame.f_back
+        if frame is None:
+            return "unknown"
+        return (
+            f"{os.path.basename(frame.f_code.co_filename)}:"
+            + f"{frame.f_code.co_name}:{frame.f_lineno}"
+        )
+
+    # Function that tags a select result with its site and records its columns
+    def track(self, frame: pd.DataFrame, site: str) -> TrackedDataFrame:
+        if frame is None:
+            return None
+        with self.lock:
+            self.fetched.setdefault(site, set()).update(frame.columns)
+            self.read.setdefault(site, set())
+        trackedFrame = TrackedDataFrame(frame)
+        trackedFrame.usageSite = site
+        trackedFrame.usageTracker = self
+        return trackedFrame
+
+    def recordRead(self, site: str, columns: list):
+        with self.lock:
+            self.read.setdefault(site, set()).update(columns)
+        return
+
+    # Function that returns the columns fetched but never read, by select site
+    def getUnreadColumns(self) -> dict:
+        with self.lock:
+            unread = {
+                site: sorted(self.fetched[site] - self.read.get(site, set()))
+                for site in self.fetched
+            }
+        return {site: columns for site, columns in unread.items() if len(columns) > 0}
+
+    # Function that logs the unread columns of every select site
+    def logReport(self):
+        unread = self.getUnreadColumns()
+        if len(unread) == 0:
+            self.logger.info("Column usage: every fetched column was read.")
+        for site, columns in sorted(unread.items()):
+            self.logger.info(f"Column usage: {site} fetched unread columns {columns}")
+        return unread
@@ -0,0 +1,5 @@
+import os
+import sys
+import pathlib
+
+sys.path.append(os.path.join(pathlib.Path(__file__).parent.parent, "src"))
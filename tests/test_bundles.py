@@ -0,0 +1,46 @@
+import os
+
+import pandas as pd
+
+from bundles import ChapterBundleStore
+
+
+def getStore(bundleDir: str) -> ChapterBundleStore:
+    return ChapterBundleStore(
+        bundleDir=bundleDir, frameNames=["Question_Rows", "KSCs"], compression="snappy"
+    )
+
+
+def getBundle(value: int) -> dict:
+    return {
+        "Question_Rows": pd.DataFrame({"QuestionId": [value]}),
+        "KSCs": pd.DataFrame({"KSCId": [value]}),
+    }
+
+
+def test_bundles_are_found_again_after_a_restart(tmp_path):
+    store = getStore(bundleDir=str(tmp_path))
+    store.write(courseChapterId=1, version="a_b", bundle=getBundle(value=1))
+    store.write(courseChapterId=1, version="c_d", bundle=getBundle(value=2))
+
+    store = getStore(bundleDir=str(tmp_path))
+    assert store.getVersion(courseChapterId=1) == "c_d"
+    bundle = store.read(courseChapterId=1)
+    assert list(bundle["Question_Rows"]["QuestionId"]) == [2]
+    assert store.read(courseChapterId=1, version="a_b") is None
+    assert os.listdir(os.path.join(str(tmp_path), "1")) == ["c_d"]
+
+
+def test_unknown_entries_in_the_bundle_dir_are_skipped(tmp_path):
+    os.makedirs(os.path.join(str(tmp_path), "notAChapter", "v1"))
+    open(os.path.join(str(tmp_path), "1_v1_Questions.parquet"), "w").close()
+    store = getStore(bundleDir=str(tmp_path))
+    assert store.versions == dict()
+
+
+def test_invalidated_bundles_are_removed(tmp_path):
+    store = getStore(bundleDir=str(tmp_path))
+    store.write(courseChapterId=3, version="v1", bundle=getBundle(value=3))
+    store.invalidate(courseChapterIds=[3])
+    assert store.read(courseChapterId=3) is None
+    assert not os.path.exists(os.path.join(str(tmp_path), "3"))
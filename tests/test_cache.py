@@ -0,0 +1,33 @@
+import pandas as pd
+
+from cache import CacheDependencies, TableChange
+
+
+def test_change_keys_skip_the_table_primary_key():
+    change = TableChange.fromData(
+        tableName="[dbo].[CourseChapterQuestionExclusion]",
+        data=pd.DataFrame(
+            {
+                "CourseChapterQuestionExclusionId": [1, 2],
+                "CourseChapterId": [5, 5],
+                "QuestionId": [10, None],
+            }
+        ),
+    )
+    assert change.getKeys(columnName="CourseChapterQuestionExclusionId") is None
+    assert change.getKeys(columnName="CourseChapterId") == {5}
+    assert change.getKeys(columnName="QuestionId") == {10}
+    assert len(change.rows) == 2
+
+
+def test_writes_to_base_tables_reach_view_caches():
+    dependencies = CacheDependencies(viewTables={"QuestionKSCView": ["QuestionKSC"]})
+    changes = list()
+    dependencies.register(
+        name="MappingGraph", tables=["KSCCluster", "QuestionKSCView"], invalidateFunction=changes.append
+    )
+    assert dependencies.publish(change=TableChange(tableName="dbo.questionksc")) == ["MappingGraph"]
+    assert dependencies.publish(change=TableChange(tableName="[KSCCluster]")) == ["MappingGraph"]
+    assert dependencies.publish(change=TableChange(tableName="KSC")) == []
+    assert len(changes) == 2
+    assert dependencies.getStats() == {"MappingGraph": 2}
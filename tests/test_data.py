@@ -0,0 +1,643 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import pytest
+
+from utils import Utils
+from data import Data
+from graph import MappingGraph
+
+
+# Query object handed out by MemoryDB in place of the SQL text of a subquery -
+# evaluated against the tables when it is used as a filter
+class MemoryQuery:
+
+    def __init__(self, db: object, tableName: str, filterConditions: list, columnList: list = None):
+        self.db = db
+        self.tableName = tableName
+        self.filterConditions = filterConditions
+        self.columnList = columnList
+
+    def getValues(self) -> list:
+        data = self.db.filterTable(
+            tableName=self.tableName, filterConditions=self.filterConditions
+        )
+        return list(pd.unique(data[self.columnList[0]]))
+
+
+# In-memory stand-in for DBConnection serving the select helpers Data uses from
+# a dict of frames. Every call is recorded so tests can check the round trips
+class MemoryDB:
+
+    defaultSchema = "dbo"
+
+    def __init__(self, tables: dict):
+        self.tables = tables
+        self.calls = list()
+        self.listeners = list()
+
+    def addInvalidationListener(self, listener: object):
+        self.listeners.append(listener)
+
+    @contextmanager
+    def tempTableSession(self):
+        yield self
+
+    def bindRoutingContext(self, function: object) -> object:
+        return function
+
+    # Only the per-row checksum queries of the snapshots are answered
+    def execSelectQuery(self, query: str) -> pd.DataFrame:
+        tableName = query.split("FROM [")[1].split("].[")[1].split("]")[0]
+        idColumn = query.split("SELECT ")[1].split(",")[0]
+        self.calls.append(tableName)
+        data = self.tables[tableName]
+        if "WHERE IsSuspended = 0" in query:
+            data = data.loc[data["IsSuspended"] == 0]
+        return pd.DataFrame(
+            {
+                idColumn: data[idColumn].to_numpy(),
+                "RowChecksum": pd.util.hash_pandas_object(data, index=False).to_numpy(),
+            }
+        )
+
+    # Values are kept as a list so that they can be used as filters
+    def getSQLString(self, filterValue) -> list:
+        return list(filterValue)
+
+    def filterTable(self, tableName: str, filterConditions: list = None) -> pd.DataFrame:
+        data = self.tables[tableName]
+        # Column names are case insensitive as in SQL Server
+        columnNames = {col.lower(): col for col in data.columns}
+        for filterColumn, filterValue in filterConditions or []:
+            filterColumn = columnNames[filterColumn.lower()]
+            if isinstance(filterValue, MemoryQuery):
+                filterValue = filterValue.getValues()
+            filterValues = filterValue if isinstance(filterValue, list) else [filterValue]
+            data = data.loc[data[filterColumn].isin(filterValues)]
+        return data
+
+    def selectWithMultipleWheres(
+        self,
+        tableName: str,
+        schemaName: str = None,
+        columnList: list = None,
+        filterConditions: list = None,
+        onlyQuery: bool = False,
+    ) -> (pd.DataFrame, str):
+        self.calls.append(tableName)
+        data = self.filterTable(tableName=tableName, filterConditions=filterConditions)
+        if columnList is not None:
+            data = data[columnList]
+        query = MemoryQuery(db=self, tableName=tableName, filterConditions=filterConditions)
+        return data.reset_index(drop=True), query
+
+    def selectWithMultipleSQLs(
+        self,
+        tableName: str,
+        schemaName: str = None,
+        columnList: list = None,
+        filterQueries: list = None,
+        onlyQuery: bool = False,
+    ) -> (pd.DataFrame, str):
+        return self.selectWithMultipleWheres(
+            tableName=tableName, columnList=columnList, filterConditions=filterQueries
+        )
+
+    def selectWithSQL(
+        self,
+        tableName: str,
+        schemaName: str = None,
+        columnList: list = None,
+        filterColumn: str = None,
+        filterQuery: str = None,
+        onlyQuery: bool = False,
+    ) -> (pd.DataFrame, str):
+        return self.selectWithMultipleWheres(
+            tableName=tableName,
+            columnList=columnList,
+            filterConditions=[(filterColumn, filterQuery)],
+        )
+
+    def getSelectWithWheresQuery(
+        self, tableName: str, schemaName: str = None, filterConditions: list = None
+    ) -> MemoryQuery:
+        return MemoryQuery(db=self, tableName=tableName, filterConditions=filterConditions)
+
+    def setSelectColumns(self, query: MemoryQuery, columnList: list) -> MemoryQuery:
+        return MemoryQuery(
+            db=self,
+            tableName=query.tableName,
+            filterConditions=query.filterConditions,
+            columnList=columnList,
+        )
+
+    def materializeQuery(
+        self, query: MemoryQuery, tableName: str, columnList: list, indexColumns: list = None
+    ) -> MemoryQuery:
+        return query
+
+    def selectWithWhere(
+        self,
+        tableName: str,
+        schemaName: str = None,
+        columnList: list = None,
+        filterColumn: str = None,
+        filterValue: object = None,
+        onlyQuery: bool = False,
+    ) -> (pd.DataFrame, str):
+        return self.selectWithMultipleWheres(
+            tableName=tableName,
+            columnList=columnList,
+            filterConditions=[(filterColumn, filterValue)],
+        )
+
+    def selectTable(
+        self, tableName: str, schemaName: str = None, columnList: list = None, onlyQuery: bool = False
+    ) -> (pd.DataFrame, str):
+        return self.selectWithMultipleWheres(tableName=tableName, columnList=columnList)
+
+
+def getTables() -> dict:
+    return {
+        "KSCCluster": pd.DataFrame(
+            {
+                "CourseChapterId": [1, 1, 2],
+                "KSCClusterId": [10, 11, 12],
+                "KSCClusterName": ["C10", "C11", "C12"],
+            }
+        ),
+        "KSCClusterKSC": pd.DataFrame(
+            {
+                "KSCClusterId": [10, 10, 11, 12],
+                "KSCId": [100, 101, 102, 100],
+                "DisplayRank": [1, 2, 1, 1],
+                "IsVisible": [1, 1, 1, 1],
+            }
+        ),
+        "CourseKSC": pd.DataFrame(
+            {"CourseChapterId": [1, 1, 1, 2], "KSCId": [100, 101, 102, 100]}
+        ),
+        "QuestionKSCView": pd.DataFrame(
+            {
+                "KSCId": [100, 101, 102, 102],
+                "QuestionId": [1000, 1001, 1002, 1003],
+                "IsPrimaryKSC": [1, 1, 1, 0],
+            }
+        ),
+        "KSCView": pd.DataFrame(
+            {
+                "KSCId": [100, 101, 102],
+                "KSCText": ["K100", "K101", "K102"],
+                "KSCDiagramURL": ["k100.png", "k101.png", "k102.png"],
+            }
+        ),
+        "QuestionView": pd.DataFrame(
+            {
+                "QuestionId": [1000, 1001, 1002, 1003],
+                "QuestionCode": ["Q1000", "Q1001", "Q1002", "Q1003"],
+                "AnswerOption": ["A", "B", "C", "D"],
+                "QuestionDiagramURL": ["q1000", "q1001", "q1002", "q1003"],
+                "FullSolutionURL": ["s1000", "s1001", "s1002", "s1003"],
+                "QuestionLatex": ["x", "y", "z", "w"],
+                "IsSuspended": [0, 0, 0, 0],
+            }
+        ),
+        "QuestionMetrics": pd.DataFrame(
+            {
+                "QuestionId": [1000, 1000, 1001, 1002],
+                "CourseChapterId": [1, 2, 1, 1],
+                "IsParentMetric": [0, 0, 0, 0],
+                "Attempted": [10, 4, 5, 8],
+                "Correct": [5, 1, 5, 2],
+                "TimeTaken": [100, 40, 25, 80],
+            }
+        ),
+        "CourseChapterQuestionExclusion": pd.DataFrame(
+            {"CourseChapterId": [1, 2], "QuestionId": [1001, 1000]}
+        ),
+    }
+
+
+def getData(tables: dict = None, config: dict = None) -> Data:
+    return Data(db=MemoryDB(tables=tables or getTables()), utils=Utils(), config=config)
+
+
+def loadGraph(data: Data) -> MappingGraph:
+    data.loadMappingGraph()
+    data.db.calls.clear()
+    return data.mappingGraph
+
+
+def sortedFrame(frame: pd.DataFrame) -> pd.DataFrame:
+    frame = frame[sorted(frame.columns)]
+    return frame.sort_values(by=list(frame.columns)).reset_index(drop=True)
+
+
+def getCourseChapters() -> pd.DataFrame:
+    return pd.DataFrame(
+        {"CourseChapterId": [1, 2], "CourseId": [7, 7], "CourseName": ["Course", "Course"]}
+    )
+
+
+def test_bundles_of_a_chapter_set_match_the_built_frames(tmp_path, monkeypatch):
+    # KSC 100 (question 1000) is mapped by both chapters and only excluded in
+    # chapter 2 - it has to be served once, with the metrics of both chapters
+    built = getData()
+    expectedQuestions, expectedKsc = built.buildChapterFrames(
+        courseChapters=getCourseChapters()
+    )
+
+    data = getData(config={"bundleDir": str(tmp_path)})
+    monkeypatch.setattr(
+        data,
+        "getChapterVersions",
+        lambda courseChapterIds: {courseChapterId: "v1" for courseChapterId in courseChapterIds},
+    )
+    allQuestions, allKsc = data.getChapterFrames(courseChapters=getCourseChapters())
+
+    assert data.bundleStore.getVersion(courseChapterId=1) == "v1"
+    assert data.bundleStore.getVersion(courseChapterId=2) == "v1"
+    assert allQuestions.duplicated(subset=["QuestionId", "KSCId", "CourseChapterId"]).sum() == 0
+    assert sorted(pd.unique(allQuestions["QuestionId"])) == [1000, 1002, 1003]
+    pd.testing.assert_frame_equal(
+        sortedFrame(allQuestions), sortedFrame(expectedQuestions), check_dtype=False
+    )
+    pd.testing.assert_frame_equal(
+        sortedFrame(allKsc), sortedFrame(expectedKsc), check_dtype=False
+    )
+
+
+def test_sharded_extraction_matches_the_unsharded_select():
+    data = getData(config={"extractWorkers": 2})
+    kwargs = dict(
+        courseChapters=getCourseChapters(),
+        columnList=["QuestionId", "QuestionCode"],
+        includeMetrics=True,
+        metricsColumns=data.chapterMetricsColumns,
+    )
+    expected = data.getQuestionsForCourseChapters(shardSize=None, **kwargs)
+    sharded = data.getQuestionsForCourseChapters(shardSize=1, **kwargs)
+
+    assert [timing["shard"] for timing in data.lastShardTimings] == [0, 1]
+    assert [timing["chapters"] for timing in data.lastShardTimings] == [1, 1]
+    pd.testing.assert_frame_equal(sortedFrame(sharded), sortedFrame(expected))
+
+
+def test_sharded_extraction_yields_the_shards_in_order():
+    data = getData()
+    shards = list(
+        data.getQuestionsForCourseChapters(
+            courseChapters=getCourseChapters(), shardSize=1, asIterator=True
+        )
+    )
+    # Question 1000 is excluded in chapter 2, the only question of that shard
+    assert len(shards) == 1
+    assert sorted(shards[0]["QuestionId"]) == [1000, 1002, 1003]
+    assert [timing["rows"] for timing in data.lastShardTimings] == [3, 0]
+
+
+def test_chapter_keys_are_resolved_with_one_select_per_table():
+    data = getData()
+    chapterKeys = data.resolveChapterKeys(courseChapters=getCourseChapters())
+    assert data.db.calls == ["KSCCluster", "KSCClusterKSC"]
+    assert chapterKeys.courseChapterIds == [1, 2]
+    assert sorted(chapterKeys.kscClusterIds) == [10, 11, 12]
+    assert sorted(chapterKeys.kscIds) == [100, 101, 102]
+    chapterKSCs = chapterKeys.getChapterKSCs()
+    assert sorted(zip(chapterKSCs["CourseChapterId"], chapterKSCs["KSCId"])) == [
+        (1, 100), (1, 101), (1, 102), (2, 100)
+    ]
+
+    # The keys of the same chapter set are cached, whatever the row order
+    data.db.calls.clear()
+    courseChapters = getCourseChapters().iloc[::-1]
+    assert data.resolveChapterKeys(courseChapters=courseChapters) is chapterKeys
+    assert data.db.calls == []
+
+
+def test_chapter_keys_come_from_the_graph_when_it_is_loaded():
+    data = getData()
+    expected = data.loadChapterKeys(courseChapters=getCourseChapters())
+    loadGraph(data)
+    chapterKeys = data.resolveChapterKeys(courseChapters=getCourseChapters())
+    assert data.db.calls == []
+    pd.testing.assert_frame_equal(
+        sortedFrame(chapterKeys.getChapterKSCs()), sortedFrame(expected.getChapterKSCs())
+    )
+
+
+def test_getters_share_the_resolved_chapter_keys():
+    tables = getTables()
+    tables["KSCClusterReview"] = pd.DataFrame(
+        {"KSCClusterId": [10, 12, 99], "ReviewValue": [1, 2, 3]}
+    )
+    tables["ChapterRatingReview"] = pd.DataFrame(
+        {"CourseChapterId": [1, 2, 3], "Rating": [4, 5, 1]}
+    )
+    data = getData(tables=tables)
+    courseChapters = getCourseChapters()
+    chapterKeys = data.resolveChapterKeys(courseChapters=courseChapters)
+    data.db.calls.clear()
+
+    mappings = data.getKSCClusterMappings(
+        courseChapters=courseChapters, chapterKeys=chapterKeys
+    )
+    clusterReviews = data.getKSCClusterReviews(
+        dbTableName="KSCClusterReview", courseChapters=courseChapters, chapterKeys=chapterKeys
+    )
+    ratingReviews = data.getChaptersRatingReviews(
+        dbTableName="ChapterRatingReview", courseChapters=courseChapters, chapterKeys=chapterKeys
+    )
+
+    assert data.db.calls == ["KSCClusterReview", "ChapterRatingReview"]
+    assert sorted(zip(mappings["CourseChapterId"], mappings["KSCClusterId"], mappings["KSCId"])) == [
+        (1, 10, 100), (1, 10, 101), (1, 11, 102), (2, 12, 100)
+    ]
+    assert sorted(clusterReviews["KSCClusterId"]) == [10, 12]
+    assert sorted(ratingReviews["CourseChapterId"]) == [1, 2]
+
+
+def test_chapters_without_clusters_have_no_keys():
+    data = getData()
+    courseChapters = pd.DataFrame({"CourseChapterId": [3]})
+    assert data.resolveChapterKeys(courseChapters=courseChapters) is None
+    assert data.getKSCClusterMappings(courseChapters=courseChapters) is None
+    assert (
+        data.getKSCClusterReviews(dbTableName="KSCClusterReview", courseChapters=courseChapters)
+        is None
+    )
+
+
+def getSharedTables(excludedInChapter3: bool) -> dict:
+    # Chapter 3 maps the same KSC as chapter 2 through its own cluster and
+    # neither excludes its question unless excludedInChapter3
+    tables = getTables()
+    tables["KSCCluster"] = pd.concat(
+        [
+            tables["KSCCluster"],
+            pd.DataFrame({"CourseChapterId": [3], "KSCClusterId": [13], "KSCClusterName": ["C13"]}),
+        ],
+        ignore_index=True,
+    )
+    tables["KSCClusterKSC"] = pd.concat(
+        [
+            tables["KSCClusterKSC"],
+            pd.DataFrame({"KSCClusterId": [13], "KSCId": [100], "DisplayRank": [1], "IsVisible": [1]}),
+        ],
+        ignore_index=True,
+    )
+    tables["QuestionMetrics"] = pd.concat(
+        [
+            tables["QuestionMetrics"],
+            pd.DataFrame(
+                {
+                    "QuestionId": [1000],
+                    "CourseChapterId": [3],
+                    "IsParentMetric": [0],
+                    "Attempted": [20],
+                    "Correct": [20],
+                    "TimeTaken": [60],
+                }
+            ),
+        ],
+        ignore_index=True,
+    )
+    exclusions = [(1, 1001)] + ([(3, 1000)] if excludedInChapter3 else [])
+    tables["CourseChapterQuestionExclusion"] = pd.DataFrame(
+        exclusions, columns=["CourseChapterId", "QuestionId"]
+    )
+    return tables
+
+
+def test_chapters_with_the_same_mapping_share_their_content():
+    data = getData(tables=getSharedTables(excludedInChapter3=False))
+    fingerprints = data.getChapterFingerprints(courseChapterIds=[2, 3])
+    assert fingerprints[2] == fingerprints[3]
+    assert data.getChapterSetFingerprint(courseChapterIds=[2]) == data.getChapterSetFingerprint(
+        courseChapterIds=[3]
+    )
+
+    chapter2 = data.getSharedChapterQuestions(courseChapters=pd.DataFrame({"CourseChapterId": [2]}))
+    data.db.calls.clear()
+    chapter3 = data.getSharedChapterQuestions(courseChapters=pd.DataFrame({"CourseChapterId": [3]}))
+    # Only the metrics of chapter 3 are read - the content comes from the cache
+    assert data.db.calls == ["QuestionMetrics"]
+    assert list(chapter2["QuestionId"]) == list(chapter3["QuestionId"]) == [1000]
+    assert list(chapter2["CourseChapterId"]) == [2]
+    assert list(chapter3["CourseChapterId"]) == [3]
+    assert list(chapter3["Attempted"]) == [20.0]
+
+
+def test_chapters_with_different_exclusions_do_not_share_their_content():
+    data = getData(tables=getSharedTables(excludedInChapter3=True))
+    fingerprints = data.getChapterFingerprints(courseChapterIds=[2, 3])
+    assert fingerprints[2] != fingerprints[3]
+    assert data.getChapterSetFingerprint(courseChapterIds=[1, 4]) is None
+
+    data.getSharedChapterQuestions(courseChapters=pd.DataFrame({"CourseChapterId": [2]}))
+    data.db.calls.clear()
+    chapter3 = data.getSharedChapterQuestions(courseChapters=pd.DataFrame({"CourseChapterId": [3]}))
+    assert "QuestionKSCView" in data.db.calls
+    assert chapter3 is None
+
+
+def test_warm_up_runs_the_stages_in_order(monkeypatch):
+    data = getData(config={"warmUpWorkers": 5})
+    events, lock = list(), threading.Lock()
+    # The five components of the second stage only pass the barrier together
+    barrier = threading.Barrier(5, timeout=2)
+
+    def getLoadFunction(name: str, waitForStage: bool = False):
+        def loadFunction(**kwargs):
+            with lock:
+                events.append(("start", name))
+            if waitForStage:
+                barrier.wait()
+            else:
+                time.sleep(0.05)
+            with lock:
+                events.append(("end", name))
+
+        return loadFunction
+
+    secondStage = [
+        "ContentHierarchy", "MappingGraph", "KSCDetails", "QuestionIndex", "QuestionLookup"
+    ]
+    monkeypatch.setattr(data, "loadReferenceData", getLoadFunction("ReferenceData"))
+    for name in secondStage:
+        monkeypatch.setattr(data, f"load{name}", getLoadFunction(name, waitForStage=True))
+    monkeypatch.setattr(
+        data, "getQuestionKSCIncidence", getLoadFunction("QuestionKSCIncidence")
+    )
+
+    timings = data.warmUpCaches()
+
+    assert events[:2] == [("start", "ReferenceData"), ("end", "ReferenceData")]
+    assert {name for _, name in events[2:12]} == set(secondStage)
+    assert events[-2:] == [("start", "QuestionKSCIncidence"), ("end", "QuestionKSCIncidence")]
+    assert set(timings) == set(["ReferenceData", "QuestionKSCIncidence", "Total"] + secondStage)
+    assert all(seconds is not None for seconds in timings.values())
+
+
+def test_warm_up_skips_failed_and_unlisted_components(monkeypatch):
+    data = getData()
+
+    def loadMappingGraph():
+        raise RuntimeError("Mapping graph failed")
+
+    monkeypatch.setattr(data, "loadMappingGraph", loadMappingGraph)
+    timings = data.warmUpCaches(components=["MappingGraph", "KSCDetails", "QuestionIndex"])
+
+    assert set(timings) == {"MappingGraph", "KSCDetails", "QuestionIndex", "Total"}
+    assert timings["MappingGraph"] is None
+    assert data.mappingGraph is None
+    assert sorted(data.kscDetails["KSCId"]) == [100, 101, 102]
+    assert sorted(data.questionIndex["QuestionId"]) == [1000, 1001, 1002, 1003]
+
+
+def test_warmed_ksc_details_read_only_the_missing_kscs():
+    tables = getTables()
+    data = getData(tables=tables)
+    data.warmUpCaches(components=["KSCDetails"], background=True).join()
+    assert set(data.lastWarmUpTimings) == {"KSCDetails", "Total"}
+
+    data.db.calls.clear()
+    assert sorted(data.getKSCDetails(kscIds=[100, 102])["KSCId"]) == [100, 102]
+    assert data.db.calls == []
+
+    # KSCs added since the warm-up are read from KSCView and KSCs whose rows
+    # changed are patched on the next refresh
+    tables["KSCView"] = pd.DataFrame(
+        {
+            "KSCId": [100, 101, 102, 103],
+            "KSCText": ["K100", "K101 changed", "K102", "K103"],
+            "KSCDiagramURL": ["k100.png", "k101.png", "k102.png", "k103.png"],
+        }
+    )
+    kscDetails = data.getKSCDetails(kscIds=[100, 103])
+    assert sorted(kscDetails["KSCId"]) == [100, 103]
+    assert data.db.calls == ["KSCView"]
+
+    assert data.refreshKSCDetails() == 2
+    kscTexts = dict(zip(data.kscDetails["KSCId"], data.kscDetails["KSCText"]))
+    assert kscTexts == {100: "K100", 101: "K101 changed", 102: "K102", 103: "K103"}
+
+
+# Stand-in for the per-question checksum query - a hash of the question's
+# mapping and detail rows in the KSCs of the given chapters
+def getRowChecksums(tables: dict, courseChapterIds: list) -> pd.Series:
+    kscIds = tables["KSCCluster"].loc[
+        tables["KSCCluster"]["CourseChapterId"].isin(courseChapterIds)
+    ].merge(tables["KSCClusterKSC"], on="KSCClusterId")["KSCId"]
+    rows = tables["QuestionKSCView"].loc[tables["QuestionKSCView"]["KSCId"].isin(kscIds)]
+    rows = rows.merge(tables["QuestionView"], on="QuestionId", how="left")
+    rowHashes = pd.Series(
+        pd.util.hash_pandas_object(rows, index=False).to_numpy() % 1000003,
+        index=rows["QuestionId"].to_numpy(),
+    )
+    return rowHashes.groupby(level=0).sum()
+
+
+def test_refresh_patches_changed_added_and_removed_questions(monkeypatch):
+    tables = getTables()
+    data = getData(tables=tables)
+    courseChapters = pd.DataFrame({"CourseChapterId": [1]})
+    monkeypatch.setattr(
+        data,
+        "getChapterRowChecksums",
+        lambda courseChapterIds: getRowChecksums(tables=tables, courseChapterIds=courseChapterIds),
+    )
+    builtIds = list()
+    buildChapterFrames = data.buildChapterFrames
+
+    def recordBuild(courseChapters: pd.DataFrame, questionIds: list = None):
+        builtIds.append(None if questionIds is None else sorted(questionIds))
+        return buildChapterFrames(courseChapters=courseChapters, questionIds=questionIds)
+
+    monkeypatch.setattr(data, "buildChapterFrames", recordBuild)
+
+    cachedFrames = data.refreshChapterFrames(courseChapters=courseChapters)
+    assert builtIds == [None]
+    assert data.refreshChapterFrames(courseChapters=courseChapters) is cachedFrames
+    assert builtIds == [None]
+
+    # Question 1002 is changed, 1004 is added and 1003 is unmapped
+    tables["QuestionView"].loc[tables["QuestionView"]["QuestionId"] == 1002, "QuestionCode"] = "Q1002b"
+    tables["QuestionView"] = pd.concat(
+        [
+            tables["QuestionView"],
+            pd.DataFrame(
+                {
+                    "QuestionId": [1004],
+                    "QuestionCode": ["Q1004"],
+                    "AnswerOption": ["E"],
+                    "QuestionDiagramURL": ["q1004"],
+                    "FullSolutionURL": ["s1004"],
+                    "QuestionLatex": ["v"],
+                    "IsSuspended": [0],
+                }
+            ),
+        ],
+        ignore_index=True,
+    )
+    tables["QuestionKSCView"] = pd.concat(
+        [
+            tables["QuestionKSCView"].loc[tables["QuestionKSCView"]["QuestionId"] != 1003],
+            pd.DataFrame({"KSCId": [101], "QuestionId": [1004], "IsPrimaryKSC": [1]}),
+        ],
+        ignore_index=True,
+    )
+
+    allQuestions, allKsc = data.decodeChapterFrames(
+        *data.refreshChapterFrames(courseChapters=courseChapters)
+    )
+    assert builtIds == [None, [1002, 1004]]
+    expectedQuestions, expectedKsc = getData(tables=tables).buildChapterFrames(
+        courseChapters=courseChapters
+    )
+    assert sorted(allQuestions["QuestionId"]) == [1000, 1002, 1004]
+    assert list(allQuestions.loc[allQuestions["QuestionId"] == 1002, "QuestionCode"]) == ["Q1002b"]
+    pd.testing.assert_frame_equal(
+        sortedFrame(allQuestions), sortedFrame(expectedQuestions), check_dtype=False
+    )
+    pd.testing.assert_frame_equal(sortedFrame(allKsc), sortedFrame(expectedKsc), check_dtype=False)
+
+
+def test_course_ksc_questions_are_primary_only_by_default():
+    data = getData()
+    courseKSCs = pd.DataFrame({"KSCId": [102]})
+    assert list(data.getQuestionsForCourseKSCs(courseKSCs=courseKSCs)["QuestionId"]) == [1002]
+    allQuestions = data.getQuestionsForCourseKSCs(courseKSCs=courseKSCs, onlyPrimary=False)
+    assert sorted(allQuestions["QuestionId"]) == [1002, 1003]
+
+
+def test_cluster_lookups_for_ksc_ids_use_the_graph():
+    data = getData()
+    allKSCs = pd.DataFrame({"KSCId": [100, 102], "CourseChapterId": [1, 1]})
+    fromDB = data.getKSCClustersforKSCIds(allKSCs=allKSCs)
+    loadGraph(data)
+    fromGraph = data.getKSCClustersforKSCIds(allKSCs=allKSCs)
+    assert data.db.calls == []
+    pd.testing.assert_frame_equal(sortedFrame(fromGraph), sortedFrame(fromDB))
+
+
+def test_cluster_lookups_for_kscs_use_the_graph():
+    data = getData()
+    allKSCs = pd.DataFrame({"KSCId": [100, 102]})
+    fromDB = data.getKSCClustersforKSCs(allKSCs=allKSCs, allCourseChapters=getCourseChapters())
+    loadGraph(data)
+    fromGraph = data.getKSCClustersforKSCs(
+        allKSCs=allKSCs, allCourseChapters=getCourseChapters()
+    )
+    assert data.db.calls == []
+    pd.testing.assert_frame_equal(sortedFrame(fromGraph), sortedFrame(fromDB))
+
+
+def test_chapters_without_clusters_have_no_kscs_or_questions():
+    data = getData()
+    courseChapters = pd.DataFrame({"CourseChapterId": [3]})
+    assert data.getKSCsForCourseChapters(courseChapters=courseChapters) == (None, None)
+    assert data.getQuestionsForCourseChapters(courseChapters=courseChapters) is None
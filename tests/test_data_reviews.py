@@ -0,0 +1,101 @@
+from datetime import datetime
+
+import pytest
+
+# pyodbc needs the ODBC driver manager even when only stand-in databases are used
+pytest.importorskip("pyodbc", exc_type=ImportError)
+
+import pandas as pd
+
+from utils import Utils
+from db import DBConnection
+from data import Data
+
+
+@pytest.fixture
+def db(monkeypatch):
+    config = {
+        "db": {"connstrKey": "REVIEWS_TEST_CONNSTR", "defaultSchema": "dbo"},
+        "secrets": {"REVIEWS_TEST_CONNSTR": "driver=none;server=primary;database=test;uid=;pwd="},
+    }
+    db = DBConnection(utils=Utils(), config=config)
+    db.queries = list()
+    db.reviewRows = pd.DataFrame()
+    db.liveKeys = pd.DataFrame()
+
+    # Queries are recorded and answered from frames instead of a DB
+    def execSelectQuery(query: str) -> pd.DataFrame:
+        db.queries.append(query)
+        if "[KSCCluster]" in query:
+            return pd.DataFrame({"KSCClusterId": [10]})
+        if query.startswith("SELECT QuestionKSCReviewId FROM"):
+            return db.liveKeys
+        return db.reviewRows
+
+    monkeypatch.setattr(db, "execSelectQuery", execSelectQuery)
+    monkeypatch.setattr(db, "checkTableExists", lambda tableName, schemaName: True)
+    return db
+
+
+def getReviews(reviewIds: list, values: list, updatedOn: list) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "QuestionKSCReviewId": reviewIds,
+            "UpdatedOn": updatedOn,
+            "ReviewValue": values,
+        }
+    )
+
+
+def getDelta(db: DBConnection, cachedReviews: pd.DataFrame, watermark: datetime):
+    data = Data(db=db, utils=Utils(), config=dict())
+    db.queries.clear()
+    return data.getQuestionKSCReviewsDelta(
+        dbTableName="QuestionKSCReview",
+        courseChapters=pd.DataFrame({"CourseChapterId": [1]}),
+        cachedReviews=cachedReviews,
+        watermark=watermark,
+        columnList=["ReviewValue"],
+    )
+
+
+def test_delta_and_reconcile_queries_select_only_the_needed_columns(db):
+    watermark = datetime(2024, 1, 2)
+    cachedReviews = getReviews(
+        reviewIds=[1, 2], values=[0, 0], updatedOn=[datetime(2024, 1, 1), watermark]
+    )
+    db.liveKeys = pd.DataFrame({"QuestionKSCReviewId": [1, 2]})
+    getDelta(db=db, cachedReviews=cachedReviews, watermark=watermark)
+
+    deltaQuery, keyQuery = db.queries[-2:]
+    assert deltaQuery.startswith(
+        "SELECT QuestionKSCReviewId,UpdatedOn,ReviewValue FROM [dbo].[QuestionKSCReview]"
+    )
+    assert "UpdatedOn >= '" in deltaQuery
+    assert keyQuery.startswith("SELECT QuestionKSCReviewId FROM [dbo].[QuestionKSCReview]")
+    assert "UpdatedOn" not in keyQuery
+    for query in (deltaQuery, keyQuery):
+        assert " WHERE QuestionId IN (SELECT QuestionId FROM [dbo].[QuestionKSCView]" in query
+        assert "SELECT *" not in query.split(" WHERE ")[0]
+
+
+def test_delta_rows_are_merged_and_deleted_rows_dropped(db):
+    watermark = datetime(2024, 1, 2)
+    cachedReviews = getReviews(
+        reviewIds=[1, 2, 3],
+        values=[0, 0, 0],
+        updatedOn=[datetime(2024, 1, 1), watermark, datetime(2024, 1, 1)],
+    )
+    # Review 2 was updated, review 4 added and review 3 deleted since the watermark
+    db.reviewRows = getReviews(
+        reviewIds=[2, 4], values=[1, 1], updatedOn=[datetime(2024, 1, 3), datetime(2024, 1, 4)]
+    )
+    db.liveKeys = pd.DataFrame({"QuestionKSCReviewId": [1, 2, 4]})
+    questionReviews, newWatermark = getDelta(
+        db=db, cachedReviews=cachedReviews, watermark=watermark
+    )
+
+    questionReviews = questionReviews.sort_values(by="QuestionKSCReviewId")
+    assert list(questionReviews["QuestionKSCReviewId"]) == [1, 2, 4]
+    assert list(questionReviews["ReviewValue"]) == [0, 1, 1]
+    assert newWatermark == datetime(2024, 1, 4)
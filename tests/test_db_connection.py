@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+# pyodbc needs the ODBC driver manager even when only stand-in databases are used
+pytest.importorskip("pyodbc", exc_type=ImportError)
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, event
+
+from utils import Utils
+from db import DBConnection
+
+
+# DBConnection whose openDBConnection opens a local sqlite stand-in and counts
+# the calls, so the lazy connection logic runs unchanged
+def getDB(tmp_path, **dbConfig) -> DBConnection:
+    config = {
+        "db": dict(
+            {"connstrKey": "CNXN_TEST_CONNSTR", "defaultSchema": "main", "maxRetries": 3, "maxReadRows": 100},
+            **dbConfig,
+        ),
+        "secrets": {"CNXN_TEST_CONNSTR": "driver=none;server=primary;database=test;uid=;pwd="},
+    }
+    db = DBConnection.__new__(DBConnection)
+    db.openCount = 0
+    db.pings = list()
+
+    def openDBConnection() -> bool:
+        db.openCount += 1
+        db.alchemyCnxn = create_engine(f"sqlite:///{tmp_path}/primary.db")
+        event.listen(
+            db.alchemyCnxn,
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *args: db.pings.append(statement),
+        )
+        db.openReadEndpoints()
+        db.isConnected = True
+        db.startKeepAlive()
+        return True
+
+    db.openDBConnection = openDBConnection
+    DBConnection.__init__(db, utils=Utils(), config=config)
+    return db
+
+
+def waitFor(condition, seconds: float = 5.0) -> bool:
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_connection_is_opened_on_first_query_only(tmp_path):
+    db = getDB(tmp_path)
+    assert (db.openCount, db.isConnected) == (0, False)
+    assert db.execSelectQuery(query="SELECT 1 AS Value")["Value"].iloc[0] == 1
+    db.execSelectQuery(query="SELECT 2 AS Value")
+    assert db.openCount == 1
+    db.closeDBConnection()
+
+
+def test_concurrent_first_queries_open_one_connection(tmp_path):
+    db = getDB(tmp_path)
+    threads = [
+        threading.Thread(target=db.execSelectQuery, kwargs={"query": "SELECT 1 AS Value"})
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert db.openCount == 1
+    db.closeDBConnection()
+
+
+def test_warm_up_connects_in_the_background(tmp_path):
+    db = getDB(tmp_path, warmUpConnection=True)
+    assert waitFor(lambda: db.isConnected)
+    assert db.openCount == 1
+    db.closeDBConnection()
+
+
+def test_keep_alive_pings_while_connected(tmp_path):
+    db = getDB(tmp_path, keepAliveSeconds=0.01)
+    assert db.keepAliveThread is None
+    db.ensureDBConnection()
+    assert db.keepAliveThread.daemon
+    assert waitFor(lambda: "SELECT 1" in db.pings)
+    db.closeDBConnection()
+    # A ping already past the connected check may still land
+    time.sleep(0.05)
+    pingCount = len(db.pings)
+    time.sleep(0.05)
+    assert len(db.pings) == pingCount
@@ -0,0 +1,143 @@
+from datetime import datetime
+
+import pytest
+
+# pyodbc needs the ODBC driver manager even though no DB is used here
+pytest.importorskip("pyodbc", exc_type=ImportError)
+
+from utils import Utils
+from db import DBColumn, DBConnection, DBIndex, DBTableDesign
+
+
+@pytest.fixture
+def db():
+    config = {
+        "db": {"connstrKey": "DDL_TEST_CONNSTR", "defaultSchema": "dbo"},
+        "secrets": {"DDL_TEST_CONNSTR": "driver=none;server=primary;database=test;uid=;pwd="},
+    }
+    return DBConnection(utils=Utils(), config=config)
+
+
+def getColumns() -> list:
+    return [
+        DBColumn(
+            columnName="MetricsHistoryId",
+            columnType="INT",
+            isPrimaryKey=True,
+            isAutoIncrement=True,
+        ),
+        DBColumn(columnName="QuestionId", columnType="INT", isNullable=True),
+        DBColumn(columnName="Attempted", columnType="INT", isNullable=True),
+        DBColumn(columnName="UpdatedOn", columnType="DATETIME", isNullable=True),
+    ]
+
+
+def test_column_create_string():
+    createStr, pkStr = DBColumn(columnName="QuestionId", columnType="INT").getCreateString(
+        tableName="Question"
+    )
+    assert createStr == "[QuestionId] INT  NOT NULL , "
+    assert pkStr is None
+
+
+def test_primary_key_with_partition_column():
+    _, pkStr = getColumns()[0].getCreateString(
+        tableName="MetricsHistory",
+        isClustered=False,
+        storageStr="[PS_PF_Monthly] ([UpdatedOn])",
+        extraKeyColumns=["UpdatedOn"],
+    )
+    assert pkStr.startswith(
+        "CONSTRAINT [PK_MetricsHistory] PRIMARY KEY NONCLUSTERED "
+        + "([MetricsHistoryId] ASC, [UpdatedOn] ASC) "
+    )
+    assert pkStr.endswith("ON [PS_PF_Monthly] ([UpdatedOn])")
+
+
+def test_covering_index_create_string():
+    index = DBIndex(
+        columns=["QuestionId", "UpdatedOn"], includeColumns=["Attempted"], isUnique=True
+    )
+    createStr = index.getCreateString(
+        tableName="MetricsHistory",
+        schemaName="dbo",
+        compression="PAGE",
+        extraKeyColumns=["CourseChapterId"],
+    )
+    assert createStr == (
+        "CREATE UNIQUE NONCLUSTERED INDEX [IX_MetricsHistory_QuestionId_UpdatedOn] "
+        + "ON dbo.MetricsHistory ([QuestionId] ASC, [UpdatedOn] ASC, [CourseChapterId] ASC) "
+        + "INCLUDE ([Attempted]) WITH (STATISTICS_NORECOMPUTE = OFF, DROP_EXISTING = OFF, "
+        + "ONLINE = OFF, DATA_COMPRESSION = PAGE) ON [PRIMARY]; "
+    )
+
+
+def test_default_design_is_rowstore_on_primary(db):
+    query = db.getCreateTableQuery(
+        tableName="MetricsHistory", columnList=getColumns(), indexColumns=["QuestionId"]
+    )
+    assert query.startswith("CREATE TABLE dbo.MetricsHistory (")
+    assert "PRIMARY KEY CLUSTERED ([MetricsHistoryId] ASC)" in query
+    assert ") ON [PRIMARY]; " in query
+    assert "COLUMNSTORE" not in query
+    assert "PARTITION" not in query
+    assert "CREATE NONCLUSTERED INDEX [IX_MetricsHistory_QuestionId]" in query
+
+
+def test_rowstore_compression(db):
+    query = db.getCreateTableQuery(
+        tableName="MetricsHistory",
+        columnList=getColumns(),
+        tableDesign=DBTableDesign(compression="PAGE"),
+    )
+    assert ") ON [PRIMARY] WITH (DATA_COMPRESSION = PAGE); " in query
+
+
+def test_partitioned_columnstore_design(db):
+    tableDesign = DBTableDesign(
+        isColumnstore=True,
+        compression="COLUMNSTORE_ARCHIVE",
+        partitionFunction="PF_Monthly",
+        partitionColumn="UpdatedOn",
+        partitionBoundaries=[datetime(2024, 1, 1), datetime(2024, 2, 1)],
+        indexes=[DBIndex(columns=["QuestionId"], includeColumns=["Attempted"])],
+    )
+    query = db.getCreateTableQuery(
+        tableName="MetricsHistory", columnList=getColumns(), tableDesign=tableDesign
+    )
+    assert query.startswith(
+        "IF NOT EXISTS (SELECT 1 FROM sys.partition_functions WHERE name = 'PF_Monthly') "
+        + "CREATE PARTITION FUNCTION [PF_Monthly] (DATETIME) AS RANGE RIGHT FOR VALUES "
+        + "('2024-01-01 00:00:00.000','2024-02-01 00:00:00.000'); "
+    )
+    assert "CREATE PARTITION SCHEME [PS_PF_Monthly] AS PARTITION [PF_Monthly] ALL TO ([PRIMARY]); " in query
+    # The partition column is part of the key, so it is made non-nullable
+    assert "[UpdatedOn] DATETIME  NOT NULL" in query
+    assert "PRIMARY KEY NONCLUSTERED ([MetricsHistoryId] ASC, [UpdatedOn] ASC)" in query
+    assert ") ON [PS_PF_Monthly] ([UpdatedOn]); " in query
+    assert (
+        "CREATE CLUSTERED COLUMNSTORE INDEX [CCI_MetricsHistory] ON dbo.MetricsHistory "
+        + "WITH (DATA_COMPRESSION = COLUMNSTORE_ARCHIVE) ON [PS_PF_Monthly] ([UpdatedOn]); "
+    ) in query
+    assert "INCLUDE ([Attempted])" in query
+    # Columnstore compression is not applied to the rowstore indexes
+    assert "DATA_COMPRESSION = COLUMNSTORE_ARCHIVE) ON [PS_PF_Monthly] ([UpdatedOn]); CREATE" in query
+    assert "INCLUDE ([Attempted]) WITH (STATISTICS_NORECOMPUTE = OFF, DROP_EXISTING = OFF, ONLINE = OFF) " in query
+
+
+def test_partitioned_design_needs_boundaries():
+    with pytest.raises(ValueError):
+        DBTableDesign(partitionFunction="PF_Monthly", partitionColumn="UpdatedOn")
+
+
+def test_partition_boundaries_are_checked_when_generating_ddl(db):
+    tableDesign = DBTableDesign(
+        partitionFunction="PF_Monthly",
+        partitionColumn="UpdatedOn",
+        partitionBoundaries=[datetime(2024, 1, 1)],
+    )
+    tableDesign.partitionBoundaries = []
+    with pytest.raises(ValueError):
+        db.getCreateTableQuery(
+            tableName="MetricsHistory", columnList=getColumns(), tableDesign=tableDesign
+        )
@@ -0,0 +1,142 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+# pyodbc needs the ODBC driver manager even when only stand-in databases are used
+pytest.importorskip("pyodbc", exc_type=ImportError)
+pytest.importorskip("sqlalchemy")
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+from utils import Utils
+from db import DBConnection
+
+
+@pytest.fixture
+def db(tmp_path):
+    config = {
+        "db": {
+            "connstrKey": "PARALLEL_TEST_CONNSTR",
+            "defaultSchema": "main",
+            "maxRetries": 3,
+            "maxReadRows": 4,
+            "maxReadWorkers": 2,
+            "maxQueuedChunks": 1,
+        },
+        "secrets": {"PARALLEL_TEST_CONNSTR": "driver=none;server=primary;database=test;uid=;pwd="},
+    }
+    db = DBConnection(utils=Utils(), config=config)
+    db.alchemyCnxn = create_engine(f"sqlite:///{tmp_path}/primary.db")
+    with db.alchemyCnxn.begin() as cnxn:
+        cnxn.exec_driver_sql("CREATE TABLE Number (Value INTEGER)")
+        cnxn.exec_driver_sql(
+            "INSERT INTO Number VALUES " + ",".join(f"({value})" for value in range(30))
+        )
+    db.openReadEndpoints()
+    db.isConnected = True
+    yield db
+    db.closeDBConnection()
+
+
+def test_subranges_split_at_equal_parts(db):
+    ranges = db.getDateSubranges(
+        dateStart=datetime(2024, 1, 1), dateEnd=datetime(2024, 1, 4), parts=3
+    )
+    assert ranges == [
+        (datetime(2024, 1, 1), datetime(2024, 1, 2)),
+        (datetime(2024, 1, 2), datetime(2024, 1, 3)),
+        (datetime(2024, 1, 3), datetime(2024, 1, 4)),
+    ]
+
+
+def test_subranges_keep_a_single_part(db):
+    dateStart, dateEnd = datetime(2024, 1, 1), datetime(2024, 2, 1)
+    assert db.getDateSubranges(dateStart=dateStart, dateEnd=dateEnd) == [(dateStart, dateEnd)]
+    assert db.getDateSubranges(dateStart=dateStart, dateEnd=dateEnd, parts=1) == [
+        (dateStart, dateEnd)
+    ]
+    assert db.getDateSubranges(dateStart=dateEnd, dateEnd=dateStart, parts=3) == [
+        (dateEnd, dateStart)
+    ]
+    assert db.getDateSubranges(dateStart=None, dateEnd=dateEnd, parts=3) == [(None, dateEnd)]
+
+
+def test_subranges_split_at_partition_boundaries_inside_the_window(db):
+    ranges = db.getDateSubranges(
+        dateStart=datetime(2024, 1, 1),
+        dateEnd=datetime(2024, 4, 1),
+        parts=10,
+        partitionBoundaries=[
+            datetime(2024, 3, 1),
+            datetime(2023, 12, 1),
+            datetime(2024, 1, 1),
+            datetime(2024, 2, 1),
+            datetime(2024, 4, 1),
+        ],
+    )
+    assert ranges == [
+        (datetime(2024, 1, 1), datetime(2024, 2, 1)),
+        (datetime(2024, 2, 1), datetime(2024, 3, 1)),
+        (datetime(2024, 3, 1), datetime(2024, 4, 1)),
+    ]
+
+
+def test_subrange_queries_exclude_inner_ends_and_include_the_last_end(db):
+    ranges = db.getDateSubranges(
+        dateStart=datetime(2024, 1, 1), dateEnd=datetime(2024, 1, 3), parts=2
+    )
+    queries = [
+        db.addDatesFilterToQuery(
+            query="SELECT * FROM T",
+            dateColumn="D",
+            dateStart=rangeStart,
+            includeStart=True,
+            dateEnd=rangeEnd,
+            includeEnd=(idx == len(ranges) - 1),
+        )
+        for idx, (rangeStart, rangeEnd) in enumerate(ranges)
+    ]
+    assert "D >= '2024-01-01" in queries[0] and "D < '2024-01-02" in queries[0]
+    assert "D >= '2024-01-02" in queries[1] and "D <= '2024-01-03" in queries[1]
+
+
+def test_parallel_reads_stream_chunks_in_query_order(db):
+    queries = [
+        f"SELECT Value FROM Number WHERE Value >= {start} AND Value < {start + 10} ORDER BY Value"
+        for start in (0, 10, 20)
+    ]
+    chunks = list(db.execParallelSelectQueries(queries=queries, asIterator=True))
+    assert all(chunk.shape[0] <= 4 for chunk in chunks)
+    assert pd.concat(chunks)["Value"].tolist() == list(range(30))
+
+
+def test_parallel_stream_workers_stay_bounded_and_stop_on_close(db):
+    produced = {query: 0 for query in ("A", "B")}
+    lock = threading.Lock()
+
+    def iterSelectQuery(query: str):
+        for value in range(100):
+            with lock:
+                produced[query] += 1
+            yield pd.DataFrame({"Value": [value]})
+
+    db.iterSelectQuery = iterSelectQuery
+    chunks = db.execParallelSelectQueries(queries=["A", "B"], asIterator=True)
+    assert next(chunks)["Value"].iloc[0] == 0
+    time.sleep(0.3)
+    # One chunk queued and one waiting to be queued per worker
+    assert produced["A"] <= 3 and produced["B"] <= 2
+    chunks.close()
+    time.sleep(0.3)
+    stopped = dict(produced)
+    time.sleep(0.2)
+    assert produced == stopped
+
+
+def test_parallel_stream_is_refused_inside_temp_table_session(db):
+    with db.tempTableSession():
+        with pytest.raises(RuntimeError):
+            db.execParallelSelectQueries(queries=["SELECT 1", "SELECT 2"], asIterator=True)
@@ -0,0 +1,163 @@
+import pytest
+
+# pyodbc needs the ODBC driver manager even when only stand-in databases are used
+pytest.importorskip("pyodbc", exc_type=ImportError)
+pytest.importorskip("sqlalchemy")
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
+
+from utils import Utils
+from db import DBConnection
+
+
+# Stand-in databases are sqlite files holding one row with their own name, so a
+# read shows which endpoint served it
+def createStandIn(path, name: str) -> str:
+    url = f"sqlite:///{path}"
+    engine = create_engine(url)
+    with engine.begin() as cnxn:
+        cnxn.exec_driver_sql("CREATE TABLE Endpoint (Name TEXT)")
+        cnxn.exec_driver_sql(f"INSERT INTO Endpoint VALUES ('{name}')")
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def db(tmp_path):
+    config = {
+        "db": {
+            "connstrKey": "ROUTING_TEST_CONNSTR",
+            "defaultSchema": "main",
+            "maxRetries": 3,
+            "maxReadRows": 1000,
+            "healthCheckSeconds": 3600,
+            "readServers": [
+                {"url": createStandIn(tmp_path / "replica1.db", "replica1"), "name": "replica1"},
+                {"url": createStandIn(tmp_path / "replica2.db", "replica2"), "name": "replica2"},
+            ],
+        },
+        "secrets": {"ROUTING_TEST_CONNSTR": "driver=none;server=primary;database=test;uid=;pwd="},
+    }
+    db = DBConnection(utils=Utils(), config=config)
+    db.alchemyCnxn = create_engine(createStandIn(tmp_path / "primary.db", "primary"))
+    db.openReadEndpoints()
+    db.isConnected = True
+    yield db
+    db.closeDBConnection()
+
+
+def readEndpointName(db) -> str:
+    return db.execSelectQuery(query="SELECT Name FROM Endpoint")["Name"].iloc[0]
+
+
+def test_reads_round_robin_over_read_endpoints(db):
+    assert [readEndpointName(db) for _ in range(4)] == [
+        "replica1",
+        "replica2",
+        "replica1",
+        "replica2",
+    ]
+
+
+def test_writes_go_to_primary(db):
+    engine, endpoint = db.getRoutedEngine(readOnly=False)
+    assert endpoint is None
+    assert engine is db.alchemyCnxn
+
+
+def test_unhealthy_endpoint_is_skipped(db):
+    db.markEndpointUnhealthy(endpoint=db.readEndpoints[0], err=Exception("down"))
+    assert {readEndpointName(db) for _ in range(3)} == {"replica2"}
+
+
+def test_reads_fall_back_to_primary_without_healthy_endpoints(db):
+    for endpoint in db.readEndpoints:
+        db.markEndpointUnhealthy(endpoint=endpoint, err=Exception("down"))
+    assert readEndpointName(db) == "primary"
+
+
+def test_failed_endpoint_read_is_retried_on_next_endpoint(db, tmp_path):
+    db.readEndpoints[0].engine = create_engine(f"sqlite:///{tmp_path}/missing/replica.db")
+    assert readEndpointName(db) == "replica2"
+    assert not db.readEndpoints[0].isHealthy
+
+
+def test_read_your_writes_pins_reads_to_primary(db):
+    with db.readYourWrites():
+        assert readEndpointName(db) == "primary"
+        with db.readYourWrites():
+            assert readEndpointName(db) == "primary"
+        assert readEndpointName(db) == "primary"
+    assert readEndpointName(db) != "primary"
+
+
+def test_read_your_writes_pin_reaches_parallel_reads(db):
+    queries = ["SELECT Name FROM Endpoint"] * 4
+    with db.readYourWrites():
+        results = db.execParallelSelectQueries(queries=queries)
+    assert list(results["Name"]) == ["primary"] * 4
+
+    results = db.execParallelSelectQueries(queries=queries)
+    assert "primary" not in set(results["Name"])
+
+
+def test_recent_write_window_pins_reads_to_primary(db):
+    db.config["readYourWritesSeconds"] = 60
+    db.execWithCnxnRetry(
+        alchemySession=True,
+        alchemyExecute=True,
+        statement=text("UPDATE Endpoint SET Name = 'primary'"),
+    )
+    assert readEndpointName(db) == "primary"
+
+
+def test_temp_table_session_reads_from_primary(db):
+    with db.tempTableSession():
+        assert readEndpointName(db) == "primary"
+    assert readEndpointName(db) != "primary"
+
+
+def test_parallel_reads_are_refused_inside_temp_table_session(db):
+    with db.tempTableSession():
+        with pytest.raises(RuntimeError):
+            db.execParallelSelectQueries(queries=["SELECT Name FROM Endpoint"] * 2)
+
+
+def test_temp_table_session_read_is_retried_after_connection_loss(db):
+    failures = [DBAPIError("SELECT 1", None, Exception("lost"), connection_invalidated=True)]
+    connections = list()
+
+    def readOnce(con, **kwargs):
+        connections.append(con)
+        if failures:
+            raise failures.pop()
+        return con.exec_driver_sql("SELECT Name FROM Endpoint").scalar()
+
+    with db.tempTableSession():
+        assert db.execWithCnxnRetry(execFunction=readOnce, readOnly=True) == "primary"
+    assert len(connections) == 2
+    assert connections[0] is not connections[1]
+
+
+def test_replace_by_data_deletes_and_inserts_on_primary(db, monkeypatch):
+    db.config["maxInsertRows"] = 1000
+    monkeypatch.setattr(db, "checkTableExists", lambda tableName, schemaName: True)
+    with db.alchemyCnxn.begin() as cnxn:
+        cnxn.exec_driver_sql("CREATE TABLE Exclusion (CourseChapterId INT, QuestionId INT)")
+        cnxn.exec_driver_sql("INSERT INTO Exclusion VALUES (1, 10), (1, 11), (2, 20)")
+    changes = list()
+    db.addInvalidationListener(listener=changes.append)
+
+    assert db.execReplaceByData(
+        tableName="Exclusion",
+        deleteData=pd.DataFrame({"CourseChapterId": [1]}),
+        insertData=pd.DataFrame({"CourseChapterId": [1], "QuestionId": [12]}),
+    )
+    with db.alchemyCnxn.connect() as cnxn:
+        rows = cnxn.exec_driver_sql(
+            "SELECT CourseChapterId, QuestionId FROM Exclusion ORDER BY QuestionId"
+        ).fetchall()
+    assert [tuple(row) for row in rows] == [(1, 12), (2, 20)]
+    assert [change.isDelete for change in changes] == [True, False]
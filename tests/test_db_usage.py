@@ -0,0 +1,54 @@
+import pytest
+
+# pyodbc needs the ODBC driver manager even when only stand-in databases are used
+pytest.importorskip("pyodbc", exc_type=ImportError)
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+
+from utils import Utils
+from db import DBConnection
+
+
+def getDB(tmp_path, trackColumnUsage: bool) -> DBConnection:
+    config = {
+        "db": {
+            "connstrKey": "USAGE_TEST_CONNSTR",
+            "defaultSchema": "main",
+            "maxRetries": 3,
+            "maxReadRows": 10,
+            "trackColumnUsage": trackColumnUsage,
+        },
+        "secrets": {"USAGE_TEST_CONNSTR": "driver=none;server=primary;database=test;uid=;pwd="},
+    }
+    db = DBConnection(utils=Utils(), config=config)
+    db.alchemyCnxn = create_engine(f"sqlite:///{tmp_path}/usage.db")
+    with db.alchemyCnxn.begin() as cnxn:
+        cnxn.exec_driver_sql("CREATE TABLE Question (QuestionId INTEGER, Code TEXT, Latex TEXT)")
+        cnxn.exec_driver_sql("INSERT INTO Question VALUES (1, 'a', 'x'), (2, 'b', 'y')")
+    db.openReadEndpoints()
+    db.isConnected = True
+    return db
+
+
+def selectQuestions(db: DBConnection):
+    return db.execSelectQuery(query="SELECT QuestionId, Code, Latex FROM Question")
+
+
+def test_select_results_report_the_unread_columns(tmp_path):
+    db = getDB(tmp_path=tmp_path, trackColumnUsage=True)
+    questions = selectQuestions(db=db)
+    questions.loc[questions["QuestionId"] > 1, "Code"]
+
+    report = db.getColumnUsageReport()
+    # The site is the first caller outside of the DB layer
+    assert list(report.values()) == [["Latex"]]
+    assert list(report)[0].startswith("test_db_usage.py:selectQuestions:")
+    db.closeDBConnection()
+
+
+def test_select_results_are_plain_frames_without_tracking(tmp_path):
+    db = getDB(tmp_path=tmp_path, trackColumnUsage=False)
+    assert type(selectQuestions(db=db)).__name__ == "DataFrame"
+    assert db.getColumnUsageReport() is None
+    db.closeDBConnection()
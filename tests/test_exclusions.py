@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from exclusions import QuestionExclusions
+
+
+def test_missing_chapters_are_loaded_in_one_call():
+    calls = list()
+
+    def loadExclusions(courseChapterIds: list) -> pd.DataFrame:
+        calls.append(list(courseChapterIds))
+        return pd.DataFrame({"CourseChapterId": [1, 1], "QuestionId": [12, 10]})
+
+    exclusions = QuestionExclusions()
+    chapterExclusions = exclusions.get(courseChapterIds=[1, 2], loadFunction=loadExclusions)
+    assert list(chapterExclusions[1]) == [10, 12]
+    assert len(chapterExclusions[2]) == 0
+    exclusions.get(courseChapterIds=[2, 1], loadFunction=loadExclusions)
+    assert calls == [[1, 2]]
+    assert list(exclusions.contains(excludedIds=chapterExclusions[1], questionIds=[9, 10, 12, 13])) == [
+        False,
+        True,
+        True,
+        False,
+    ]
+
+
+def test_load_overlapping_an_invalidate_is_not_cached():
+    exclusions = QuestionExclusions()
+
+    def loadStale(courseChapterIds: list) -> pd.DataFrame:
+        # The exclusions are written (and invalidated) while this load runs
+        exclusions.invalidate(courseChapterIds=courseChapterIds)
+        return pd.DataFrame({"CourseChapterId": [1], "QuestionId": [10]})
+
+    chapterExclusions = exclusions.get(courseChapterIds=[1], loadFunction=loadStale)
+    assert list(chapterExclusions[1]) == [10]
+    chapterExclusions = exclusions.get(
+        courseChapterIds=[1],
+        loadFunction=lambda courseChapterIds: pd.DataFrame(
+            {"CourseChapterId": [1], "QuestionId": [11]}
+        ),
+    )
+    assert np.array_equal(chapterExclusions[1], [11])
@@ -0,0 +1,33 @@
+import pandas as pd
+import pyarrow.parquet as pq
+
+from export import MappingExportWriter
+
+
+def test_all_null_first_frame_keeps_declared_and_string_types(tmp_path):
+    filePath = str(tmp_path / "mappings.parquet")
+    with MappingExportWriter(filePath=filePath, columnTypes={"Attempted": "double"}) as writer:
+        writer.write(
+            frame=pd.DataFrame(
+                {"QuestionId": [1], "QuestionLatex": [None], "Attempted": [None]}
+            )
+        )
+        writer.write(
+            frame=pd.DataFrame(
+                {"QuestionId": [2], "QuestionLatex": ["x^2"], "Attempted": [3.0]}
+            )
+        )
+
+    table = pq.read_table(filePath)
+    assert str(table.schema.field("QuestionLatex").type) == "string"
+    assert str(table.schema.field("Attempted").type) == "double"
+    assert table.column("QuestionLatex").to_pylist() == [None, "x^2"]
+    assert writer.rowCount == 2
+
+
+def test_csv_export_appends_frames(tmp_path):
+    filePath = str(tmp_path / "mappings.csv")
+    with MappingExportWriter(filePath=filePath) as writer:
+        writer.write(frame=pd.DataFrame({"QuestionId": [1], "KSCId": [10]}))
+        writer.write(frame=pd.DataFrame({"KSCId": [11], "QuestionId": [2]}))
+    assert pd.read_csv(filePath).to_dict("list") == {"QuestionId": [1, 2], "KSCId": [10, 11]}
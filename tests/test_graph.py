@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+from graph import CSRIndex, MappingEdges, MappingGraph
+
+
+def getEdgeData() -> dict:
+    return {
+        "ChapterCluster": pd.DataFrame(
+            {"CourseChapterId": [1, 1, 2], "KSCClusterId": [10, 11, 12]}
+        ),
+        "ClusterKSC": pd.DataFrame(
+            {
+                "KSCClusterId": [10, 10, 11, 12],
+                "KSCId": [100, 101, 102, 100],
+                "DisplayRank": [1, 2, 1, 1],
+            }
+        ),
+        "KSCQuestion": pd.DataFrame(
+            {
+                "KSCId": [100, 101, 102, 102],
+                "QuestionId": [1000, 1001, 1002, 1003],
+                "IsPrimaryKSC": [1, 1, 1, 0],
+            }
+        ),
+    }
+
+
+def getPairs(frame: pd.DataFrame, columns: list) -> set:
+    return set(map(tuple, frame[columns].to_numpy().tolist()))
+
+
+def test_csr_lookup_returns_positions_and_owners():
+    index = CSRIndex(edgeKeys=np.array([5, 3, 5, 7]))
+    positions, owners = index.lookup(ids=np.array([5, 4, 7]))
+    assert list(positions) == [0, 2, 3]
+    assert list(owners) == [0, 0, 2]
+
+
+def test_traverse_in_both_directions():
+    graph = MappingGraph(edgeData=getEdgeData())
+    pairs = graph.getQuestionsForCourseChapters(courseChapterIds=[1])
+    assert getPairs(pairs, ["CourseChapterId", "QuestionId"]) == {
+        (1, 1000),
+        (1, 1001),
+        (1, 1002),
+        (1, 1003),
+    }
+    pairs = graph.getCourseChaptersForKSCs(kscIds=[100])
+    assert getPairs(pairs, ["KSCId", "CourseChapterId"]) == {(100, 1), (100, 2)}
+
+
+def test_updates_go_to_the_delta_until_compaction():
+    store = MappingEdges(
+        srcColumn="KSCClusterId",
+        dstColumn="KSCId",
+        edges=getEdgeData()["ClusterKSC"],
+        compactRatio=10,
+    )
+    baseEdges = store.snapshot[0]
+    store.addEdges(
+        edges=pd.DataFrame({"KSCClusterId": [10, 11], "KSCId": [103, 102], "DisplayRank": [3, 5]})
+    )
+    store.removeEdges(edges=pd.DataFrame({"KSCClusterId": [10], "KSCId": [100]}))
+
+    # The base edges are untouched - only the delta changed
+    assert store.snapshot[0] is baseEdges
+    assert list(store.snapshot[3]) == [0, 2]
+    assert getPairs(store.lookup(ids=[10, 11]), ["KSCClusterId", "KSCId", "DisplayRank"]) == {
+        (10, 101, 2),
+        (10, 103, 3),
+        (11, 102, 5),
+    }
+    assert getPairs(store.lookup(ids=[100], reverse=True), ["KSCClusterId", "KSCId"]) == {
+        (12, 100)
+    }
+    assert len(store.edges) == 4
+
+
+def test_delta_is_compacted_into_the_base():
+    store = MappingEdges(
+        srcColumn="KSCClusterId",
+        dstColumn="KSCId",
+        edges=getEdgeData()["ClusterKSC"],
+        compactRatio=0.1,
+    )
+    store.removeEdges(edges=pd.DataFrame({"KSCClusterId": [12], "KSCId": [100]}))
+    assert len(store.snapshot[3]) == 0
+    assert len(store.snapshot[4]) == 0
+    assert getPairs(store.edges, ["KSCClusterId", "KSCId"]) == {(10, 100), (10, 101), (11, 102)}
+
+
+def test_graph_edge_updates_reach_traversals():
+    graph = MappingGraph(edgeData=getEdgeData())
+    graph.updateEdges(
+        edgeType="ClusterKSC",
+        addedEdges=pd.DataFrame({"KSCClusterId": [12], "KSCId": [102]}),
+        removedEdges=pd.DataFrame({"KSCClusterId": [12], "KSCId": [100]}),
+    )
+    pairs = graph.getKSCsForCourseChapters(courseChapterIds=[2])
+    assert getPairs(pairs, ["CourseChapterId", "KSCId"]) == {(2, 102)}
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from hierarchy import ContentHierarchy
+
+
+def getCourseChapters() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "CourseChapterId": [1, 2, 3, 4, 5],
+            "CourseId": [10, 10, 10, 20, 20],
+            "ClassId": [100, 100, 101, 200, 200],
+            "SubjectId": [1000, 1000, 1001, 2000, 2000],
+            "ChapterId": [1, 2, 3, 4, 5],
+            "CourseName": ["JEE", "JEE", "JEE", "NEET", "NEET"],
+            "ClassName": ["XI", "XI", "XII", "XI", "XI"],
+            "SubjectName": ["Physics", "Physics", "Maths", "Biology", "Biology"],
+            "ChapterName": ["Motion", "Work", "Limits", "Cells", None],
+        }
+    )
+
+
+def test_filter_by_names_uses_prefix_lookup():
+    hierarchy = ContentHierarchy(courseChapters=getCourseChapters())
+    chapters = hierarchy.filterByNames(selectedNames={"Course": "JEE", "Class": "XI"})
+    assert list(chapters["CourseChapterId"]) == [1, 2]
+
+
+def test_rows_with_missing_names_are_skipped():
+    hierarchy = ContentHierarchy(courseChapters=getCourseChapters())
+    assert list(hierarchy.filterByNames(selectedNames={})["CourseChapterId"]) == [1, 2, 3, 4]
+    chapters = hierarchy.filterByNames(selectedNames={"Course": "NEET"})
+    assert list(chapters["CourseChapterId"]) == [4]
+    chapters = hierarchy.filterByNames(selectedNames={"Subject": "Biology"})
+    assert list(chapters["CourseChapterId"]) == [4]
+    # Same rows as the id filter with names joined in
+    chapters = hierarchy.filterByIds(courseIds=[20], includeNames=True)
+    assert list(chapters["CourseChapterId"]) == [4]
+
+
+def test_levels_after_source_label_are_ignored():
+    hierarchy = ContentHierarchy(courseChapters=getCourseChapters())
+    selectedNames = {"Course": "JEE", "Class": "XI", "Subject": "Maths"}
+    chapters = hierarchy.filterByNames(selectedNames=selectedNames, sourceLabel="Class")
+    assert list(chapters["CourseChapterId"]) == [1, 2]
+
+
+def test_source_label_without_selection_keeps_later_levels():
+    hierarchy = ContentHierarchy(courseChapters=getCourseChapters())
+    selectedNames = {"Course": "JEE", "Subject": "Maths"}
+    chapters = hierarchy.filterByNames(selectedNames=selectedNames, sourceLabel="Class")
+    assert list(chapters["CourseChapterId"]) == [3]
+
+
+def test_unknown_name_returns_no_rows():
+    hierarchy = ContentHierarchy(courseChapters=getCourseChapters())
+    assert len(hierarchy.filterByNames(selectedNames={"Course": "CAT"})) == 0
+
+
+def test_child_names_and_active_courses():
+    hierarchy = ContentHierarchy(courseChapters=getCourseChapters(), activeCourseIds=[10])
+    assert hierarchy.getChildNames(selectedNames={"Course": "JEE"}, childLabel="Class") == [
+        "XI",
+        "XII",
+    ]
+    assert hierarchy.getChildNames(selectedNames={}, childLabel="Course", activeOnly=True) == [
+        "JEE"
+    ]
+    rows = hierarchy.getRowsByNames(selectedNames={}, activeOnly=True)
+    assert np.array_equal(rows, [0, 1, 2])
+    assert hierarchy.getName(label="Subject", contentId=1001) == "Maths"
@@ -0,0 +1,46 @@
+import pandas as pd
+
+from incidence import QuestionKSCIncidence
+
+
+def getIncidence() -> QuestionKSCIncidence:
+    return QuestionKSCIncidence(
+        questionKSCs=pd.DataFrame(
+            {
+                "QuestionId": [1, 1, 2, 3],
+                "KSCId": [10, 11, 11, 12],
+                "IsPrimaryKSC": [1, 0, 0, 1],
+            }
+        )
+    )
+
+
+def test_questions_without_primary_ksc():
+    assert list(getIncidence().getQuestionsWithoutPrimaryKSC()) == [2]
+
+
+def test_kscs_without_questions_are_taken_from_the_catalog():
+    kscIds = getIncidence().getKSCsWithoutQuestions(kscIds=[13, 10, 12, 14, 10])
+    assert list(kscIds) == [13, 14]
+
+
+def test_chapter_coverage():
+    chapterKSCs = pd.DataFrame({"CourseChapterId": [1, 1, 1, 2], "KSCId": [10, 11, 13, 12]})
+    coverage = getIncidence().getChapterCoverage(chapterKSCs=chapterKSCs).set_index(
+        "CourseChapterId"
+    )
+    assert list(coverage.loc[1, ["TotalKSCs", "MappedKSCs", "Questions", "PrimaryQuestions"]]) == [
+        3,
+        2,
+        2,
+        1,
+    ]
+    assert coverage.loc[2, "KSCCoverage"] == 1
+
+
+def test_cluster_overlap():
+    clusterKSCs = pd.DataFrame({"KSCClusterId": [100, 101, 102], "KSCId": [10, 11, 12]})
+    overlap = getIncidence().getClusterOverlap(clusterKSCs=clusterKSCs)
+    assert overlap.to_dict("records") == [
+        {"KSCClusterId": 100, "OtherKSCClusterId": 101, "SharedQuestions": 1}
+    ]
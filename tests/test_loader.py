@@ -0,0 +1,34 @@
+import pandas as pd
+
+from loader import BatchLoader, RequestLoaders
+
+
+def getLoaders(calls: list) -> RequestLoaders:
+    questions = pd.DataFrame({"QuestionId": [1, 2, 3], "QuestionLatex": ["a", "b", "c"]})
+
+    def loadQuestions(questionIds: list) -> pd.DataFrame:
+        calls.append(list(questionIds))
+        return questions.loc[questions["QuestionId"].isin(questionIds)]
+
+    return RequestLoaders(
+        loaders={"Question": BatchLoader(batchFunction=loadQuestions, keyColumn="QuestionId")}
+    )
+
+
+def test_queued_keys_are_fetched_in_one_batch():
+    calls = list()
+    loaders = getLoaders(calls=calls)
+    first = loaders["Question"].load(key=1)
+    rest = loaders["Question"].loadMany(keys=[2, 4, 2])
+    assert list(first.get()["QuestionLatex"]) == ["a"]
+    assert list(rest.get()["QuestionId"]) == [2]
+    assert calls == [[1, 2, 4]]
+
+
+def test_rows_are_memoized_per_request():
+    calls = list()
+    loaders = getLoaders(calls=calls)
+    assert loaders.getRow(name="Question", key=3) == {"QuestionId": 3, "QuestionLatex": "c"}
+    assert loaders.getRow(name="Question", key=3)["QuestionLatex"] == "c"
+    assert loaders.getRow(name="Question", key=5) is None
+    assert calls == [[3], [5]]
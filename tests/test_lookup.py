@@ -0,0 +1,49 @@
+
+import pandas as pd
+
+from lookup import QuestionLookupIndex
+
+
+def getQuestionRows():
+    return pd.DataFrame(
+        {
+            "QuestionId": [20, 10, 10, 30],
+            "QuestionCode": ["Q20", "Q10", "Q10", None],
+            "KSCId": [5, 2, 1, 7],
+            "IsPrimaryKSC": [1, 1, 0, 1],
+            "KSCClusterId": [50, 20, 10, 70],
+            "CourseChapterId": [3, 1, 1, None],
+        }
+    )
+
+
+def test_lookups_by_id_and_code():
+    index = QuestionLookupIndex(questionRows=getQuestionRows())
+    assert len(index) == 4
+    assert index.lookupId(questionId=10)["KSCId"].tolist() == [1, 2]
+    assert index.lookupId(questionId=15).shape[0] == 0
+    assert index.getQuestionId(questionCode="Q20") == 20
+    assert index.lookupCode(questionCode="Q10")["QuestionId"].tolist() == [10, 10]
+    assert index.lookupCode(questionCode="Q99").shape[0] == 0
+    assert index.lookupId(questionId=30)["KSCId"].tolist() == [7]
+
+
+def test_patch_rows_replaces_adds_and_removes_questions():
+    index = QuestionLookupIndex(questionRows=getQuestionRows())
+    patchRows = pd.DataFrame(
+        {
+            "QuestionId": [10, 40],
+            "QuestionCode": ["Q10B", "Q40"],
+            "KSCId": [3, 8],
+            "IsPrimaryKSC": [1, 1],
+            "KSCClusterId": [30, 80],
+            "CourseChapterId": [2, 4],
+        }
+    )
+    index.patchRows(questionIds=[10, 20, 40], questionRows=patchRows)
+    assert index.lookupId(questionId=10)["KSCId"].tolist() == [3]
+    assert index.lookupId(questionId=20).shape[0] == 0
+    assert index.lookupCode(questionCode="Q10").shape[0] == 0
+    assert index.getQuestionId(questionCode="Q10B") == 10
+    assert index.lookupCode(questionCode="Q40")["CourseChapterId"].tolist() == [4]
+    assert index.lookupId(questionId=30)["KSCId"].tolist() == [7]
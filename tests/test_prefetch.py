@@ -0,0 +1,79 @@
+import threading
+
+from prefetch import LRUCache
+
+
+def test_lru_eviction_and_hit_rate():
+    prefetcher = LRUCache(capacity=2, maxWorkers=1)
+    for key in [1, 2, 1, 3]:
+        prefetcher.get(key=key, loadFunction=lambda key=key: key * 10)
+    assert prefetcher.peek(key=2) is None
+    assert prefetcher.peek(key=1) == 10
+    assert prefetcher.getStats()["hits"] == 1
+
+
+def test_prefetched_value_is_served_by_get():
+    prefetcher = LRUCache(capacity=4, maxWorkers=1)
+    prefetcher.prefetchEach(keyLoaders=[("a", lambda: "A")])
+    assert prefetcher.get(key="a", loadFunction=lambda: "inline") == "A"
+
+
+def test_load_in_flight_during_invalidate_is_not_cached():
+    prefetcher = LRUCache(capacity=4, maxWorkers=1)
+    started, release = threading.Event(), threading.Event()
+
+    def loadStale():
+        started.set()
+        release.wait(5)
+        return "stale"
+
+    prefetcher.prefetchEach(keyLoaders=[("a", loadStale)])
+    started.wait(5)
+    prefetcher.invalidate()
+    release.set()
+    prefetcher.executor.shutdown(wait=True)
+
+    assert prefetcher.peek(key="a") is None
+    assert prefetcher.getStats()["pending"] == 0
+    assert prefetcher.get(key="a", loadFunction=lambda: "fresh") == "fresh"
+    assert prefetcher.peek(key="a") == "fresh"
+
+
+def test_put_from_an_older_generation_is_dropped():
+    prefetcher = LRUCache(capacity=4, maxWorkers=1)
+    generation = prefetcher.generation
+    prefetcher.invalidate(keyFilter=lambda key: key == "b")
+    assert not prefetcher.put(key="a", value="stale", generation=generation)
+    assert prefetcher.put(key="a", value="fresh", generation=prefetcher.generation)
+    assert prefetcher.peek(key="a") == "fresh"
+
+
+def test_batch_prefetch_is_served_by_get_many():
+    cache = LRUCache(capacity=8, maxWorkers=1)
+    calls = list()
+
+    def loadDetails(keys: list) -> dict:
+        calls.append(list(keys))
+        return {key: key * 10 for key in keys if key != 3}
+
+    cache.put(key=1, value=10)
+    cache.prefetch(keys=[1, 2, 3, 2], loadFunction=loadDetails).result()
+    assert calls == [[2, 3]]
+    assert cache.getMany(keys=[1, 2, 4], loadFunction=loadDetails) == {1: 10, 2: 20, 4: 40}
+    assert calls == [[2, 3], [4]]
+    assert cache.getStats()["pending"] == 0
+
+
+def test_get_many_waits_for_keys_in_flight():
+    cache = LRUCache(capacity=8, maxWorkers=1)
+    release = threading.Event()
+
+    def loadSlowly(keys: list) -> dict:
+        release.wait(5)
+        return {key: "prefetched" for key in keys}
+
+    cache.prefetch(keys=["a"], loadFunction=loadSlowly)
+    threading.Timer(0.05, release.set).start()
+    values = cache.getMany(keys=["a"], loadFunction=lambda keys: {key: "inline" for key in keys})
+    assert values == {"a": "prefetched"}
+    assert cache.getStats()["inFlightHits"] == 1
@@ -0,0 +1,78 @@
+import threading
+
+import pandas as pd
+
+from reference import ReferenceData
+
+
+class CountingSource:
+
+    def __init__(self):
+        self.version = 1
+        self.loads = 0
+        self.checksums = 0
+
+    def load(self) -> pd.DataFrame:
+        self.loads += 1
+        return pd.DataFrame({"CourseId": [self.version]})
+
+    def checksum(self) -> int:
+        self.checksums += 1
+        return self.version
+
+
+def getReferenceData(source: CountingSource, refreshSeconds: int = 300) -> ReferenceData:
+    referenceData = ReferenceData(refreshSeconds=refreshSeconds)
+    referenceData.register(
+        name="ActiveCourses", loadFunction=source.load, checksumFunction=source.checksum
+    )
+    return referenceData
+
+
+def test_first_load_skips_the_checksum_query():
+    source = CountingSource()
+    referenceData = getReferenceData(source=source)
+    assert referenceData.get("ActiveCourses")["CourseId"].tolist() == [1]
+    referenceData.get("ActiveCourses")
+    assert (source.loads, source.checksums) == (1, 0)
+
+
+def test_refresh_reloads_only_when_the_checksum_changes():
+    source = CountingSource()
+    referenceData = getReferenceData(source=source, refreshSeconds=0)
+    referenceData.get("ActiveCourses")
+    # The checksum of the first load is unknown, so the first refresh reloads
+    referenceData.get("ActiveCourses")
+    assert (source.loads, source.checksums) == (2, 1)
+    referenceData.get("ActiveCourses")
+    assert (source.loads, source.checksums) == (2, 2)
+    source.version = 2
+    assert referenceData.get("ActiveCourses")["CourseId"].tolist() == [2]
+    assert source.loads == 3
+
+
+def test_invalidate_during_a_load_does_not_return_none():
+    loadStarted = threading.Event()
+    finishLoad = threading.Event()
+
+    def slowLoad() -> pd.DataFrame:
+        loadStarted.set()
+        finishLoad.wait(5)
+        return pd.DataFrame({"CourseId": [1]})
+
+    referenceData = ReferenceData(refreshSeconds=None)
+    referenceData.register(name="ActiveCourses", loadFunction=slowLoad)
+    results = list()
+    reader = threading.Thread(
+        target=lambda: results.append(referenceData.get("ActiveCourses"))
+    )
+    reader.start()
+    loadStarted.wait(5)
+    invalidator = threading.Thread(target=referenceData.invalidate)
+    invalidator.start()
+    finishLoad.set()
+    reader.join(5)
+    invalidator.join(5)
+    assert results[0]["CourseId"].tolist() == [1]
+    # The invalidate waited for the load and dropped it afterwards
+    assert referenceData.tables["ActiveCourses"].data is None
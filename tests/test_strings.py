@@ -0,0 +1,30 @@
+
+import pandas as pd
+
+from strings import StringDictionary
+
+
+def test_only_recorded_columns_are_decoded():
+    dictionary = StringDictionary()
+    frame = pd.DataFrame({"KSCText": ["a", "b", "a"], "Rank": [1, 2, 3]})
+    frame["Rank"] = frame["Rank"].astype("int32")
+    encoded = dictionary.encodeFrame(frame=frame, columns=["KSCText"])
+    assert encoded.attrs["encodedColumns"] == ["KSCText"]
+    decoded = dictionary.decodeFrame(frame=encoded, columns=["KSCText", "Rank"])
+    assert decoded["KSCText"].tolist() == ["a", "b", "a"]
+    assert decoded["Rank"].tolist() == [1, 2, 3]
+    assert decoded.attrs["encodedColumns"] == []
+
+
+def test_full_dictionary_leaves_new_strings_unencoded():
+    dictionary = StringDictionary(maxSize=2)
+    first = dictionary.encodeFrame(frame=pd.DataFrame({"Text": ["a", "b"]}), columns=["Text"])
+    second = dictionary.encodeFrame(frame=pd.DataFrame({"Text": ["a", "c"]}), columns=["Text"])
+    assert first.attrs["encodedColumns"] == ["Text"]
+    assert second.attrs["encodedColumns"] == []
+    assert second["Text"].tolist() == ["a", "c"]
+    assert len(dictionary) == 2
+    forced = dictionary.encodeFrame(
+        frame=pd.DataFrame({"Text": ["c"]}), columns=["Text"], force=True
+    )
+    assert dictionary.decodeFrame(frame=forced, columns=["Text"])["Text"].tolist() == ["c"]
@@ -0,0 +1,30 @@
+import pandas as pd
+
+from usage import ColumnUsageTracker
+
+
+def test_unread_columns_are_reported_by_site():
+    tracker = ColumnUsageTracker()
+    questions = tracker.track(
+        frame=pd.DataFrame(
+            {"QuestionId": [1, 2], "KSCId": [10, 20], "QuestionCode": ["a", "b"], "Latex": ["x", "y"]}
+        ),
+        site="data.py:getQuestions:10",
+    )
+    kscs = tracker.track(
+        frame=pd.DataFrame({"KSCId": [10], "KSCText": ["k"]}), site="data.py:getKSCs:20"
+    )
+
+    # Reads on derived frames are recorded against the select site too
+    primary = questions.loc[questions["KSCId"] == 10]
+    assert list(primary.QuestionCode) == ["a"]
+    kscs[["KSCId", "KSCText"]]
+
+    assert tracker.getUnreadColumns() == {"data.py:getQuestions:10": ["Latex", "QuestionId"]}
+    assert tracker.logReport() == tracker.getUnreadColumns()
+
+
+def test_untracked_results_are_left_as_they_are():
+    tracker = ColumnUsageTracker()
+    assert tracker.track(frame=None, site="data.py:getQuestions:10") is None
+    assert tracker.getUnreadColumns() == dict()